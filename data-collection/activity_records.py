@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Activity Record Normalization for Zero-Trust Cloud Lab
+Compact activity log records built by a precompiled field extractor, with
+interned repeated strings and optional projection of the claims dict
+"""
+
+from operator import attrgetter
+from typing import Dict, Optional, Tuple
+
+# Distinct strings an ActivityNormalizer shares before starting its cache over
+DEFAULT_MAX_STRINGS = 100000
+
+# Claims we keep from activity log entries, keyed by output name; the raw
+# claims dict has 40+ mostly opaque token fields
+ACTIVITY_CLAIM_FIELDS = {
+    "name": "name",
+    "ipaddr": "ipaddr",
+    "appid": "appid",
+    "idtyp": "idtyp",
+    "email": "http://schemas.xmlsoap.org/ws/2005/05/identity/claims/emailaddress",
+    "object_id": "http://schemas.microsoft.com/identity/claims/objectidentifier",
+    "tenant_id": "http://schemas.microsoft.com/identity/claims/tenantid",
+    "auth_methods": "http://schemas.microsoft.com/claims/authnmethodsreferences",
+    "scope": "http://schemas.microsoft.com/identity/claims/scope",
+}
+
+# Output field order, matching the entries the collector has always written
+FIELDS = (
+    "timestamp", "level", "operation", "resource_group", "resource_id", "status",
+    "caller", "category", "claims", "event_id", "correlation_id",
+)
+
+# SDK EventData attributes in FIELDS order, fetched in one C-level call
+_extract = attrgetter(
+    "event_timestamp", "level", "operation_name", "resource_group_name", "resource_id",
+    "status", "caller", "category", "claims", "event_data_id", "correlation_id",
+)
+
+
+def project_claims(claims: Optional[Dict]) -> Optional[Dict]:
+    """Reduce a raw claims dict to the ACTIVITY_CLAIM_FIELDS subset (idempotent)"""
+    if not claims:
+        return None
+    return {name: claims.get(key, claims.get(name)) for name, key in ACTIVITY_CLAIM_FIELDS.items()}
+
+
+class ActivityRecord:
+    """Slotted activity log record; to_dict() gives the usual entry dict"""
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(FIELDS, values):
+            setattr(self, name, value)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def __getitem__(self, name: str):
+        return getattr(self, name)
+
+    def get(self, name: str, default=None):
+        return getattr(self, name, default)
+
+    def __repr__(self):
+        return f"ActivityRecord({self.timestamp!r}, {self.operation!r}, {self.caller!r})"
+
+
+class ActivityNormalizer:
+    """
+    Converts SDK EventData objects into entries
+
+    Enum/LocalizableString fields are unwrapped and, like resource groups,
+    resource IDs and callers, shared through a per-normalizer cache, so
+    the many entries sharing a value share one string object. The cache
+    starts over once it holds max_strings values, so it stays bounded in a
+    long-running collector while values that keep repeating are re-cached.
+    """
+
+    def __init__(self, project: bool = False, max_strings: int = DEFAULT_MAX_STRINGS):
+        """
+        Args:
+            project: Keep only ACTIVITY_CLAIM_FIELDS of each claims dict
+            max_strings: Distinct strings cached before the cache is cleared
+        """
+        self.project = project
+        self.max_strings = max_strings
+        self._strings: Dict[str, str] = {}
+
+    def _intern(self, value) -> Optional[str]:
+        """Cache miss path: remember the shared copy of a string"""
+        if not value:
+            return None
+        value = str(value)
+        if len(self._strings) >= self.max_strings:
+            # Cleared in place: values() and _project() hold references to the dict
+            self._strings.clear()
+        self._strings[value] = value
+        return value
+
+    def _project(self, claims: Optional[Dict]) -> Optional[Dict]:
+        """Projected claims with interned values (names, IPs, app IDs repeat a lot)"""
+        if not claims:
+            return None
+        strings = self._strings
+        projected = {}
+        for name, key in ACTIVITY_CLAIM_FIELDS.items():
+            value = claims.get(key, claims.get(name))
+            projected[name] = strings.get(value) or self._intern(value) if isinstance(value, str) else value
+        return projected
+
+    def values(self, log) -> Tuple:
+        """Normalized field values for one EventData, in FIELDS order"""
+        (timestamp, level, operation, resource_group, resource_id, status,
+         caller, category, claims, event_id, correlation_id) = _extract(log)
+        strings = self._strings
+        intern = self._intern
+        # Enum / LocalizableString fields carry the text in .value
+        level = getattr(level, "value", level)
+        operation = getattr(operation, "value", operation)
+        status = getattr(status, "value", status)
+        category = getattr(category, "value", category)
+        return (
+            timestamp.isoformat() if timestamp else None,
+            strings.get(level) or intern(level),
+            strings.get(operation) or intern(operation),
+            strings.get(resource_group) or intern(resource_group),
+            strings.get(resource_id) or intern(resource_id),
+            strings.get(status) or intern(status),
+            strings.get(caller) or intern(caller),
+            strings.get(category) or intern(category),
+            self._project(claims) if self.project else claims,
+            event_id,
+            correlation_id,
+        )
+
+    def to_entry(self, log) -> Dict:
+        """Plain dict entry (what save_logs, sinks and checkpoints consume)"""
+        (timestamp, level, operation, resource_group, resource_id, status,
+         caller, category, claims, event_id, correlation_id) = self.values(log)
+        return {
+            "timestamp": timestamp,
+            "level": level,
+            "operation": operation,
+            "resource_group": resource_group,
+            "resource_id": resource_id,
+            "status": status,
+            "caller": caller,
+            "category": category,
+            "claims": claims,
+            "event_id": event_id,
+            "correlation_id": correlation_id
+        }
+
+    def to_record(self, log) -> ActivityRecord:
+        """Compact slotted record"""
+        return ActivityRecord(*self.values(log))
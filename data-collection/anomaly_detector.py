@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Streaming Anomaly Detector for Zero-Trust Cloud Lab
+Single-pass detection of brute force, credential stuffing and impossible travel
+over authentication logs, with bounded per-user and per-IP state
+"""
+
+import argparse
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Approximate coordinates for the locations used by the generator
+LOCATION_COORDINATES = {
+    "New York, US": (40.71, -74.01),
+    "London, UK": (51.51, -0.13),
+    "Tokyo, JP": (35.68, 139.69),
+    "Sydney, AU": (-33.87, 151.21),
+    "Berlin, DE": (52.52, 13.40),
+    "Paris, FR": (48.86, 2.35),
+    "Singapore, SG": (1.35, 103.82),
+    "Toronto, CA": (43.65, -79.38),
+}
+
+
+@dataclass
+class DetectorConfig:
+    """Thresholds and memory bounds for the detector"""
+    # Brute force: this many failures for one user inside the window
+    failure_threshold: int = 5
+    failure_window_seconds: float = 300
+    # Credential stuffing: failures for this many distinct users from one IP
+    distinct_user_threshold: int = 4
+    ip_window_seconds: float = 600
+    # Impossible travel: implied speed between consecutive logins
+    max_travel_speed_kmh: float = 900
+    # Memory bounds: least recently seen users/IPs are evicted past this
+    max_tracked_keys: int = 100000
+    # Re-alert on the same key and alert type at most once per cooldown
+    alert_cooldown_seconds: float = 300
+
+
+def haversine_km(a: tuple, b: tuple) -> float:
+    """Great-circle distance between two (lat, lon) points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class BoundedState(OrderedDict):
+    """LRU dict that evicts the least recently touched key past max_keys"""
+
+    def __init__(self, max_keys: int, factory):
+        super().__init__()
+        self.max_keys = max_keys
+        self.factory = factory
+        self.evicted = 0
+
+    def touch(self, key):
+        """Return the state for key, creating it and evicting old keys as needed"""
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        value = self[key] = self.factory()
+        if len(self) > self.max_keys:
+            self.popitem(last=False)
+            self.evicted += 1
+        return value
+
+
+class UserState:
+    """Per-user sliding window of the latest failure times and last known login"""
+    __slots__ = ("failures", "last_location", "last_time", "alerted")
+
+    def __init__(self, max_failures: Optional[int] = None):
+        # Only the latest failure_threshold failures decide an alert
+        self.failures = deque(maxlen=max_failures)
+        self.last_location = None
+        self.last_time = None
+        self.alerted = {}
+
+
+class IpState:
+    """Per-IP map of user -> last failure time inside the window, latest users only"""
+    __slots__ = ("failed_users", "alerted")
+
+    def __init__(self):
+        self.failed_users = OrderedDict()
+        self.alerted = {}
+
+
+class AuthAnomalyDetector:
+    """
+    Consumes authentication logs in timestamp order and emits alerts
+
+    State per user and per source IP is a small sliding window; windows are
+    trimmed on every event, hold no more entries than their alert threshold
+    and the number of tracked keys is capped, so memory stays bounded
+    however long the stream runs.
+    """
+
+    def __init__(self, config: Optional[DetectorConfig] = None):
+        self.config = config or DetectorConfig()
+        self.users = BoundedState(self.config.max_tracked_keys,
+                                  lambda: UserState(self.config.failure_threshold))
+        self.ips = BoundedState(self.config.max_tracked_keys, IpState)
+        self.events_processed = 0
+        self.alert_counts: Dict[str, int] = {}
+
+    def _alert(self, state, alert_type: str, now: float, log: Dict, **detail) -> Optional[Dict]:
+        last = state.alerted.get(alert_type)
+        if last is not None and now - last < self.config.alert_cooldown_seconds:
+            return None
+        state.alerted[alert_type] = now
+        self.alert_counts[alert_type] = self.alert_counts.get(alert_type, 0) + 1
+        return {
+            "alert_type": alert_type,
+            "timestamp": log["timestamp"],
+            "user_id": log.get("user_id"),
+            "username": log.get("username"),
+            "source_ip": log.get("source_ip"),
+            **detail
+        }
+
+    def process(self, log: Dict) -> List[Dict]:
+        """
+        Update state with one authentication log
+
+        Returns:
+            Alerts raised by this event (usually empty)
+        """
+        config = self.config
+        now = datetime.fromisoformat(log["timestamp"]).timestamp()
+        user_key = log.get("user_id") or log.get("username")
+        user = self.users.touch(user_key)
+        alerts = []
+        self.events_processed += 1
+
+        if log.get("success") is False:
+            # Brute force: many failures for one account
+            failures = user.failures
+            failures.append(now)
+            while failures and now - failures[0] > config.failure_window_seconds:
+                failures.popleft()
+            if len(failures) >= config.failure_threshold:
+                alerts.append(self._alert(
+                    user, "brute_force", now, log,
+                    failures=len(failures), window_seconds=config.failure_window_seconds
+                ))
+
+            # Credential stuffing: one IP failing against many accounts
+            source_ip = log.get("source_ip")
+            if source_ip:
+                ip = self.ips.touch(source_ip)
+                ip.failed_users[user_key] = now
+                ip.failed_users.move_to_end(user_key)
+                while ip.failed_users:
+                    _, seen = next(iter(ip.failed_users.items()))
+                    if now - seen <= config.ip_window_seconds:
+                        break
+                    ip.failed_users.popitem(last=False)
+                while len(ip.failed_users) > config.distinct_user_threshold:
+                    ip.failed_users.popitem(last=False)
+                if len(ip.failed_users) >= config.distinct_user_threshold:
+                    alerts.append(self._alert(
+                        ip, "credential_stuffing", now, log,
+                        distinct_users=len(ip.failed_users),
+                        window_seconds=config.ip_window_seconds
+                    ))
+        else:
+            # Impossible travel: consecutive successful logins too far apart
+            location = log.get("location")
+            coordinates = LOCATION_COORDINATES.get(location)
+            previous = LOCATION_COORDINATES.get(user.last_location)
+            if coordinates and previous and location != user.last_location:
+                hours = max((now - user.last_time) / 3600, 1e-6)
+                distance = haversine_km(previous, coordinates)
+                speed = distance / hours
+                if speed > config.max_travel_speed_kmh:
+                    alerts.append(self._alert(
+                        user, "impossible_travel", now, log,
+                        from_location=user.last_location, to_location=location,
+                        distance_km=round(distance), speed_kmh=round(speed)
+                    ))
+            if coordinates:
+                user.last_location = location
+                user.last_time = now
+
+        return [alert for alert in alerts if alert]
+
+    def run(self, logs: Iterable[Dict]) -> Iterator[Dict]:
+        """Process a stream of logs, yielding alerts as they are raised"""
+        for log in logs:
+            yield from self.process(log)
+
+
+def iter_log_file(path: str) -> Iterator[Dict]:
+    """Yield logs from an NDJSON file (streamed) or a JSON array file"""
+    with open(path) as f:
+        if path.endswith(".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Detect anomalies in authentication logs")
+    parser.add_argument("inputs", nargs="*", help="Authentication log files (.json or .ndjson)")
+    parser.add_argument("--generate", type=int,
+                        help="Detect over N freshly generated logs instead of files")
+    parser.add_argument("--alerts-out", help="Write alerts to this NDJSON file")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        from synthetic_data_generator import iter_authentication_log
+        logs = iter_authentication_log(args.generate)
+    elif args.inputs:
+        logs = (log for path in args.inputs for log in iter_log_file(path))
+    else:
+        parser.error("give input files or --generate N")
+
+    detector = AuthAnomalyDetector()
+    out = open(args.alerts_out, 'w') if args.alerts_out else None
+    start = time.perf_counter()
+    try:
+        for alert in detector.run(logs):
+            if out:
+                out.write(json.dumps(alert) + "\n")
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"[OK] Processed {detector.events_processed} events in {elapsed:.2f}s "
+          f"({detector.events_processed / max(elapsed, 1e-9):,.0f} events/sec)")
+    for alert_type, count in sorted(detector.alert_counts.items()):
+        print(f"  - {alert_type}: {count} alerts")
+    print(f"  Tracked users: {len(detector.users)}, IPs: {len(detector.ips)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Azure Authentication for Zero-Trust Cloud Lab
+Credential selection for unattended runs (workload identity, managed
+identity, service principal, environment) and an on-disk access token cache
+shared by every collector run and worker on the machine
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, replaces stay atomic
+    fcntl = None
+
+CREDENTIAL_MODES = ("auto", "workload", "managed", "secret", "env", "cli", "default", "interactive")
+
+# Modes acting as whoever is signed in (az login, browser, developer tools):
+# nothing in the mode names the principal, so their tokens are not file-cached
+USER_DELEGATED_MODES = ("cli", "default", "interactive")
+
+DEFAULT_TOKEN_CACHE = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "zero-trust-lab", "azure_token_cache.json"
+)
+
+# Refresh tokens this long before they expire, so a request started with a
+# cached token does not outlive it
+REFRESH_MARGIN_SECONDS = 300
+
+
+def resolve_mode(mode: str = "auto") -> str:
+    """
+    Concrete credential mode for "auto", from what the environment provides
+
+    Args:
+        mode: One of CREDENTIAL_MODES
+
+    Returns:
+        The mode to build; "auto" prefers non-interactive credentials and only
+        falls back to the browser when attached to a terminal
+    """
+    if mode not in CREDENTIAL_MODES:
+        raise ValueError(f"Unknown credential mode {mode!r}; expected one of {', '.join(CREDENTIAL_MODES)}")
+    if mode != "auto":
+        return mode
+    if os.getenv("AZURE_FEDERATED_TOKEN_FILE"):
+        # AKS workload identity webhook injects the token file and client ID
+        return "workload"
+    if os.getenv("AZURE_CLIENT_SECRET"):
+        return "secret"
+    if os.getenv("IDENTITY_ENDPOINT") or os.getenv("MSI_ENDPOINT"):
+        return "managed"
+    return "interactive" if sys.stdin.isatty() else "default"
+
+
+def build_credential(mode: str = "auto", tenant_id: str = None):
+    """
+    Create an azure-identity credential for a mode
+
+    Args:
+        mode: One of CREDENTIAL_MODES
+        tenant_id: Azure tenant ID (defaults to AZURE_TENANT_ID)
+
+    Returns:
+        A TokenCredential
+    """
+    import azure.identity as identity
+
+    mode = resolve_mode(mode)
+    tenant_id = tenant_id or os.getenv("AZURE_TENANT_ID")
+    client_id = os.getenv("AZURE_CLIENT_ID")
+
+    if mode == "workload":
+        return identity.WorkloadIdentityCredential(tenant_id=tenant_id, client_id=client_id)
+    if mode == "managed":
+        # client_id selects a user-assigned identity; None means system-assigned
+        return identity.ManagedIdentityCredential(client_id=client_id)
+    if mode == "secret":
+        secret = os.getenv("AZURE_CLIENT_SECRET")
+        if not (tenant_id and client_id and secret):
+            raise ValueError("Credential mode 'secret' needs AZURE_TENANT_ID, AZURE_CLIENT_ID and AZURE_CLIENT_SECRET")
+        return identity.ClientSecretCredential(tenant_id, client_id, secret)
+    if mode == "env":
+        return identity.EnvironmentCredential()
+    if mode == "cli":
+        return identity.AzureCliCredential(tenant_id=tenant_id)
+    if mode == "default":
+        return identity.DefaultAzureCredential(exclude_interactive_browser_credential=True)
+
+    print("Using interactive browser authentication...")
+    print("A browser window will open for you to sign in to Azure.")
+    if tenant_id:
+        return identity.InteractiveBrowserCredential(tenant_id=tenant_id)
+    return identity.InteractiveBrowserCredential()
+
+
+class CachedCredential:
+    """
+    TokenCredential wrapper that keeps access tokens in a JSON file
+
+    Tokens are keyed by identity, tenant and scopes and reused until shortly
+    before they expire, so repeated runs skip token acquisition entirely.
+    The identity must name the principal the tokens belong to, which is why
+    get_credential() only wraps application identities in it.
+    Threads share the in-memory copy under a lock; separate processes
+    coordinate through an exclusive lock on the file, so concurrent workers
+    that all miss the cache acquire the token once between them. The file
+    holds bearer tokens and is created readable by the owner only.
+    """
+
+    def __init__(self, credential, path: str = DEFAULT_TOKEN_CACHE, identity: str = "",
+                 refresh_margin: float = REFRESH_MARGIN_SECONDS, clock=time.time):
+        """
+        Args:
+            credential: Wrapped TokenCredential (anything with get_token)
+            path: Cache file location
+            identity: Distinguishes credentials sharing one cache file
+            refresh_margin: Seconds before expiry a cached token stops being used
+            clock: Time source (for tests)
+        """
+        self.credential = credential
+        self.path = path
+        self.identity = identity
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._tokens: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, scopes, tenant_id: Optional[str]) -> str:
+        material = "|".join([self.identity, tenant_id or ""] + sorted(scopes))
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and entry["expires_on"] - self.refresh_margin > self.clock()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, tokens: Dict[str, Dict]):
+        now = self.clock()
+        # Drop expired entries so the file does not grow across runs
+        tokens = {key: entry for key, entry in tokens.items() if entry["expires_on"] > now}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(tokens, f)
+        os.replace(temp_path, self.path)
+
+    def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None,
+                  **kwargs):
+        from azure.core.credentials import AccessToken
+
+        if claims:
+            # Claims challenges (CAE) need a new token from the identity provider
+            return self.credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+
+        key = self._key(scopes, tenant_id)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if self._fresh(entry):
+                self.hits += 1
+                return AccessToken(entry["token"], entry["expires_on"])
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Another run or worker may have refreshed it while we waited
+                    self._tokens = self._read()
+                    entry = self._tokens.get(key)
+                    if self._fresh(entry):
+                        self.hits += 1
+                        return AccessToken(entry["token"], entry["expires_on"])
+
+                    self.misses += 1
+                    if tenant_id:
+                        kwargs["tenant_id"] = tenant_id
+                    token = self.credential.get_token(*scopes, **kwargs)
+                    self._tokens[key] = {"token": token.token, "expires_on": int(token.expires_on)}
+                    self._write(self._tokens)
+                    return token
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        close = getattr(self.credential, "close", None)
+        if close:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def get_credential(mode: str = "auto", tenant_id: str = None,
+                   token_cache: Optional[str] = DEFAULT_TOKEN_CACHE, credential=None):
+    """
+    Credential for the collector, wrapped in the on-disk token cache
+
+    USER_DELEGATED_MODES are returned unwrapped: their tokens belong to
+    whichever user is signed in, which the cache key cannot tell apart, so
+    sharing the file would hand one user's token to another. So is a
+    pre-built credential with mode "auto", since what it signs in as is not
+    known.
+
+    Args:
+        mode: One of CREDENTIAL_MODES
+        tenant_id: Azure tenant ID (defaults to AZURE_TENANT_ID)
+        token_cache: Cache file path, or None to disable caching (ignored for USER_DELEGATED_MODES)
+        credential: Pre-built credential to wrap instead of building one (e.g. a fake)
+
+    Returns:
+        A TokenCredential
+    """
+    tenant_id = tenant_id or os.getenv("AZURE_TENANT_ID")
+    if credential is None:
+        mode = resolve_mode(mode)
+        credential = build_credential(mode, tenant_id)
+    elif mode == "auto":
+        return credential
+    if not token_cache or mode in USER_DELEGATED_MODES:
+        return credential
+    identity = f"{mode}|{tenant_id or ''}|{os.getenv('AZURE_CLIENT_ID') or ''}"
+    return CachedCredential(credential, token_cache, identity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acquire (or reuse) an Azure access token")
+    parser.add_argument("--auth", choices=CREDENTIAL_MODES, default=os.getenv("AZURE_CREDENTIAL_MODE", "auto"),
+                        help="Credential mode (default: auto)")
+    parser.add_argument("--token-cache", default=os.getenv("AZURE_TOKEN_CACHE", DEFAULT_TOKEN_CACHE),
+                        help="Token cache file")
+    parser.add_argument("--scope", default="https://management.azure.com/.default",
+                        help="Scope to request a token for")
+    args = parser.parse_args()
+
+    mode = resolve_mode(args.auth)
+    credential = get_credential(mode, token_cache=args.token_cache)
+    start = time.perf_counter()
+    token = credential.get_token(args.scope)
+    elapsed = (time.perf_counter() - start) * 1000
+    source = "cache" if getattr(credential, "hits", 0) else mode
+    expires = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(token.expires_on))
+    print(f"[OK] Token for {args.scope} from {source} in {elapsed:.1f} ms (expires {expires})")
+
+
+if __name__ == "__main__":
+    main()
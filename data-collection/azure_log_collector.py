@@ -5,217 +5,793 @@ Collects security-related logs from Azure services
 """
 
 import os
+import sys
 import json
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.monitor import MonitorManagementClient
-from azure.mgmt.resource import ResourceManagementClient
+from typing import List, Dict, Tuple, Callable, Optional, Iterable, Iterator
+
+from activity_records import ActivityNormalizer
+from azure_auth import CREDENTIAL_MODES, DEFAULT_TOKEN_CACHE, get_credential
+from blob_upload import DEFAULT_BLOCK_SIZE, DEFAULT_MAX_CONCURRENCY, UploadSource, upload_blocks
+from log_sinks import LogSink
+from metrics import REGISTRY as metrics, add_metrics_arguments
 
 # Note: Install required packages:
-# pip install azure-identity azure-mgmt-monitor azure-mgmt-resource azure-storage-blob
+# pip install azure-identity azure-mgmt-monitor azure-mgmt-security azure-storage-blob
+# They are imported on first use, so --help, save and upload start fast
+
+ACTIVITY_LOG_SELECT = (
+    "eventTimestamp,level,operationName,resourceGroupName,resourceId,status,"
+    "caller,claims,eventDataId,correlationId"
+)
+
+# Incremental collection: re-query a short overlap before the high-water mark
+# to catch late-arriving events, deduplicated against IDs already seen there
+DEFAULT_STATE_FILE = ".collector_state.json"
+DEFAULT_OVERLAP_MINUTES = 15
+
+# Additional sources run alongside activity logs -> dataset name used by
+# rollups and the log store (their entries follow the generator schemas)
+SOURCE_DATASETS = {"nsg": "network", "entra": "authentication", "defender": "security"}
+
+SUBCOMMANDS = ("collect", "save", "upload")
+
+# Activity log fan-out: the lookback window is split into sub-intervals
+# fetched concurrently, each retried with backoff when throttled
+DEFAULT_WINDOW_HOURS = 6
+DEFAULT_MAX_WORKERS = 4
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRYABLE_STATUS_CODES = {429, 503}
+
+
+def split_time_range(start_time: datetime, end_time: datetime,
+                     window: timedelta) -> List[Tuple[datetime, datetime]]:
+    """
+    Split [start_time, end_time] into consecutive sub-intervals of at most window
+
+    The range is first aligned to whole seconds, the precision of the API
+    filters, so an event on an edge matches exactly the edge both adjacent
+    windows query and is kept by the later one only.
+    """
+    start_time = start_time.replace(microsecond=0)
+    end_time = end_time.replace(microsecond=0)
+    windows = []
+    window_start = start_time
+    while window_start < end_time:
+        window_end = min(window_start + window, end_time)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def format_filter_time(value: datetime) -> str:
+    """Format a UTC datetime for an activity log OData filter"""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying, honouring Retry-After when present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, RETRY_BASE_DELAY)
+
+
+def call_with_retry(func: Callable, max_retries: int = MAX_RETRIES,
+                    sleep: Callable[[float], None] = time.sleep):
+    """
+    Call func, retrying with exponential backoff when Azure throttles
+    
+    Only errors carrying a retryable status_code (429/503) are retried;
+    anything else propagates immediately.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            metrics.inc("retries_total", status=status)
+            print(f"⚠ Throttled (HTTP {status}), retrying in {delay:.1f}s...")
+            sleep(delay)
+
+
+class CollectionCheckpoint:
+    """
+    Persisted high-water mark for incremental activity log collection
+    
+    Stores the newest event timestamp collected so far plus the IDs of
+    events inside the overlap window before it, so a re-queried overlap
+    never yields duplicates.
+    """
+    
+    def __init__(self, last_timestamp: Optional[str] = None,
+                 recent_ids: Optional[Dict[str, str]] = None,
+                 overlap_minutes: int = DEFAULT_OVERLAP_MINUTES):
+        self.last_timestamp = last_timestamp
+        self.recent_ids = recent_ids or {}  # event_id -> timestamp
+        self.overlap = timedelta(minutes=overlap_minutes)
+    
+    @classmethod
+    def load(cls, path: str, overlap_minutes: int = DEFAULT_OVERLAP_MINUTES) -> "CollectionCheckpoint":
+        """Load a checkpoint from disk, or return an empty one if none exists"""
+        if not os.path.exists(path):
+            return cls(overlap_minutes=overlap_minutes)
+        with open(path) as f:
+            state = json.load(f)
+        return cls(state.get("last_timestamp"), state.get("recent_ids"), overlap_minutes)
+    
+    def save(self, path: str):
+        """Atomically write the checkpoint to disk"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"last_timestamp": self.last_timestamp, "recent_ids": self.recent_ids}, f)
+        os.replace(tmp_path, path)
+    
+    def query_start(self, default_start: datetime) -> datetime:
+        """Start of the next query: the high-water mark minus the overlap"""
+        if not self.last_timestamp:
+            return default_start
+        return max(default_start, datetime.fromisoformat(self.last_timestamp) - self.overlap)
+    
+    def filter_new(self, logs: List[Dict]) -> List[Dict]:
+        """Drop entries already collected by a previous run"""
+        return [
+            entry for entry in logs
+            if entry["timestamp"] and entry.get("event_id") not in self.recent_ids
+        ]
+    
+    def advance(self, logs: List[Dict]):
+        """Move the high-water mark past logs and prune IDs outside the overlap"""
+        for entry in logs:
+            if entry.get("event_id") and entry["timestamp"]:
+                self.recent_ids[entry["event_id"]] = entry["timestamp"]
+        
+        timestamps = [entry["timestamp"] for entry in logs if entry["timestamp"]]
+        if self.last_timestamp:
+            timestamps.append(self.last_timestamp)
+        if not timestamps:
+            return
+        
+        newest = max(timestamps, key=datetime.fromisoformat)
+        self.last_timestamp = newest
+        cutoff = datetime.fromisoformat(newest) - self.overlap
+        self.recent_ids = {
+            event_id: timestamp for event_id, timestamp in self.recent_ids.items()
+            if datetime.fromisoformat(timestamp) >= cutoff
+        }
+
 
 class AzureLogCollector:
     """Collects security logs from Azure services"""
     
-    def __init__(self, subscription_id: str, tenant_id: str = None):
+    def __init__(self, subscription_id: str, tenant_id: str = None, monitor_client=None,
+                 blob_service_client=None, project_claims: bool = False,
+                 credential=None, credential_mode: str = "auto",
+                 token_cache: Optional[str] = DEFAULT_TOKEN_CACHE):
         """
         Initialize Azure Log Collector
         
         Args:
             subscription_id: Azure subscription ID
             tenant_id: Azure tenant ID (optional, will use from env if not provided)
+            monitor_client: Pre-built monitor client (skips authentication, e.g. a local fake)
+            blob_service_client: Pre-built blob service client (e.g. Azurite or a fake)
+            project_claims: Keep only the useful claims of each entry (see activity_records)
+            credential: Pre-built credential (e.g. a fake); still goes through the token cache
+            credential_mode: One of azure_auth.CREDENTIAL_MODES, used when no credential is given
+            token_cache: Token cache file shared across runs and workers, or None to disable
         """
         self.subscription_id = subscription_id
         self.tenant_id = tenant_id or os.getenv("AZURE_TENANT_ID")
+        self._normalizer = ActivityNormalizer(project=project_claims)
+        # Optional per-request limiter (a log_sources.TokenBucket) for activity log pages
+        self.rate_limiter = None
         
-        # Use interactive browser authentication (works best for local development)
-        from azure.identity import InteractiveBrowserCredential
-        print("Using interactive browser authentication...")
-        print("A browser window will open for you to sign in to Azure.")
+        # Created on first upload and reused, so its connection pool is shared
+        self._blob_service_client = blob_service_client
+        self._blob_client_lock = threading.Lock()
         
-        # Use tenant ID if available
-        if self.tenant_id:
-            self.credential = InteractiveBrowserCredential(tenant_id=self.tenant_id)
-        else:
-            self.credential = InteractiveBrowserCredential()
+        # The SDK modules and clients are only imported and built on first use,
+        # so --help, save and upload never pay for them
+        self._credential_options = (credential_mode, token_cache)
+        self._credential = None
+        self._monitor_client = monitor_client
+        self._client_lock = threading.Lock()
+        if credential is not None:
+            self._credential = get_credential(credential_mode, self.tenant_id, token_cache, credential)
+        elif monitor_client is not None:
+            # A pre-built client (e.g. a local fake) needs no authentication
+            self._credential_options = None
+    
+    @property
+    def credential(self):
+        """
+        Credential for the selected mode, wrapped in the token cache
         
-        self.monitor_client = MonitorManagementClient(
-            self.credential, self.subscription_id
-        )
-        self.resource_client = ResourceManagementClient(
-            self.credential, self.subscription_id
-        )
+        None when a pre-built monitor client was given without a credential.
+        """
+        with self._client_lock:
+            if self._credential is None and self._credential_options is not None:
+                credential_mode, token_cache = self._credential_options
+                # Non-interactive modes for scheduled runs; "auto" only opens a
+                # browser when attached to a terminal and nothing else is configured
+                self._credential = get_credential(credential_mode, self.tenant_id, token_cache)
+            return self._credential
+    
+    @property
+    def monitor_client(self):
+        """MonitorManagementClient for the subscription, built on first use"""
+        if self._monitor_client is None:
+            credential = self.credential
+            with self._client_lock:
+                if self._monitor_client is None:
+                    from azure.mgmt.monitor import MonitorManagementClient
+                    self._monitor_client = MonitorManagementClient(credential, self.subscription_id)
+        return self._monitor_client
     
-    def collect_activity_logs(self, days: int = 7) -> List[Dict]:
+    def collect_activity_logs(self, days: int = 7, window_hours: int = DEFAULT_WINDOW_HOURS,
+                              max_workers: int = DEFAULT_MAX_WORKERS) -> List[Dict]:
         """
         Collect Azure Activity Logs
         
+        The lookback window is split into sub-intervals that are fetched
+        concurrently, then merged back in timestamp order.
+        
         Args:
             days: Number of days to look back
+            window_hours: Size of each concurrently fetched sub-interval
+            max_workers: Maximum number of sub-intervals fetched at once
             
         Returns:
             List of activity log entries
         """
         print(f"Collecting activity logs for the last {days} days...")
         
-        start_time = datetime.now(timezone.utc) - timedelta(days=days)
         end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(days=days)
         
-        filter_str = f"eventTimestamp ge '{start_time.isoformat()}Z' and eventTimestamp le '{end_time.isoformat()}Z'"
+        return self.collect_activity_logs_between(start_time, end_time, window_hours, max_workers)
+    
+    def collect_activity_logs_incremental(self, checkpoint: CollectionCheckpoint, days: int = 7,
+                                          window_hours: int = DEFAULT_WINDOW_HOURS,
+                                          max_workers: int = DEFAULT_MAX_WORKERS) -> List[Dict]:
+        """
+        Collect only activity logs newer than the checkpoint
+        
+        The checkpoint is not advanced here; call checkpoint.advance() once
+        the returned entries have been persisted.
+        
+        Args:
+            checkpoint: High-water mark from the previous run
+            days: Maximum lookback when there is no checkpoint yet
+            window_hours: Size of each concurrently fetched sub-interval
+            max_workers: Maximum number of sub-intervals fetched at once
+            
+        Returns:
+            List of new activity log entries in timestamp order
+        """
+        end_time = datetime.now(timezone.utc)
+        start_time = checkpoint.query_start(end_time - timedelta(days=days))
+        print(f"Collecting activity logs since {start_time.isoformat()}...")
+        
+        logs = self.collect_activity_logs_between(start_time, end_time, window_hours, max_workers)
+        new_logs = checkpoint.filter_new(logs)
+        print(f"✓ {len(new_logs)} new entries ({len(logs) - len(new_logs)} already collected)")
+        return new_logs
+    
+    def collect_activity_logs_between(self, start_time: datetime, end_time: datetime,
+                                      window_hours: int = DEFAULT_WINDOW_HOURS,
+                                      max_workers: int = DEFAULT_MAX_WORKERS) -> List[Dict]:
+        """
+        Collect Azure Activity Logs for an explicit time range
+        
+        Args:
+            start_time: Start of the range (timezone-aware)
+            end_time: End of the range (timezone-aware)
+            window_hours: Size of each concurrently fetched sub-interval
+            max_workers: Maximum number of sub-intervals fetched at once
+            
+        Returns:
+            List of activity log entries in timestamp order
+        """
+        logs = list(self.iter_activity_logs_between(start_time, end_time, window_hours, max_workers))
+        print(f"✓ Collected {len(logs)} activity log entries")
+        return logs
+    
+    def iter_activity_logs(self, days: int = 7, window_hours: int = DEFAULT_WINDOW_HOURS,
+                           max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[Dict]:
+        """Yield activity log entries for the last N days in timestamp order"""
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(days=days)
+        return self.iter_activity_logs_between(start_time, end_time, window_hours, max_workers)
+    
+    def iter_activity_logs_between(self, start_time: datetime, end_time: datetime,
+                                   window_hours: int = DEFAULT_WINDOW_HOURS,
+                                   max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[Dict]:
+        """
+        Yield activity log entries for a time range in timestamp order
+        
+        Windows are fetched concurrently but released in order, so at most
+        max_workers windows are held in memory at any time.
+        """
+        windows = split_time_range(start_time, end_time, timedelta(hours=window_hours))
+        
+        def fetch(index: int) -> List[Dict]:
+            window_start, window_end = windows[index]
+            is_last = index == len(windows) - 1
+            return call_with_retry(
+                lambda: self._fetch_activity_window(window_start, window_end, is_last)
+            )
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Keep only max_workers windows in flight; each is sorted locally
+            # and windows are disjoint, so yielding them in order is a
+            # globally sorted stream without a final merge sort
+            pending = deque()
+            next_index = 0
+            while pending or next_index < len(windows):
+                while next_index < len(windows) and len(pending) < max_workers:
+                    pending.append(pool.submit(fetch, next_index))
+                    next_index += 1
+                yield from pending.popleft().result()
+    
+    def _fetch_activity_window(self, start_time: datetime, end_time: datetime,
+                               is_last: bool = True) -> List[Dict]:
+        """
+        Fetch one sub-interval of activity logs, sorted by timestamp
+        
+        The API filter is inclusive at both ends, so events exactly on the
+        boundary are kept only by the later window.
+        """
+        filter_str = (
+            f"eventTimestamp ge '{format_filter_time(start_time)}' "
+            f"and eventTimestamp le '{format_filter_time(end_time)}'"
+        )
         
         logs = []
+        to_entry = self._normalizer.to_entry
         activity_logs = self.monitor_client.activity_logs.list(
             filter=filter_str,
-            select="eventTimestamp,level,operationName,resourceGroupName,resourceId,status,caller,claims"
+            select=ACTIVITY_LOG_SELECT
         )
         
-        for log in activity_logs:
-            # Handle different attribute types (string vs enum)
-            level = log.level.value if hasattr(log.level, 'value') else (log.level if log.level else None)
-            operation = log.operation_name.value if hasattr(log.operation_name, 'value') else (log.operation_name if log.operation_name else None)
-            status = log.status.value if hasattr(log.status, 'value') else (log.status if log.status else None)
-            category = log.category.value if hasattr(log.category, 'value') else (log.category if log.category else None)
-            
-            log_entry = {
-                "timestamp": log.event_timestamp.isoformat() if log.event_timestamp else None,
-                "level": level,
-                "operation": operation,
-                "resource_group": log.resource_group_name,
-                "resource_id": log.resource_id,
-                "status": status,
-                "caller": log.caller,
-                "category": category,
-                "claims": log.claims
-            }
-            logs.append(log_entry)
+        pages = activity_logs.by_page()
+        if self.rate_limiter is not None:
+            # The pager requests each page as it is advanced
+            pages = self.rate_limiter.pages(pages)
+        for page in pages:
+            metrics.inc("pages_fetched_total", source="activity")
+            for log in page:
+                if not is_last and log.event_timestamp and log.event_timestamp >= end_time:
+                    continue
+                logs.append(to_entry(log))
         
-        print(f"✓ Collected {len(logs)} activity log entries")
+        logs.sort(key=lambda entry: entry["timestamp"] or "")
         return logs
     
-    def collect_nsg_flow_logs(self, resource_group: str, nsg_name: str) -> List[Dict]:
+    def _to_log_entry(self, log) -> Dict:
+        """Convert an SDK EventData object into a plain log entry"""
+        return self._normalizer.to_entry(log)
+    
+    def collect_nsg_flow_logs(self, resource_group: str, nsg_name: str,
+                              since: Optional[datetime] = None) -> List[Dict]:
         """
         Collect Network Security Group flow logs
         
+        Reads the NSG's PT1H.json blobs from the flow log storage account
+        (AZURE_STORAGE_CONNECTION_STRING) and decodes every flow tuple into
+        the network-log schema used by the synthetic generator.
+        
         Args:
             resource_group: Resource group name
             nsg_name: NSG name
+            since: Skip blobs last modified before this time
             
         Returns:
             List of NSG flow log entries
         """
-        print(f"Collecting NSG flow logs for {nsg_name}...")
+        from log_sources import NsgFlowLogSource
         
-        # Note: This requires NSG Flow Logs to be enabled and stored
-        # Implementation depends on your storage setup
-        
-        # Placeholder - actual implementation would read from storage account
-        logs = []
-        print("✓ NSG flow logs collection (implement based on your setup)")
+        print(f"Collecting NSG flow logs for {nsg_name}...")
+        source = NsgFlowLogSource(
+            self.blob_service_client,
+            prefix=NsgFlowLogSource.blob_prefix(self.subscription_id, resource_group, nsg_name),
+            since=since
+        )
+        logs = list(source.collect())
+        print(f"✓ Collected {len(logs)} NSG flow log entries")
         return logs
     
-    def collect_azure_ad_logs(self) -> List[Dict]:
+    def collect_azure_ad_logs(self, days: int = 1) -> List[Dict]:
         """
-        Collect Azure Active Directory sign-in and audit logs
+        Collect Azure Active Directory (Entra ID) sign-in logs
         
-        Note: Requires Azure AD Premium and appropriate permissions
+        Note: Requires Azure AD Premium and AuditLog.Read.All for the
+        signed-in identity
         
+        Args:
+            days: Number of days to look back
+            
         Returns:
-            List of Azure AD log entries
+            List of sign-in entries in the authentication-log schema
         """
-        print("Collecting Azure AD logs...")
+        from log_sources import EntraSignInSource
         
-        # Note: This requires Microsoft Graph API
-        # from azure.identity import DefaultAzureCredential
-        # from msgraph.core import GraphClient
-        
-        # Placeholder - implement using Microsoft Graph API
-        logs = []
-        print("✓ Azure AD logs collection (requires Microsoft Graph API setup)")
+        print("Collecting Azure AD logs...")
+        logs = list(EntraSignInSource(self.credential, days).collect())
+        print(f"✓ Collected {len(logs)} Azure AD sign-in entries")
         return logs
     
+    @property
+    def security_client(self):
+        """Defender for Cloud client, created on first use"""
+        if getattr(self, "_security_client", None) is None:
+            from azure.mgmt.security import SecurityCenter
+            self._security_client = SecurityCenter(self.credential, self.subscription_id)
+        return self._security_client
+    
     def collect_security_alerts(self, resource_group: str = None) -> List[Dict]:
         """
-        Collect Azure Security Center alerts
+        Collect Azure Security Center (Defender for Cloud) alerts
         
         Args:
             resource_group: Optional resource group filter
             
         Returns:
-            List of security alerts
+            List of security alerts in the security-event schema
         """
+        from log_sources import DefenderAlertSource
+        
         print("Collecting Security Center alerts...")
+        alerts = list(DefenderAlertSource(self.security_client, resource_group).collect())
+        print(f"✓ Collected {len(alerts)} security alerts")
+        return alerts
+    
+    def build_sources(self, names: List[str], days: int = 7,
+                      window_hours: int = DEFAULT_WINDOW_HOURS,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      rates: Optional[Dict[str, float]] = None,
+                      resource_group: Optional[str] = None,
+                      nsg_name: Optional[str] = None) -> List:
+        """
+        Create log_sources.LogSource objects for the named sources
         
-        # Note: This requires Azure Security Center and appropriate SDK
-        # from azure.mgmt.security import SecurityCenter
+        Args:
+            names: Any of activity, nsg, entra, defender
+            days: Lookback for activity and Entra ID sources
+            window_hours: Activity log fan-out window size
+            max_workers: Activity log windows fetched at once
+            rates: Per-source request rate overrides (requests/sec)
+            resource_group: Resource group for NSG flow logs / alerts
+            nsg_name: NSG whose flow logs to read (all NSGs if omitted)
+        """
+        from log_sources import (ActivityLogSource, DefenderAlertSource,
+                                 EntraSignInSource, NsgFlowLogSource)
         
-        # Placeholder
-        alerts = []
-        print("✓ Security alerts collection (implement based on Security Center setup)")
-        return alerts
+        rates = rates or {}
+        sources = []
+        for name in names:
+            rate = rates.get(name)
+            if name == "activity":
+                sources.append(ActivityLogSource(self, days, window_hours, max_workers, rate=rate))
+            elif name == "nsg":
+                prefix = None
+                if resource_group and nsg_name:
+                    prefix = NsgFlowLogSource.blob_prefix(self.subscription_id, resource_group, nsg_name)
+                since = datetime.now(timezone.utc) - timedelta(days=days)
+                sources.append(NsgFlowLogSource(self.blob_service_client, prefix=prefix,
+                                                since=since, rate=rate))
+            elif name == "entra":
+                sources.append(EntraSignInSource(self.credential, days, rate=rate))
+            elif name == "defender":
+                sources.append(DefenderAlertSource(self.security_client, resource_group, rate=rate))
+            else:
+                raise ValueError(f"Unknown source: {name}")
+        return sources
     
-    def save_logs(self, logs: List[Dict], filename: str, format: str = "json"):
+    def save_logs(self, logs: List[Dict], filename: str, format: str = "json", append: bool = False,
+                  dataset: str = "activity"):
         """
         Save collected logs to file
         
         Args:
             logs: List of log entries
             filename: Output filename
-            format: Output format (json or csv)
+            format: Output format (json, ndjson, csv, parquet or arrow)
+            append: Append to an existing ndjson/csv file instead of rewriting it
+            dataset: Schema of the entries for parquet/arrow (activity,
+                authentication, security or network)
         """
         if not logs:
             print(f"⚠ No logs to save for {filename}")
             return
         
+        if append and format not in ("ndjson", "csv"):
+            raise ValueError("Appending requires ndjson or csv format")
+        mode = 'a' if append else 'w'
+        
         if format == "json":
-            with open(filename, 'w') as f:
-                json.dump(logs, f, indent=2, default=str)
+            with metrics.timed_write(filename, format, len(logs)):
+                with open(filename, 'w') as f:
+                    json.dump(logs, f, indent=2, default=str)
             print(f"✓ Saved {len(logs)} logs to {filename}")
         
+        elif format == "ndjson":
+            with metrics.timed_write(filename, format, len(logs)):
+                with open(filename, mode) as f:
+                    for entry in logs:
+                        f.write(json.dumps(entry, default=str))
+                        f.write("\n")
+            print(f"✓ {'Appended' if append else 'Saved'} {len(logs)} logs to {filename} (NDJSON)")
+        
+        elif format in ("parquet", "arrow"):
+            from columnar_output import write_records
+            with metrics.timed_write(filename, format, len(logs)):
+                write_records(logs, filename, dataset, format)
+        
         elif format == "csv":
             import csv
-            with open(filename, 'w', newline='') as f:
-                if logs:
+            write_header = not (append and os.path.exists(filename) and os.path.getsize(filename) > 0)
+            with metrics.timed_write(filename, format, len(logs)):
+                with open(filename, mode, newline='') as f:
                     writer = csv.DictWriter(f, fieldnames=logs[0].keys())
-                    writer.writeheader()
+                    if write_header:
+                        writer.writeheader()
                     writer.writerows(logs)
-            print(f"✓ Saved {len(logs)} logs to {filename} (CSV)")
+            print(f"✓ {'Appended' if append else 'Saved'} {len(logs)} logs to {filename} (CSV)")
+    
+    def stream_logs(self, entries: Iterable[Dict], base_path: str,
+                    formats: Tuple[str, ...] = ("ndjson", "csv"), compression: str = None,
+                    max_bytes: int = None, max_seconds: float = None) -> LogSink:
+        """
+        Stream log entries to NDJSON/CSV files without holding them in memory
+        
+        Args:
+            entries: Iterable (typically a generator) of log entries
+            base_path: Output path without extension
+            formats: Output formats to write in the same pass
+            compression: None, "gzip" or "zstd"
+            max_bytes: Rotate output files at this many uncompressed bytes
+            max_seconds: Rotate output files after this many seconds
+            
+        Returns:
+            The closed sink, exposing the written count and produced files
+        """
+        with LogSink(base_path, formats, compression=compression,
+                     max_bytes=max_bytes, max_seconds=max_seconds) as sink:
+            sink.write_all(entries)
+        # Serialization overlaps fetching here, so only volume is recorded
+        for format in formats:
+            size = sum(os.path.getsize(path) for path in sink.files if f".{format}" in path)
+            metrics.record_write(format, sink.count, size)
+        print(f"✓ Streamed {sink.count} logs to {', '.join(sink.files) or base_path}")
+        return sink
     
-    def upload_to_blob_storage(self, container_name: str, blob_name: str, data: str):
+    @property
+    def blob_service_client(self):
+        """
+        Pooled BlobServiceClient built from AZURE_STORAGE_CONNECTION_STRING
+        
+        Returns None if no connection string is configured.
+        """
+        with self._blob_client_lock:
+            if self._blob_service_client is None:
+                connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+                if not connection_string:
+                    return None
+                from azure.storage.blob import BlobServiceClient
+                self._blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+            return self._blob_service_client
+    
+    def upload_to_blob_storage(self, container_name: str, blob_name: str, data: UploadSource,
+                               block_size: int = DEFAULT_BLOCK_SIZE,
+                               max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> bool:
         """
         Upload data to Azure Blob Storage
         
+        Data is staged as blocks in parallel and committed as one block blob,
+        so large files and generators are never held in memory whole.
+        
         Args:
             container_name: Storage container name
             blob_name: Blob name
-            data: Data to upload
+            data: str, bytes, binary file object, or iterable of str/bytes chunks
+            block_size: Bytes per staged block
+            max_concurrency: Blocks staged in parallel
+            
+        Returns:
+            True if the upload succeeded
         """
-        from azure.storage.blob import BlobServiceClient
+        if isinstance(data, str):
+            data = data.encode()
         
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if not connection_string:
+        blob_service_client = self.blob_service_client
+        if blob_service_client is None:
             print("⚠ AZURE_STORAGE_CONNECTION_STRING not set")
-            return
+            return False
         
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
             blob_client = blob_service_client.get_blob_client(
                 container=container_name, blob=blob_name
             )
-            blob_client.upload_blob(data, overwrite=True)
-            print(f"✓ Uploaded to Azure Blob Storage: {container_name}/{blob_name}")
+            size = upload_blocks(blob_client, data, block_size, max_concurrency)
+            metrics.inc("bytes_uploaded_total", size, container=container_name)
+            print(f"✓ Uploaded {size} bytes to Azure Blob Storage: {container_name}/{blob_name}")
+            return True
         except Exception as e:
             print(f"✗ Failed to upload to blob storage: {e}")
+            return False
+    
+    def upload_files(self, container_name: str, paths: List[str], prefix: str,
+                     block_size: int = DEFAULT_BLOCK_SIZE,
+                     max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> List[str]:
+        """
+        Upload local files (e.g. rotated sink output) under a blob prefix
+        
+        Args:
+            container_name: Storage container name
+            paths: Local file paths
+            prefix: Blob name prefix, e.g. "logs/20250101_120000"
+            block_size: Bytes per staged block
+            max_concurrency: Blocks staged in parallel per file
+            
+        Returns:
+            Blob names that were uploaded successfully
+        """
+        uploaded = []
+        for path in paths:
+            blob_name = f"{prefix}/{os.path.basename(path)}"
+            with open(path, 'rb') as f:
+                if self.upload_to_blob_storage(container_name, blob_name, f, block_size, max_concurrency):
+                    uploaded.append(blob_name)
+        return uploaded
 
 
-def main():
-    """Main execution function"""
-    import sys
-    from dotenv import load_dotenv
+def add_auth_arguments(parser):
+    """--auth / --token-cache / --no-token-cache, shared with collector_daemon.py"""
+    parser.add_argument("--auth", choices=CREDENTIAL_MODES,
+                        default=os.getenv("AZURE_CREDENTIAL_MODE", "auto"),
+                        help="Credential mode: workload/managed identity, service principal secret, "
+                             "environment, Azure CLI, default chain or interactive browser "
+                             "(default: auto, picked from the environment)")
+    parser.add_argument("--token-cache", default=os.getenv("AZURE_TOKEN_CACHE", DEFAULT_TOKEN_CACHE),
+                        help="Access token cache file shared by runs and workers")
+    parser.add_argument("--no-token-cache", action="store_true",
+                        help="Always acquire new tokens")
+
+
+def add_validation_arguments(parser):
+    """--no-validate / --dedup / --dedup-horizon-hours / --rejects, shared with collector_daemon.py"""
+    parser.add_argument("--no-validate", action="store_true",
+                        help="Save entries without schema validation and deduplication")
+    parser.add_argument("--dedup", choices=["set", "bloom"], default="set",
+                        help="Duplicate detector: exact hash set or compact Bloom filters (default: set)")
+    parser.add_argument("--dedup-horizon-hours", type=float, default=24,
+                        help="Hours of event time remembered for deduplication (default: 24)")
+    parser.add_argument("--rejects",
+                        help="Append entries that fail validation, with the reason, to this NDJSON file")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    """
+    Parse command line arguments
     
-    # Load environment variables from .env file
-    load_dotenv()
+    Subcommands: collect (the default when none is given), save and upload.
+    """
+    import argparse
+    
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in SUBCOMMANDS and argv[0] not in ("-h", "--help")):
+        # Plain `azure_log_collector.py [options]` keeps meaning collect
+        argv.insert(0, "collect")
+    
+    uploads = argparse.ArgumentParser(add_help=False)
+    uploads.add_argument("--block-size-mb", type=float, default=DEFAULT_BLOCK_SIZE / (1024 * 1024),
+                         help="Block size for chunked blob uploads")
+    uploads.add_argument("--upload-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                         help="Blocks staged in parallel per blob upload")
+    
+    parser = argparse.ArgumentParser(description="Collect security logs from Azure")
+    subparsers = parser.add_subparsers(dest="command", metavar="{collect,save,upload}")
+    
+    collect = subparsers.add_parser(
+        "collect", parents=[uploads],
+        help="Collect logs from Azure and save them locally (default)",
+        description="Collect logs from Azure and save them locally; uploads too when "
+                    "UPLOAD_TO_STORAGE=true"
+    )
+    collect.add_argument("--days", type=int, default=7,
+                        help="Days to look back (maximum lookback in incremental mode)")
+    collect.add_argument("--incremental", action="store_true",
+                        help="Only fetch events newer than the saved checkpoint and append them")
+    collect.add_argument("--state-file", default=DEFAULT_STATE_FILE,
+                        help=f"Checkpoint file for incremental mode (default: {DEFAULT_STATE_FILE})")
+    collect.add_argument("--stream", action="store_true",
+                        help="Stream entries to NDJSON/CSV as they are fetched (flat memory)")
+    collect.add_argument("--compression", choices=["gzip", "zstd"],
+                        help="Compress streamed output files")
+    collect.add_argument("--columnar", nargs="+", choices=["parquet", "arrow"],
+                        help="Also write typed Parquet and/or Arrow IPC files in stream mode")
+    collect.add_argument("--rotate-mb", type=float,
+                        help="Rotate streamed output files at this size (uncompressed MB)")
+    collect.add_argument("--rotate-minutes", type=float,
+                        help="Rotate streamed output files after this many minutes")
+    collect.add_argument("--sources", nargs="+", default=[], choices=sorted(SOURCE_DATASETS),
+                        help="Also collect these sources concurrently with activity logs")
+    collect.add_argument("--rate-limit", action="append", default=[], metavar="SOURCE=RATE",
+                        help="Requests per second for a source, e.g. entra=2 (repeatable)")
+    collect.add_argument("--resource-group", help="Resource group for NSG flow logs and alerts")
+    collect.add_argument("--nsg-name", help="NSG whose flow logs to read (default: all)")
+    add_auth_arguments(collect)
+    collect.add_argument("--project-claims", action="store_true",
+                        help="Keep only the useful claims fields of each entry instead of all 40+")
+    collect.add_argument("--rollup",
+                        help="Merge this run's aggregates into this rollup JSON file (see rollups.py)")
+    collect.add_argument("--store",
+                        help="Also ingest collected entries into this SQLite log store (see log_store.py)")
+    add_validation_arguments(collect)
+    add_metrics_arguments(collect)
+    collect.add_argument("--window-hours", type=int, default=DEFAULT_WINDOW_HOURS,
+                        help="Size of each concurrently fetched time window")
+    collect.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Maximum concurrent time windows")
+    
+    save = subparsers.add_parser(
+        "save", help="Convert collected logs to another format (no Azure access)",
+        description="Re-save a collected .json/.ndjson(.gz/.zst) file as json, ndjson, csv, "
+                    "parquet or arrow"
+    )
+    save.add_argument("input", help="Collected log file")
+    save.add_argument("outputs", nargs="+", help="Output files; the format follows the extension")
     
+    upload = subparsers.add_parser(
+        "upload", parents=[uploads],
+        help="Upload collected files to blob storage (needs only AZURE_STORAGE_CONNECTION_STRING)",
+        description="Upload local files to Azure Blob Storage under a timestamped prefix"
+    )
+    upload.add_argument("paths", nargs="+", help="Files to upload")
+    upload.add_argument("--container", default="security-data", help="Storage container name")
+    upload.add_argument("--prefix", help="Blob name prefix (default: logs/<timestamp>)")
+    args = parser.parse_args(argv)
+    
+    if args.command == "collect":
+        rates = {}
+        for item in args.rate_limit:
+            name, _, rate = item.partition("=")
+            if name != "activity" and name not in SOURCE_DATASETS:
+                collect.error(f"--rate-limit: unknown source {name!r} in {item!r}")
+            try:
+                rates[name] = float(rate)
+            except ValueError:
+                collect.error(f"--rate-limit expects SOURCE=RATE, got {item!r}")
+        args.rate_limit = rates
+        if args.incremental:
+            streaming = [option for option, value in (
+                ("--stream", args.stream), ("--compression", args.compression),
+                ("--columnar", args.columnar), ("--rotate-mb", args.rotate_mb),
+                ("--rotate-minutes", args.rotate_minutes)) if value]
+            if streaming:
+                collect.error(f"--incremental appends plain NDJSON/CSV and cannot be combined "
+                              f"with {', '.join(streaming)}")
+    return args
+
+
+def collect(args):
+    """collect subcommand: fetch logs from Azure and save them locally"""
     # Check for Azure credentials
     subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
     
@@ -249,41 +825,229 @@ def main():
     
     print("")
     
+    metrics.configure(pipeline="collector", profile_dir=args.profile)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    
+    rejects = open(args.rejects, 'a') if args.rejects and not args.no_validate else None
     try:
         tenant_id = os.getenv("AZURE_TENANT_ID")
-        collector = AzureLogCollector(subscription_id, tenant_id)
+        collector = AzureLogCollector(
+            subscription_id, tenant_id, project_claims=args.project_claims,
+            credential_mode=args.auth,
+            token_cache=None if args.no_token_cache else args.token_cache
+        )
+        
+        def validator(dataset: str):
+            """Validation/dedup stage ahead of save_logs (None with --no-validate)"""
+            if args.no_validate:
+                return None
+            from validation import Deduplicator, ValidationStage
+            return ValidationStage(
+                dataset, Deduplicator(args.dedup_horizon_hours, method=args.dedup), rejects=rejects
+            )
+        
+        def validate(entries: List[Dict], dataset: str, source: str) -> List[Dict]:
+            stage = validator(dataset)
+            if stage is None:
+                return entries
+            with metrics.stage("validate", source=source) as timer:
+                entries = stage.filter(entries)
+                timer.records = stage.processed
+            print(f"✓ {stage.summary()}")
+            return entries
+        
+        from rollups import Rollup
+        if args.rollup and os.path.exists(args.rollup):
+            # Earlier runs' aggregates; new entries are folded in without rescanning
+            rollup = Rollup.load(args.rollup)
+        else:
+            rollup = Rollup()
+        
+        # Other sources run in the background while activity logs are collected
+        if "activity" in args.rate_limit:
+            from log_sources import TokenBucket
+            collector.rate_limiter = TokenBucket(args.rate_limit["activity"])
+        scheduler = None
+        if args.sources:
+            from log_sources import SourceScheduler
+            sources = collector.build_sources(args.sources, args.days, rates=args.rate_limit,
+                                              resource_group=args.resource_group,
+                                              nsg_name=args.nsg_name)
+            scheduler = SourceScheduler(sources).start()
         
         # Collect Activity Logs
-        activity_logs = collector.collect_activity_logs(days=7)
-        collector.save_logs(activity_logs, "azure_activity_logs.json")
-        collector.save_logs(activity_logs, "azure_activity_logs.csv", format="csv")
+        if args.incremental:
+            checkpoint = CollectionCheckpoint.load(args.state_file)
+            with metrics.stage("fetch", source="activity") as stage:
+                activity_logs = collector.collect_activity_logs_incremental(
+                    checkpoint, args.days, args.window_hours, args.max_workers
+                )
+                stage.records = len(activity_logs)
+            activity_logs = validate(activity_logs, "activity", "activity")
+            with metrics.stage("save", source="activity") as stage:
+                collector.save_logs(activity_logs, "azure_activity_logs.ndjson", format="ndjson", append=True)
+                collector.save_logs(activity_logs, "azure_activity_logs.csv", format="csv", append=True)
+                stage.records = len(activity_logs)
+            # Only advance the high-water mark once the entries are on disk
+            checkpoint.advance(activity_logs)
+            checkpoint.save(args.state_file)
+            rollup.add_all(activity_logs, "activity")
+            collected = len(activity_logs)
+        elif args.stream:
+            # Fetching, validation and writing overlap, so they are one stage
+            entries = collector.iter_activity_logs(args.days, args.window_hours, args.max_workers)
+            stream_validator = validator("activity")
+            if stream_validator is not None:
+                entries = stream_validator.process(entries)
+            with metrics.stage("stream", source="activity") as stage:
+                sink = collector.stream_logs(
+                    rollup.observe(entries, "activity"),
+                    "azure_activity_logs",
+                    formats=("ndjson", "csv") + tuple(args.columnar or ()),
+                    compression=args.compression,
+                    max_bytes=int(args.rotate_mb * 1024 * 1024) if args.rotate_mb else None,
+                    max_seconds=args.rotate_minutes * 60 if args.rotate_minutes else None
+                )
+                stage.records = sink.count
+            if stream_validator is not None:
+                print(f"✓ {stream_validator.summary()}")
+            collected = sink.count
+        else:
+            with metrics.stage("fetch", source="activity") as stage:
+                activity_logs = collector.collect_activity_logs(
+                    args.days, args.window_hours, args.max_workers
+                )
+                stage.records = len(activity_logs)
+            activity_logs = validate(activity_logs, "activity", "activity")
+            with metrics.stage("save", source="activity") as stage:
+                collector.save_logs(activity_logs, "azure_activity_logs.json")
+                collector.save_logs(activity_logs, "azure_activity_logs.csv", format="csv")
+                stage.records = len(activity_logs)
+            rollup.add_all(activity_logs, "activity")
+            collected = len(activity_logs)
+        
+        # Collect other logs
+        source_results = scheduler.join() if scheduler else []
+        for result in source_results:
+            if result.entries:
+                result.entries = validate(result.entries, SOURCE_DATASETS[result.source.name],
+                                          result.source.name)
+            if result.entries:
+                name = result.source.output_name
+                dataset = SOURCE_DATASETS[result.source.name]
+                with metrics.stage("save", source=result.source.name) as stage:
+                    collector.save_logs(result.entries, f"{name}.json", dataset=dataset)
+                    collector.save_logs(result.entries, f"{name}.csv", format="csv", dataset=dataset)
+                    stage.records = len(result.entries)
+                rollup.add_all(result.entries, dataset)
         
-        # Collect other logs as needed
-        # Note: Implement based on your Azure setup
+        if args.store:
+            from log_store import LogStore
+            with metrics.stage("store") as stage, LogStore(args.store) as store:
+                for result in source_results:
+                    if result.entries:
+                        store.ingest(result.entries, SOURCE_DATASETS[result.source.name])
+                        stage.records += len(result.entries)
+                if collected:
+                    if args.stream:
+                        for path in sink.files:
+                            if ".ndjson" in path:
+                                store.ingest_file(path, "activity")
+                    else:
+                        inserted = store.ingest(activity_logs, "activity")
+                        print(f"✓ Stored {inserted} new entries in {args.store}")
+                    stage.records += collected
         
         print("\n" + "=" * 60)
         print("Log Collection Complete!")
         print("=" * 60)
-        print(f"Total activity logs collected: {len(activity_logs)}")
+        print(f"Total activity logs collected: {collected}")
+        rollup.print_insights()
+        if args.rollup:
+            rollup.save(args.rollup)
+            print(f"✓ Saved rollup to {args.rollup}")
         
         # Optional: Upload to Azure Storage
         upload_to_storage = os.getenv("UPLOAD_TO_STORAGE", "false").lower() == "true"
-        if upload_to_storage and activity_logs:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            blob_name = f"logs/activity_logs_{timestamp}.json"
-            collector.upload_to_blob_storage(
-                "security-data",
-                blob_name,
-                json.dumps(activity_logs, indent=2, default=str)
-            )
+        if upload_to_storage and collected:
+            with metrics.stage("upload"):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                block_size = int(args.block_size_mb * 1024 * 1024)
+                if args.stream:
+                    # Upload the NDJSON files already written, no re-serialization
+                    collector.upload_files(
+                        "security-data",
+                        [path for path in sink.files if ".ndjson" in path],
+                        f"logs/{timestamp}",
+                        block_size,
+                        args.upload_concurrency
+                    )
+                else:
+                    blob_name = f"logs/activity_logs_{timestamp}.json"
+                    collector.upload_to_blob_storage(
+                        "security-data",
+                        blob_name,
+                        json.dumps(activity_logs, indent=2, default=str),
+                        block_size,
+                        args.upload_concurrency
+                    )
         
     except Exception as e:
         print(f"\n✗ Error collecting logs: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if rejects:
+            rejects.close()
+        # Written on failure too, so a scrape shows how far the run got
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+
+
+def save(args):
+    """save subcommand: re-save a collected file in other formats, no Azure access"""
+    from log_store import infer_dataset, iter_records
+    
+    logs = list(iter_records(args.input))
+    dataset = infer_dataset(logs[0]) if logs else "activity"
+    collector = AzureLogCollector(os.getenv("AZURE_SUBSCRIPTION_ID", ""))
+    for output in args.outputs:
+        extension = output.rsplit(".", 1)[-1].lower()
+        format = {"feather": "arrow", "ipc": "arrow"}.get(extension, extension)
+        if format not in ("json", "ndjson", "csv", "parquet", "arrow"):
+            print(f"✗ Unknown output format for {output}")
+            sys.exit(1)
+        collector.save_logs(logs, output, format=format, dataset=dataset)
+
+
+def upload(args):
+    """upload subcommand: upload local files to blob storage"""
+    prefix = args.prefix or f"logs/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    collector = AzureLogCollector(os.getenv("AZURE_SUBSCRIPTION_ID", ""))
+    uploaded = collector.upload_files(
+        args.container,
+        args.paths,
+        prefix,
+        int(args.block_size_mb * 1024 * 1024),
+        args.upload_concurrency
+    )
+    if len(uploaded) < len(args.paths):
+        sys.exit(1)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main execution function"""
+    from dotenv import load_dotenv
+    
+    args = parse_args(argv)
+    
+    # Load environment variables from .env file
+    load_dotenv()
+    
+    {"collect": collect, "save": save, "upload": upload}[args.command](args)
 
 
 if __name__ == "__main__":
     main()
-
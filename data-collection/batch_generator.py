@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Vectorized Batch Generator for Zero-Trust Cloud Lab
+Draws synthetic security records column-wise with NumPy for high-volume datasets
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from risk_scoring import DEFAULT_RULES
+from synthetic_data_generator import (
+    ACTIONS, EVENT_TYPES, HOME_IP_PROBABILITY, HOME_IPS, IP_ADDRESSES,
+    LOCATIONS, MIN_SUCCESS_PROBABILITY, RESOURCES, SERVER_IPS, THREAT_TYPES, USER_AGENTS, USER_FLOW_PROBABILITY, USERNAMES
+)
+
+DEFAULT_BLOCK_SIZE = 65536
+
+AUTH_METHODS = np.array(["password", "mfa", "sso", "biometric"], dtype=object)
+AUTH_METHOD_WEIGHTS = [0.5, 0.25, 0.15, 0.1]
+RISK_LEVELS = np.array(["low", "medium", "high"], dtype=object)
+FAILURE_REASONS = np.array(
+    ["invalid_password", "account_locked", "expired_token", "invalid_mfa"], dtype=object
+)
+SEVERITIES = np.array(["low", "medium", "high", "critical"], dtype=object)
+META_PROTOCOLS = np.array(["HTTPS", "HTTP", "SSH", "RDP"], dtype=object)
+NET_PROTOCOLS = np.array(["TCP", "UDP", "ICMP"], dtype=object)
+NET_PROTOCOL_WEIGHTS = [0.7, 0.2, 0.1]
+DESTINATION_PORTS = np.array([80, 443, 22, 3389, 5432, 3306])
+SUSPICIOUS_FLAGS = ["SYN_FLOOD", "PORT_SCAN", "DDoS_ATTEMPT"]
+
+_HEX_PAIRS = np.array([f"{i:02x}" for i in range(256)], dtype="S2")
+_UUID_HEX_POSITIONS = np.array(
+    [i for i in range(36) if i not in (8, 13, 18, 23)]
+)
+
+
+def _as_objects(values: List) -> np.ndarray:
+    """Build an object array for fast fancy-indexed categorical lookups"""
+    return np.array(values, dtype=object)
+
+
+_USERNAMES = _as_objects(USERNAMES)
+_USER_AGENTS = _as_objects(USER_AGENTS)
+_IP_ADDRESSES = _as_objects(IP_ADDRESSES)
+_SERVER_IPS = _as_objects(SERVER_IPS)
+_HOME_IPS = _as_objects([HOME_IPS[username] for username in USERNAMES])
+_LOCATIONS = _as_objects(LOCATIONS)
+_RESOURCES = _as_objects(RESOURCES)
+_ACTIONS = _as_objects(ACTIONS)
+_EVENT_TYPES = _as_objects(EVENT_TYPES)
+_THREAT_TYPES = _as_objects(THREAT_TYPES + [None])
+_EVENT_TYPE_RISK = np.array([
+    DEFAULT_RULES.event_type_weights.get(event_type, DEFAULT_RULES.default_weight)
+    for event_type in EVENT_TYPES
+], dtype=float)
+
+
+def uuid4_strings(rng: np.random.Generator, n: int) -> np.ndarray:
+    """
+    Draw n random version-4 UUIDs and format them without a Python loop
+
+    Args:
+        rng: NumPy random generator
+        n: Number of UUIDs
+
+    Returns:
+        Array of canonical UUID strings
+    """
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return format_uuids(raw)
+
+
+def format_uuids(raw: np.ndarray) -> np.ndarray:
+    """Format an (n, 16) uint8 array as canonical lowercase UUID strings"""
+    n = len(raw)
+    hex_chars = _HEX_PAIRS[raw].view("S1").reshape(n, 32)
+    formatted = np.full((n, 36), b"-", dtype="S1")
+    formatted[:, _UUID_HEX_POSITIONS] = hex_chars
+    return formatted.view("S36").ravel().astype(str)
+
+
+class TimestampCursor:
+    """
+    Draws sorted timestamps block by block over a fixed window
+
+    Uses the Dirichlet spacing construction: the next block of b order
+    statistics out of the remaining R uniforms is a normalized cumulative sum
+    of exponentials, with a single Gamma draw standing in for the rest, so
+    blocks come out in global timestamp order without a final sort.
+    """
+
+    def __init__(self, num_records: int, start: datetime, end: datetime):
+        self.remaining = num_records
+        self.position = 0.0
+        self.start_us = np.datetime64(start, "us")
+        self.span_us = (end - start) / timedelta(microseconds=1)
+
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Return the next n timestamps as datetime64[us], in ascending order"""
+        spacings = np.cumsum(rng.standard_exponential(n))
+        rest = rng.gamma(self.remaining - n + 1)
+        fractions = self.position + (1.0 - self.position) * spacings / (spacings[-1] + rest)
+        self.position = fractions[-1]
+        self.remaining -= n
+        return self.start_us + (fractions * self.span_us).astype("timedelta64[us]")
+
+
+class BatchGenerator:
+    """Generates synthetic security datasets as columnar NumPy blocks"""
+
+    def __init__(self, seed: Optional[int] = None, days_ago: int = 30,
+                 end_time: Optional[datetime] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Initialize the batch generator
+
+        Args:
+            seed: Seed for the NumPy random generator (random if omitted)
+            days_ago: Days of history to cover
+            end_time: End of the generated window (defaults to now)
+            block_size: Number of records drawn per block
+        """
+        self.rng = np.random.default_rng(seed)
+        self.end_time = end_time or datetime.now()
+        self.start_time = self.end_time - timedelta(days=days_ago)
+        self.block_size = block_size
+        # Drawn first, so generators built with the same seed share user IDs
+        # across datasets, like default_user_ids() in the per-record generator
+        self.user_ids = uuid4_strings(self.rng, len(USERNAMES)).astype(object)
+
+    def _blocks(self, num_records: int) -> Iterator[tuple]:
+        """Yield (size, timestamps) for each block of a dataset"""
+        cursor = TimestampCursor(num_records, self.start_time, self.end_time)
+        produced = 0
+        while produced < num_records:
+            size = min(self.block_size, num_records - produced)
+            yield size, cursor.draw(self.rng, size)
+            produced += size
+
+    def _user_ips(self, users: np.ndarray) -> np.ndarray:
+        """Each user's home IP, or any address for the remaining share"""
+        n = len(users)
+        away = self.rng.random(n) >= HOME_IP_PROBABILITY
+        ips = _HOME_IPS[users]
+        ips[away] = _IP_ADDRESSES[self.rng.integers(0, len(IP_ADDRESSES), size=int(away.sum()))]
+        return ips
+
+    def authentication_columns(self, n: int, timestamps: np.ndarray,
+                               failed_attempts: List[int]) -> Dict[str, np.ndarray]:
+        """
+        Draw one block of authentication log columns
+
+        failed_attempts carries each user's consecutive failures across
+        blocks; it is the only sequential dependency and is resolved in a
+        tight scalar loop over pre-drawn uniforms.
+        """
+        rng = self.rng
+        users = rng.integers(0, len(USERNAMES), size=n)
+        draws = rng.random(n)
+
+        success = np.empty(n, dtype=bool)
+        for i, (user, draw) in enumerate(zip(users.tolist(), draws.tolist())):
+            ok = draw < max(0.8 - failed_attempts[user] * 0.1, MIN_SUCCESS_PROBABILITY)
+            success[i] = ok
+            failed_attempts[user] = 0 if ok else failed_attempts[user] + 1
+
+        mfa_required = success & (rng.random(n) < 0.3)
+
+        # Risk level depends on outcome: failure, MFA login or plain login
+        risk_draw = rng.random(n)
+        risk_level = np.where(
+            ~success,
+            np.where(risk_draw < 0.6, 2, 1),
+            np.where(
+                mfa_required,
+                np.where(risk_draw < 0.7, 0, 1),
+                np.select([risk_draw < 0.7, risk_draw < 0.9], [0, 1], 2)
+            )
+        )
+        failure_reason = FAILURE_REASONS[rng.integers(0, len(FAILURE_REASONS), size=n)]
+        failure_reason[success] = None
+
+        return {
+            "log_id": uuid4_strings(rng, n),
+            "timestamp": np.datetime_as_string(timestamps, unit="us"),
+            "user_id": self.user_ids[users],
+            "username": _USERNAMES[users],
+            "authentication_method": AUTH_METHODS[
+                rng.choice(len(AUTH_METHODS), size=n, p=AUTH_METHOD_WEIGHTS)
+            ],
+            "source_ip": self._user_ips(users),
+            "location": _LOCATIONS[rng.integers(0, len(LOCATIONS), size=n)],
+            "device_info": _USER_AGENTS[rng.integers(0, len(USER_AGENTS), size=n)],
+            "success": success,
+            "risk_level": RISK_LEVELS[risk_level],
+            "mfa_status": np.where(mfa_required, "verified", "not_required").astype(object),
+            "failure_reason": failure_reason,
+        }
+
+    def security_columns(self, n: int, timestamps: np.ndarray) -> Dict[str, np.ndarray]:
+        """Draw one block of security event columns"""
+        rng = self.rng
+        event_type = rng.integers(0, len(EVENT_TYPES), size=n)
+        users = rng.integers(0, len(USERNAMES), size=n)
+        is_incident = rng.random(n) < 0.15
+
+        threat_type = np.where(
+            is_incident, rng.integers(0, len(THREAT_TYPES), size=n), len(THREAT_TYPES)
+        )
+        severity = np.where(is_incident, rng.integers(2, 4, size=n), rng.integers(0, 2, size=n))
+        blocked = is_incident & (rng.random(n) < 0.7)
+
+        # Same rules as calculate_risk_score; security events carry no
+        # success flag or location, so only event type and hour apply
+        rules = DEFAULT_RULES
+        hours = (timestamps.astype("datetime64[h]") - timestamps.astype("datetime64[D]")).astype(int)
+        night = (hours < rules.night_end_hour) | (hours > rules.night_start_hour)
+        risk_score = np.minimum(
+            _EVENT_TYPE_RISK[event_type] + np.where(night, rules.night_weight, 0.0), rules.max_score
+        )
+
+        return {
+            "event_id": uuid4_strings(rng, n),
+            "timestamp": np.datetime_as_string(timestamps, unit="us"),
+            "event_type": _EVENT_TYPES[event_type],
+            "severity": SEVERITIES[severity],
+            "source_ip": self._user_ips(users),
+            "destination_ip": _IP_ADDRESSES[rng.integers(0, len(IP_ADDRESSES), size=n)],
+            "user_id": self.user_ids[users],
+            "resource": _RESOURCES[rng.integers(0, len(RESOURCES), size=n)],
+            "action": _ACTIONS[rng.integers(0, len(ACTIONS), size=n)],
+            "result": np.where(blocked, "blocked", "allowed").astype(object),
+            "threat_type": _THREAT_TYPES[threat_type],
+            "bytes_transferred": rng.integers(100, 1000001, size=n),
+            "duration_ms": rng.integers(10, 5001, size=n),
+            "protocol": META_PROTOCOLS[rng.integers(0, len(META_PROTOCOLS), size=n)],
+            "risk_score": risk_score,
+        }
+
+    def network_columns(self, n: int, timestamps: np.ndarray) -> Dict[str, np.ndarray]:
+        """Draw one block of network log columns"""
+        rng = self.rng
+        source_ip = np.where(
+            rng.random(n) < USER_FLOW_PROBABILITY,
+            _HOME_IPS[rng.integers(0, len(USERNAMES), size=n)],
+            _SERVER_IPS[rng.integers(0, len(SERVER_IPS), size=n)]
+        )
+        return {
+            "log_id": uuid4_strings(rng, n),
+            "timestamp": np.datetime_as_string(timestamps, unit="us"),
+            "protocol": NET_PROTOCOLS[rng.choice(len(NET_PROTOCOLS), size=n, p=NET_PROTOCOL_WEIGHTS)],
+            "source_ip": source_ip,
+            "source_port": rng.integers(1024, 65536, size=n),
+            "destination_ip": _IP_ADDRESSES[rng.integers(0, len(IP_ADDRESSES), size=n)],
+            "destination_port": DESTINATION_PORTS[rng.integers(0, len(DESTINATION_PORTS), size=n)],
+            "bytes_sent": rng.integers(64, 100001, size=n),
+            "bytes_received": rng.integers(64, 100001, size=n),
+            "packets": rng.integers(1, 1001, size=n),
+            "suspicious": rng.random(n) < 0.1,
+            "session_duration": rng.integers(1, 3601, size=n),
+        }
+
+    def iter_authentication_blocks(self, num_records: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield authentication log column blocks in timestamp order"""
+        failed_attempts = [0] * len(USERNAMES)
+        for size, timestamps in self._blocks(num_records):
+            yield self.authentication_columns(size, timestamps, failed_attempts)
+
+    def iter_security_blocks(self, num_records: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield security event column blocks in timestamp order"""
+        for size, timestamps in self._blocks(num_records):
+            yield self.security_columns(size, timestamps)
+
+    def iter_network_blocks(self, num_records: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield network log column blocks in timestamp order"""
+        for size, timestamps in self._blocks(num_records):
+            yield self.network_columns(size, timestamps)
+
+
+def authentication_records(columns: Dict[str, np.ndarray]) -> Iterator[Dict]:
+    """Materialize an authentication column block into log dicts"""
+    keys = list(columns)
+    for values in zip(*(columns[key].tolist() for key in keys)):
+        yield dict(zip(keys, values))
+
+
+def security_records(columns: Dict[str, np.ndarray]) -> Iterator[Dict]:
+    """Materialize a security event column block into event dicts"""
+    for row in zip(
+        columns["event_id"].tolist(), columns["timestamp"].tolist(),
+        columns["event_type"].tolist(), columns["severity"].tolist(),
+        columns["source_ip"].tolist(), columns["destination_ip"].tolist(),
+        columns["user_id"].tolist(), columns["resource"].tolist(),
+        columns["action"].tolist(), columns["result"].tolist(),
+        columns["threat_type"].tolist(), columns["bytes_transferred"].tolist(),
+        columns["duration_ms"].tolist(), columns["protocol"].tolist(),
+        columns["risk_score"].tolist(),
+    ):
+        yield {
+            "event_id": row[0],
+            "timestamp": row[1],
+            "event_type": row[2],
+            "severity": row[3],
+            "source_ip": row[4],
+            "destination_ip": row[5],
+            "user_id": row[6],
+            "resource": row[7],
+            "action": row[8],
+            "result": row[9],
+            "threat_type": row[10],
+            "metadata": {
+                "bytes_transferred": row[11],
+                "duration_ms": row[12],
+                "protocol": row[13]
+            },
+            "risk_score": row[14]
+        }
+
+
+def network_records(columns: Dict[str, np.ndarray]) -> Iterator[Dict]:
+    """Materialize a network log column block into log dicts"""
+    for row in zip(
+        columns["log_id"].tolist(), columns["timestamp"].tolist(),
+        columns["protocol"].tolist(), columns["source_ip"].tolist(),
+        columns["source_port"].tolist(), columns["destination_ip"].tolist(),
+        columns["destination_port"].tolist(), columns["bytes_sent"].tolist(),
+        columns["bytes_received"].tolist(), columns["packets"].tolist(),
+        columns["suspicious"].tolist(), columns["session_duration"].tolist(),
+    ):
+        yield {
+            "log_id": row[0],
+            "timestamp": row[1],
+            "protocol": row[2],
+            "source_ip": row[3],
+            "source_port": row[4],
+            "destination_ip": row[5],
+            "destination_port": row[6],
+            "bytes_sent": row[7],
+            "bytes_received": row[8],
+            "packets": row[9],
+            "action": "deny" if row[10] else "allow",
+            "flags": list(SUSPICIOUS_FLAGS) if row[10] else [],
+            "session_duration": row[11]
+        }
+
+
+def iter_authentication_records(num_records: int = 1000, **kwargs) -> Iterator[Dict]:
+    """Yield authentication logs generated in vectorized blocks"""
+    generator = BatchGenerator(**kwargs)
+    for columns in generator.iter_authentication_blocks(num_records):
+        yield from authentication_records(columns)
+
+
+def iter_security_records(num_records: int = 500, **kwargs) -> Iterator[Dict]:
+    """Yield security events generated in vectorized blocks"""
+    generator = BatchGenerator(**kwargs)
+    for columns in generator.iter_security_blocks(num_records):
+        yield from security_records(columns)
+
+
+def iter_network_records(num_records: int = 2000, **kwargs) -> Iterator[Dict]:
+    """Yield network logs generated in vectorized blocks"""
+    generator = BatchGenerator(**kwargs)
+    for columns in generator.iter_network_blocks(num_records):
+        yield from network_records(columns)
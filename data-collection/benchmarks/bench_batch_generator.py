@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized batch generator vs. per-record generator functions
+Reports records/sec for each dataset
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import batch_generator  # noqa: E402
+import synthetic_data_generator as sdg  # noqa: E402
+
+DATASETS = [
+    ("authentication", sdg.generate_authentication_log, batch_generator.iter_authentication_records),
+    ("security", sdg.generate_security_events, batch_generator.iter_security_records),
+    ("network", sdg.generate_network_logs, batch_generator.iter_network_records),
+]
+
+
+def records_per_second(func, num_records: int) -> float:
+    """Time a callable producing num_records and return its throughput"""
+    start = time.perf_counter()
+    func(num_records)
+    return num_records / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'dataset':<16}{'per-record/s':>16}{'batch dicts/s':>16}{'batch columns/s':>18}")
+    for name, scalar_func, batch_func in DATASETS:
+        scalar_rate = records_per_second(scalar_func, args.records)
+        dict_rate = records_per_second(lambda n: list(batch_func(n, seed=0)), args.records)
+
+        generator = batch_generator.BatchGenerator(seed=0)
+        block_iter = getattr(generator, f"iter_{name}_blocks")
+        column_rate = records_per_second(lambda n: list(block_iter(n)), args.records)
+
+        print(f"{name:<16}{scalar_rate:>16,.0f}{dict_rate:>16,.0f}{column_rate:>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: collector CLI startup, import time and --help latency
+
+Runs each case in a fresh interpreter (best of N) and fails if the Azure SDK
+is imported eagerly or a case exceeds its budget, so a stray top-level
+import shows up before it reaches scheduled runs.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COLLECTOR_DIR = os.path.join(HERE, "..")
+
+# Modules only the collect subcommand should load, and only once it runs
+HEAVY_MODULES = ("azure.identity", "azure.mgmt.monitor", "azure.mgmt.resource",
+                 "azure.mgmt.security", "azure.storage.blob", "pandas", "pyarrow")
+
+CASES = {
+    "python baseline": [sys.executable, "-c", "pass"],
+    "import azure_log_collector": [sys.executable, "-c", "import azure_log_collector"],
+    "azure_log_collector.py --help": [sys.executable, "azure_log_collector.py", "--help"],
+    "azure_log_collector.py collect --help": [sys.executable, "azure_log_collector.py", "collect", "--help"],
+}
+
+
+def best_of(command, repeat: int) -> float:
+    """Fastest wall time in ms of running a command in a fresh process"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=COLLECTOR_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def eager_imports():
+    """Heavy modules present in sys.modules right after importing the collector"""
+    probe = ("import sys, azure_log_collector; "
+             f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", probe], cwd=COLLECTOR_DIR, check=True,
+                            capture_output=True, text=True)
+    return result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=150.0,
+                        help="Budget for each case above the bare interpreter startup")
+    args = parser.parse_args()
+
+    timings = {label: best_of(command, args.repeat) for label, command in CASES.items()}
+    baseline = timings["python baseline"]
+    failed = False
+    for label, elapsed in timings.items():
+        over = elapsed - baseline
+        status = ""
+        if label != "python baseline" and over > args.max_ms:
+            status = f"  OVER BUDGET ({args.max_ms:.0f} ms)"
+            failed = True
+        print(f"{label:<40} {elapsed:8.1f} ms   (+{over:6.1f} ms){status}")
+
+    eager = eager_imports()
+    if eager:
+        print(f"\nImported at module level: {', '.join(eager)}")
+        failed = True
+    else:
+        print("\nNo SDK or data-frame modules imported at module level")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: data-collection throughput and peak memory per case
+
+Covers every generator function, save_to_json vs save_to_csv (with the
+metadata flattening path), calculate_risk_score, and the collector's
+collect_activity_logs / save_logs against a fake paged activity log API.
+
+Each (case, size) runs in a fresh interpreter with fixed seeds, so peak RSS
+is per case and results are repeatable. Results are saved as JSON keyed by
+commit; --compare prints the throughput ratio against an earlier file.
+
+    python benchmarks/run_benchmarks.py --sizes 10k,1M
+    python benchmarks/run_benchmarks.py --cases 'save_*' --compare results/abc1234.json
+"""
+
+import argparse
+import fnmatch
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COLLECTOR_DIR = os.path.join(HERE, "..")
+sys.path.insert(0, COLLECTOR_DIR)
+
+DEFAULT_SIZES = "10k,1M,10M"
+DEFAULT_SEED = 42
+# Records per page returned by the fake activity log API (the service uses 200)
+PAGE_SIZE = 200
+
+
+def parse_size(text: str) -> int:
+    """10k / 1M / 2500 -> record count"""
+    text = text.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def peak_rss_mib() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Cases ------------------------------------------------------------------
+# Each case takes the record count and returns (setup, run): setup builds the
+# inputs outside the timed section, run(inputs) does the measured work and
+# may return extra fields (e.g. bytes written) for the result row.
+
+def generator_case(name: str):
+    """A synthetic_data_generator / batch_generator function, fully consumed"""
+    def case(size: int):
+        import batch_generator
+        import synthetic_data_generator as sdg
+        func = getattr(batch_generator if name.endswith("_records") else sdg, name)
+
+        def run(_):
+            if name.startswith("generate_"):
+                random.seed(DEFAULT_SEED)
+                func(size)
+            elif name.endswith("_records"):
+                deque(func(size, seed=DEFAULT_SEED), maxlen=0)
+            else:
+                deque(func(size, rng=random.Random(DEFAULT_SEED)), maxlen=0)
+        return (lambda: None), run
+    return case
+
+
+def security_events(size: int):
+    """Security events carry the nested metadata dict that CSV output flattens"""
+    import synthetic_data_generator as sdg
+    return list(sdg.iter_security_events(size, rng=random.Random(DEFAULT_SEED)))
+
+
+def save_case(writer: str):
+    def case(size: int):
+        import synthetic_data_generator as sdg
+        save = getattr(sdg, writer)
+        extension = "json" if writer == "save_to_json" else "csv"
+
+        def run(records):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, f"security_events.{extension}")
+                save(records, path)
+                return {"bytes": os.path.getsize(path)}
+        return (lambda: security_events(size)), run
+    return case
+
+
+def flatten_case(size: int):
+    import synthetic_data_generator as sdg
+
+    def run(records):
+        for record in records:
+            sdg.flatten_record(record)
+    return (lambda: security_events(size)), run
+
+
+def risk_score_case(size: int):
+    import synthetic_data_generator as sdg
+
+    def setup():
+        events = security_events(size)
+        return [(event, datetime.fromisoformat(event["timestamp"])) for event in events]
+
+    def run(pairs):
+        calculate_risk_score = sdg.calculate_risk_score
+        for event, timestamp in pairs:
+            calculate_risk_score(event, timestamp)
+    return setup, run
+
+
+class FakeActivityLogs:
+    """
+    activity_logs operation group returning synthetic pages
+
+    Holds no events: each list() call derives the events falling inside its
+    filter window (evenly spaced over the lookback) and builds them page by
+    page as fresh objects, the way the SDK deserializes a response.
+    """
+
+    def __init__(self, size: int, days: int):
+        self.size = size
+        # A minute inside both ends of the lookback, so every event falls in
+        # the range the collector queries (its filters have second precision)
+        now = datetime.now(timezone.utc)
+        self.start = now - timedelta(days=days) + timedelta(minutes=1)
+        self.end = now - timedelta(minutes=1)
+        self.step = (self.end - self.start).total_seconds() / size
+        value = lambda text: SimpleNamespace(value=text, localized_value=text)  # noqa: E731
+        self.levels = [value("Informational"), value("Warning"), value("Error")]
+        self.operations = [value(f"Microsoft.{kind}/write") for kind in
+                           ("Compute/virtualMachines", "Network/networkSecurityGroups",
+                            "Storage/storageAccounts", "KeyVault/vaults")]
+        self.statuses = [value("Succeeded"), value("Failed"), value("Started")]
+        self.category = value("Administrative")
+
+    def _event(self, index: int):
+        # Field values derive from the index, so pages fetched by concurrent
+        # windows are identical from run to run
+        return SimpleNamespace(
+            event_timestamp=self.start + timedelta(seconds=(index + 0.5) * self.step),
+            level=self.levels[index % 3],
+            operation_name=self.operations[index // 3 % 4],
+            resource_group_name=f"rg-{index % 5}",
+            resource_id=f"/subscriptions/bench/resourceGroups/rg-{index % 5}/vm-{index % 50}",
+            status=self.statuses[index // 7 % 3],
+            caller=f"user{index % 25}@contoso.com",
+            category=self.category,
+            claims={"name": f"User {index % 25}", "ipaddr": f"10.0.{index % 4}.{index % 250}",
+                    "appid": "04b07795-8ddb-461a-bbee-02f9e1bf7b46", "idtyp": "user"},
+            event_data_id=f"event-{index}",
+            correlation_id=f"correlation-{index // 4}",
+        )
+
+    def list(self, filter: str, select: str = None):
+        low, high = (datetime.strptime(part.split("'")[1], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+                     for part in filter.split(" and "))
+        offset = lambda moment: (moment - self.start).total_seconds() / self.step - 0.5  # noqa: E731
+        first = max(0, math.ceil(offset(low)))
+        last = min(self.size - 1, math.floor(offset(high)))
+        return SimpleNamespace(by_page=lambda: (
+            (self._event(index) for index in range(page, min(page + PAGE_SIZE, last + 1)))
+            for page in range(first, last + 1, PAGE_SIZE)
+        ))
+
+
+def fake_collector(size: int, days: int = 7):
+    from azure_log_collector import AzureLogCollector
+    client = SimpleNamespace(activity_logs=FakeActivityLogs(size, days))
+    return AzureLogCollector("bench", "bench", monitor_client=client)
+
+
+def collect_case(size: int):
+    def run(collector):
+        logs = collector.collect_activity_logs(days=7)
+        if len(logs) != size:
+            raise AssertionError(f"collected {len(logs)} of {size} entries")
+    return (lambda: fake_collector(size)), run
+
+
+def save_logs_case(format: str):
+    def case(size: int):
+        def setup():
+            collector = fake_collector(size)
+            return collector, collector.collect_activity_logs(days=7)
+
+        def run(inputs):
+            collector, logs = inputs
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, f"azure_activity_logs.{format}")
+                collector.save_logs(logs, path, format=format)
+                return {"bytes": os.path.getsize(path)}
+        return setup, run
+    return case
+
+
+def validate_case(method: str):
+    """ValidationStage over collected activity entries, every tenth one re-delivered"""
+    def case(size: int):
+        def setup():
+            logs = fake_collector(size).collect_activity_logs(days=7)
+            entries = []
+            for index, entry in enumerate(logs):
+                entries.append(entry)
+                if index % 10 == 0:
+                    entries.append(dict(entry))
+            return entries[:size]
+
+        def run(entries):
+            from validation import Deduplicator, ValidationStage
+            stage = ValidationStage("activity", Deduplicator(method=method))
+            deque(stage.process(entries), maxlen=0)
+            return {"duplicates": stage.duplicates, "dedup_mib": round(stage.deduplicator.nbytes / 2**20, 1)}
+        return setup, run
+    return case
+
+
+def correlate_case(size: int):
+    """Streaming join over `size` records split 2:1:4 auth/security/network, at a fixed density"""
+    def setup():
+        from correlation import generated_streams
+        # ~100k logins per 30 days, so the window holds the same load at every size
+        logins = max(size * 2 // 7, 1)
+        return [list(stream) for stream in generated_streams(logins, max(logins * 30 // 100000, 1))]
+
+    def run(streams):
+        from correlation import CorrelationJoin
+        join = CorrelationJoin(ids_only=True)
+        deque(join.run(*streams), maxlen=0)
+        return {"with_network": join.stats["with_network"]}
+    return setup, run
+
+
+CASES = {
+    **{f"generator:{name}": generator_case(name) for name in (
+        "generate_authentication_log", "generate_security_events", "generate_network_logs",
+        "iter_authentication_log", "iter_security_events", "iter_network_logs",
+        "iter_authentication_records", "iter_security_records", "iter_network_records",
+    )},
+    "save_to_json": save_case("save_to_json"),
+    "save_to_csv": save_case("save_to_csv"),
+    "flatten_record": flatten_case,
+    "calculate_risk_score": risk_score_case,
+    "collect_activity_logs": collect_case,
+    **{f"save_logs:{format}": save_logs_case(format) for format in ("json", "ndjson", "csv")},
+    **{f"validate:{method}": validate_case(method) for method in ("set", "bloom")},
+    "correlate": correlate_case,
+}
+
+
+def run_case(name: str, size: int) -> dict:
+    """Run one case in this process and describe the result"""
+    setup, run = CASES[name](size)
+    # Library output (progress lines) would interleave with the JSON result
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            inputs = setup()
+            setup_rss = peak_rss_mib()
+            start = time.perf_counter()
+            extra = run(inputs) or {}
+            seconds = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    return {
+        "case": name,
+        "size": size,
+        "seconds": round(seconds, 4),
+        "records_per_second": round(size / seconds, 1) if seconds else None,
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+        "setup_peak_rss_mib": round(setup_rss, 1),
+        **extra,
+    }
+
+
+def run_isolated(name: str, size: int, timeout: float = None) -> dict:
+    """Run one case in a fresh interpreter"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", name, str(size)]
+    try:
+        result = subprocess.run(command, cwd=COLLECTOR_DIR, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"case": name, "size": size, "error": f"timed out after {timeout:.0f}s"}
+    if result.returncode != 0:
+        # A killed child (e.g. out of memory) has a negative return code and no output
+        lines = result.stderr.strip().splitlines()
+        return {"case": name, "size": size,
+                "error": lines[-1] if lines else f"exit code {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    """(short commit, has uncommitted changes) or (None, False) outside git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=COLLECTOR_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=COLLECTOR_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(dirty)
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def compare(results: list, baseline_path: str):
+    """Print throughput and peak RSS against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(row["case"], row["size"]): row for row in baseline["results"]}
+    print(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+    print(f"{'case':<40}{'size':>10}{'throughput':>12}{'peak RSS':>12}")
+    for row in results:
+        old = before.get((row["case"], row["size"]))
+        if not old or "error" in row or "error" in old:
+            continue
+        speed = row["records_per_second"] / old["records_per_second"]
+        memory = row["peak_rss_mib"] / old["peak_rss_mib"]
+        print(f"{row['case']:<40}{row['size']:>10,}{speed:>11.2f}x{memory:>11.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"Comma-separated record counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--cases", nargs="+", default=["*"],
+                        help="Case names or glob patterns to run (default: all)")
+    parser.add_argument("--timeout", type=float, help="Seconds allowed per case and size")
+    parser.add_argument("-o", "--output",
+                        help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--list", action="store_true", help="List case names and exit")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], int(args.child[1]))))
+        return
+    if args.list:
+        print("\n".join(CASES))
+        return
+
+    names = [name for name in CASES if any(fnmatch.fnmatch(name, pattern) for pattern in args.cases)]
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    commit, dirty = git_revision()
+
+    results = []
+    print(f"{'case':<40}{'size':>10}{'records/s':>14}{'peak RSS MiB':>14}")
+    for name in names:
+        for size in sizes:
+            row = run_isolated(name, size, args.timeout)
+            results.append(row)
+            if "error" in row:
+                print(f"{name:<40}{size:>10,}  FAILED: {row['error']}")
+            else:
+                print(f"{name:<40}{size:>10,}{row['records_per_second']:>14,.0f}{row['peak_rss_mib']:>14,.1f}")
+
+    output = args.output or os.path.join(HERE, "results", f"{commit or 'local'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": DEFAULT_SEED,
+            "results": results,
+        }, f, indent=2)
+    print(f"\n[OK] Saved {len(results)} results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
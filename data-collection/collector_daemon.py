@@ -0,0 +1,742 @@
+#!/usr/bin/env python3
+"""
+Collector Daemon for Zero-Trust Cloud Lab
+Long-running collector that keeps Azure clients warm, polls each source on
+its own interval and feeds sinks (files, blob storage, the log store)
+through bounded asyncio queues, with backpressure and graceful shutdown
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from azure_log_collector import (DEFAULT_MAX_WORKERS, DEFAULT_OVERLAP_MINUTES, DEFAULT_WINDOW_HOURS,
+                                 SOURCE_DATASETS, AzureLogCollector, add_auth_arguments,
+                                 add_validation_arguments)
+from log_sinks import LogSink
+from log_sources import LogSource
+from metrics import REGISTRY as metrics, add_metrics_arguments
+
+DEFAULT_INTERVAL_SECONDS = 300
+DEFAULT_LOOKBACK_DAYS = 1
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_QUEUE_SIZE = 16       # batches between the sources and the sinks
+DEFAULT_SINK_QUEUE_SIZE = 4   # batches waiting per sink
+DEFAULT_FLUSH_SECONDS = 30
+DEFAULT_SHUTDOWN_TIMEOUT = 60
+DEFAULT_STATE_FILE = ".daemon_state.json"
+DEFAULT_OUTPUT_DIR = "daemon_logs"
+DEFAULT_CONTAINER = "security-data"
+DEFAULT_BLOB_PREFIX = "logs/daemon"
+DEFAULT_BLOB_BATCH_MB = 64
+
+# Dataset of each source's entries (validation schema, log store dataset)
+DATASETS = dict(SOURCE_DATASETS, activity="activity")
+
+
+class Batch:
+    """Entries from one poll of one source, on their way to the sinks"""
+    __slots__ = ("source", "output_name", "dataset", "entries")
+
+    def __init__(self, source: str, output_name: str, dataset: Optional[str], entries: List[Dict]):
+        self.source = source
+        self.output_name = output_name
+        self.dataset = dataset
+        self.entries = entries
+
+
+class PollDone:
+    """
+    Queued after the last batch of a complete poll
+
+    Every sink flushes when it reaches the marker; once all have, the
+    source's checkpoint moves to the poll's start time and the poll's
+    dedup keys are recorded. settled is set either way, failed or not.
+    """
+    __slots__ = ("polled", "started", "pending", "remaining", "failed", "settled")
+
+    def __init__(self, polled: "PolledSource", started: datetime, sinks: int, pending=None):
+        self.polled = polled
+        self.started = started
+        self.pending = pending
+        self.remaining = sinks
+        self.failed = False
+        self.settled = asyncio.Event()
+
+
+class PolledSource:
+    """A LogSource with its polling interval, validation stage and progress"""
+
+    def __init__(self, source: LogSource, interval: float = DEFAULT_INTERVAL_SECONDS,
+                 validator=None, dataset: Optional[str] = None):
+        """
+        Args:
+            source: Source to poll; its clients and rate limiter live across polls
+            interval: Seconds between the starts of consecutive polls
+            validator: validation.ValidationStage kept across polls, so entries
+                       re-read in the overlap are dropped as duplicates
+            dataset: Dataset of the entries (default: from the source name)
+        """
+        self.source = source
+        self.interval = interval
+        self.validator = validator
+        self.dataset = dataset or DATASETS.get(source.name)
+        self.since: Optional[datetime] = None       # start of the last checkpointed poll
+        self.polls = 0
+        self.errors = 0
+        self.fetched = 0
+        self.stale = 0
+        self.queued = 0
+        self._waited = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.source.name
+
+    def pending(self):
+        """Collector for one poll's dedup keys, recorded only at its checkpoint"""
+        if self.validator is None or self.validator.deduplicator is None:
+            return None
+        return self.validator.deduplicator.pending()
+
+
+class DaemonSink:
+    """
+    Destination for batches
+
+    Every sink gets its own worker thread, and all of its methods run on it,
+    so they may block and may hold thread-bound handles (SQLite). flush()
+    must make everything written so far durable: a source's checkpoint only
+    advances once every sink has flushed its poll.
+    """
+
+    name = "sink"
+
+    def open(self):
+        pass
+
+    def write(self, batch: Batch):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class FileSink(DaemonSink):
+    """One log_sinks.LogSink per source, named after the daemon's start time"""
+
+    name = "file"
+
+    def __init__(self, output_dir: str = DEFAULT_OUTPUT_DIR, formats: Sequence[str] = ("ndjson",),
+                 compression: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_seconds: Optional[float] = None):
+        """
+        Args:
+            output_dir: Directory for the output files
+            formats: "ndjson" and/or "csv"
+            compression: None, "gzip" or "zstd"
+            max_bytes: Rotate files at this many uncompressed bytes
+            max_seconds: Rotate files after this many seconds
+        """
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.options = dict(compression=compression, max_bytes=max_bytes, max_seconds=max_seconds)
+        # A restarted daemon must not overwrite the previous run's files
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.sinks: Dict[str, LogSink] = {}
+
+    def open(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def write(self, batch: Batch):
+        sink = self.sinks.get(batch.output_name)
+        if sink is None:
+            base_path = os.path.join(self.output_dir, f"{batch.output_name}-{self.run_id}")
+            sink = self.sinks[batch.output_name] = LogSink(base_path, self.formats, **self.options)
+        sink.write_all(batch.entries)
+
+    def flush(self):
+        for sink in self.sinks.values():
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks.values():
+            sink.close()
+            for format in self.formats:
+                size = sum(os.path.getsize(path) for path in sink.files if f".{format}" in path)
+                metrics.record_write(format, sink.count, size)
+
+
+class BlobSink(DaemonSink):
+    """
+    Uploads each source's entries as NDJSON blobs
+
+    Entries are buffered per source and uploaded on flush, or early once
+    a buffer reaches max_bytes. A failed upload discards its buffer: the
+    poll fails, so the daemon re-reads and writes those entries again.
+    """
+
+    name = "blob"
+
+    def __init__(self, collector: AzureLogCollector, container: str = DEFAULT_CONTAINER,
+                 prefix: str = DEFAULT_BLOB_PREFIX, max_bytes: int = DEFAULT_BLOB_BATCH_MB * 1024 * 1024):
+        """
+        Args:
+            collector: Collector whose pooled blob service client uploads
+            container: Storage container name
+            prefix: Blob name prefix; blobs are PREFIX/<source>/<time>-<n>.ndjson
+            max_bytes: Upload a source's buffer once it holds this many bytes
+        """
+        self.collector = collector
+        self.container = container
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.buffers: Dict[str, List[bytes]] = {}
+        self.sizes: Dict[str, int] = {}
+        self.uploaded = 0
+
+    def write(self, batch: Batch):
+        lines = [json.dumps(entry, default=str).encode() + b"\n" for entry in batch.entries]
+        self.buffers.setdefault(batch.output_name, []).extend(lines)
+        self.sizes[batch.output_name] = self.sizes.get(batch.output_name, 0) + sum(map(len, lines))
+        if self.sizes[batch.output_name] >= self.max_bytes:
+            self._upload(batch.output_name)
+
+    def _upload(self, output_name: str):
+        chunks = self.buffers.get(output_name)
+        if not chunks:
+            return
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        blob_name = f"{self.prefix}/{output_name}/{timestamp}-{self.uploaded:06d}.ndjson"
+        del self.buffers[output_name]
+        del self.sizes[output_name]
+        if not self.collector.upload_to_blob_storage(self.container, blob_name, chunks):
+            raise RuntimeError(f"upload of {blob_name} failed")
+        self.uploaded += 1
+
+    def flush(self):
+        for output_name in list(self.buffers):
+            self._upload(output_name)
+
+
+class StoreSink(DaemonSink):
+    """Ingests entries into the SQLite log store (idempotent on record IDs)"""
+
+    name = "store"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.store = None
+
+    def open(self):
+        from log_store import LogStore
+        # Opened on the sink's own thread, which is the only one to use the connection
+        self.store = LogStore(self.path)
+
+    def write(self, batch: Batch):
+        # Each ingest commits its own transaction, so flush has nothing to do
+        self.store.ingest(batch.entries, batch.dataset)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+def _batches(entries: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CollectorDaemon:
+    """
+    Polls sources on their own schedules and fans their entries out to sinks
+
+    Each poll runs on a worker thread: the source is read from its
+    checkpoint (minus an overlap for late events), validated and
+    deduplicated, and queued in batches on a bounded queue. A poll's dedup
+    keys are only recorded, and its checkpoint only moves, once every sink
+    has flushed it; the source's next poll waits for that, so after a
+    failed write it re-reads and writes the same entries again. A dispatcher
+    copies every batch into each sink's bounded queue, and each sink
+    writes on its own thread. A slow sink fills its queue, which stalls
+    the dispatcher, which fills the source queue, which blocks the polling
+    threads mid-read, so memory stays bounded by the queue sizes.
+
+    stop() (SIGINT/SIGTERM from the command line) lets running polls finish
+    their current batch, drains the queues, flushes and closes the sinks.
+    Polls cut short are not checkpointed and are re-read on the next start.
+
+    Usage:
+        daemon = CollectorDaemon([PolledSource(source, 60)], [FileSink("out")])
+        asyncio.run(daemon.run())
+    """
+
+    def __init__(self, sources: Sequence[PolledSource], sinks: Sequence[DaemonSink],
+                 batch_size: int = DEFAULT_BATCH_SIZE, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 sink_queue_size: int = DEFAULT_SINK_QUEUE_SIZE,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT,
+                 state_file: Optional[str] = None, overlap_minutes: float = DEFAULT_OVERLAP_MINUTES,
+                 max_polls: Optional[int] = None, metrics_file: Optional[str] = None):
+        """
+        Args:
+            sources: Sources to poll
+            sinks: Sinks that receive every batch
+            batch_size: Entries per queued batch
+            queue_size: Batches waiting for the dispatcher
+            sink_queue_size: Batches waiting per sink
+            flush_seconds: Longest time a sink holds written entries unflushed
+            shutdown_timeout: Seconds to wait for the sinks to drain on stop
+            state_file: JSON file with each source's checkpoint (None: in memory only)
+            overlap_minutes: Re-read this much before the checkpoint for late events
+            max_polls: Stop after polling every source this many times (None: run until stopped)
+            metrics_file: Rewrite Prometheus metrics here after every checkpoint
+        """
+        if not sinks:
+            raise ValueError("The daemon needs at least one sink")
+        self.sources = list(sources)
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.sink_queue_size = sink_queue_size
+        self.flush_seconds = flush_seconds
+        self.shutdown_timeout = shutdown_timeout
+        self.state_file = state_file
+        self.overlap = timedelta(minutes=overlap_minutes)
+        self.max_polls = max_polls
+        self.metrics_file = metrics_file
+        self._stopping = threading.Event()   # seen by polling threads
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    def load_state(self):
+        """Resume every source from the checkpoints in the state file"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        with open(self.state_file) as f:
+            state = json.load(f)
+        for polled in self.sources:
+            if state.get(polled.name):
+                polled.since = datetime.fromisoformat(state[polled.name])
+
+    def save_state(self):
+        """Atomically write every source's checkpoint"""
+        if not self.state_file:
+            return
+        state = {polled.name: polled.since.isoformat() for polled in self.sources if polled.since}
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
+
+    def stop(self):
+        """Begin a graceful shutdown; a second call exits immediately"""
+        if self._stopping.is_set():
+            print("✗ Stopping again, exiting without flushing")
+            os._exit(1)
+        print("\nShutting down: finishing running polls and flushing sinks...")
+        self._stopping.set()
+        if self._stop is not None:
+            self._stop.set()
+
+    def _install_signal_handlers(self):
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(signum, self.stop)
+            except NotImplementedError:
+                # Windows event loops: fall back to a plain handler
+                signal.signal(signum, lambda *_: self._loop.call_soon_threadsafe(self.stop))
+
+    def _query_start(self, polled: PolledSource) -> Optional[datetime]:
+        # Only checkpointed polls count: after a failed poll the next one
+        # re-reads from the same point (the full lookback before the first)
+        return polled.since - self.overlap if polled.since else None
+
+    def _not_before(self, polled: PolledSource, entries: Iterable[Dict], since: datetime) -> Iterator[Dict]:
+        """
+        Drop entries older than the query start
+
+        Sources with a coarse filter (or none) re-deliver old entries, whose
+        dedup buckets may be gone. Unparseable timestamps are left to validation.
+        """
+        from validation import parse_epoch
+
+        cutoff = since.timestamp()
+        for entry in entries:
+            try:
+                if parse_epoch(entry["timestamp"]) < cutoff:
+                    polled.stale += 1
+                    continue
+            except (KeyError, TypeError, ValueError, AttributeError):
+                pass
+            yield entry
+
+    def _submit(self, polled: PolledSource, batch: List[Dict], pending=None):
+        """Validate a batch and queue it, blocking while the queue is full (worker thread)"""
+        if polled.validator is not None:
+            batch = polled.validator.process_batch(batch, pending)
+        if not batch:
+            return
+        item = Batch(polled.name, polled.source.output_name, polled.dataset, batch)
+        start = time.perf_counter()
+        asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop).result()
+        metrics.inc("backpressure_seconds_total", time.perf_counter() - start, source=polled.name)
+        polled.queued += len(batch)
+
+    def _poll(self, polled: PolledSource, started: datetime, pending=None) -> bool:
+        """
+        One poll of a source (worker thread)
+
+        Args:
+            polled: Source to read
+            started: Start time of the poll (its checkpoint once written)
+            pending: Deduplicator.pending() collecting the poll's new keys
+
+        Returns:
+            True when the source was read to the end
+        """
+        since = self._query_start(polled)
+        fetched = 0
+        status = "ok"
+        with metrics.stage("poll", source=polled.name) as stage:
+            try:
+                entries = polled.source.collect_since(since)
+                if since is not None:
+                    entries = self._not_before(polled, entries, since)
+                for batch in _batches(entries, self.batch_size):
+                    fetched += len(batch)
+                    self._submit(polled, batch, pending)
+                    if self._stopping.is_set():
+                        status = "interrupted"
+                        break
+            except Exception as e:
+                status = "error"
+                polled.errors += 1
+                print(f"✗ {polled.name}: poll failed: {e}")
+            stage.records = fetched
+        polled.polls += 1
+        polled.fetched += fetched
+        metrics.inc("polls_total", source=polled.name, status=status)
+        waited = polled.source.limiter.waited
+        metrics.inc("rate_limited_seconds_total", waited - polled._waited, source=polled.name)
+        polled._waited = waited
+        if status == "ok":
+            print(f"✓ {polled.name}: {fetched} entries since "
+                  f"{since.isoformat(timespec='seconds') if since else 'the start of the lookback'} "
+                  f"in {stage.elapsed:.1f}s")
+        return status == "ok"
+
+    async def _poll_loop(self, polled: PolledSource, executor: ThreadPoolExecutor):
+        while not self._stop.is_set():
+            started = datetime.now(timezone.utc)
+            pending = polled.pending()
+            complete = await self._loop.run_in_executor(executor, self._poll, polled, started, pending)
+            if complete:
+                done = PollDone(polled, started, len(self.sinks), pending)
+                await self._queue.put(done)
+                # The next poll starts from this one's checkpoint and dedup keys
+                await self._wait_or_stop(done.settled)
+            if self.max_polls and polled.polls >= self.max_polls:
+                return
+            # Fixed-rate schedule; a poll that overran its interval is followed immediately
+            elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+            try:
+                await asyncio.wait_for(self._stop.wait(), max(polled.interval - elapsed, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _wait_or_stop(self, event: asyncio.Event):
+        waits = [asyncio.ensure_future(event.wait()), asyncio.ensure_future(self._stop.wait())]
+        try:
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for wait in waits:
+                wait.cancel()
+
+    async def _dispatch(self, sink_queues: List[asyncio.Queue]):
+        """Copy every item into each sink queue; a full one holds up the rest"""
+        while True:
+            item = await self._queue.get()
+            metrics.set("queue_depth", self._queue.qsize(), queue="sources")
+            for queue in sink_queues:
+                await queue.put(item)
+            if item is None:
+                return
+
+    async def _call(self, sink: DaemonSink, executor: ThreadPoolExecutor, method, *args) -> bool:
+        try:
+            await self._loop.run_in_executor(executor, method, *args)
+            return True
+        except Exception as e:
+            metrics.inc("sink_errors_total", sink=sink.name)
+            print(f"✗ {sink.name} sink: {e}")
+            return False
+
+    async def _write_loop(self, sink: DaemonSink, queue: asyncio.Queue, executor: ThreadPoolExecutor):
+        """Write batches to one sink, flushing at poll markers and at least every flush_seconds"""
+        failed_sources = set()   # sources with a failed write since their last marker
+        deadline = self._loop.time() + self.flush_seconds
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), max(deadline - self._loop.time(), 0))
+            except asyncio.TimeoutError:
+                item = "flush"
+            metrics.set("queue_depth", queue.qsize(), queue=sink.name)
+            if item is None:
+                return
+            if isinstance(item, Batch):
+                if not await self._call(sink, executor, sink.write, item):
+                    failed_sources.add(item.source)
+                continue
+
+            flushed = await self._call(sink, executor, sink.flush)
+            deadline = self._loop.time() + self.flush_seconds
+            if isinstance(item, PollDone):
+                name = item.polled.name
+                item.failed |= not flushed or name in failed_sources
+                failed_sources.discard(name)
+                item.remaining -= 1
+                if item.remaining == 0:
+                    self._checkpoint(item)
+
+    def _checkpoint(self, done: PollDone):
+        polled = done.polled
+        done.settled.set()
+        if done.failed:
+            # The poll's keys are dropped too, so the next poll writes its entries again
+            print(f"⚠ {polled.name}: a sink failed, checkpoint stays at "
+                  f"{polled.since.isoformat(timespec='seconds') if polled.since else 'the start'}")
+            return
+        if done.pending is not None:
+            # No poll of this source runs until the marker is settled
+            polled.validator.deduplicator.merge(done.pending)
+        polled.since = done.started
+        self.save_state()
+        if self.metrics_file:
+            metrics.write(self.metrics_file)
+
+    async def run(self, handle_signals: bool = False):
+        """
+        Poll until stop() (or max_polls), then drain and close the sinks
+
+        Args:
+            handle_signals: Call stop() on SIGINT/SIGTERM
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if self._stopping.is_set():
+            self._stop.set()
+        self._queue = asyncio.Queue(self.queue_size)
+        if handle_signals:
+            self._install_signal_handlers()
+        self.load_state()
+
+        poll_executor = ThreadPoolExecutor(len(self.sources) or 1, thread_name_prefix="poll")
+        # One thread per sink: writes stay ordered and may use thread-bound handles
+        sink_executors = [ThreadPoolExecutor(1, thread_name_prefix=f"sink-{sink.name}")
+                          for sink in self.sinks]
+        try:
+            for sink, executor in zip(self.sinks, sink_executors):
+                await self._loop.run_in_executor(executor, sink.open)
+            sink_queues = [asyncio.Queue(self.sink_queue_size) for _ in self.sinks]
+            dispatcher = asyncio.create_task(self._dispatch(sink_queues))
+            writers = [asyncio.create_task(self._write_loop(sink, queue, executor))
+                       for sink, queue, executor in zip(self.sinks, sink_queues, sink_executors)]
+
+            await asyncio.gather(*(self._poll_loop(polled, poll_executor) for polled in self.sources))
+            await self._queue.put(None)
+            try:
+                await asyncio.wait_for(asyncio.gather(dispatcher, *writers), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                waiting = self._queue.qsize() + sum(queue.qsize() for queue in sink_queues)
+                print(f"⚠ Sinks did not drain within {self.shutdown_timeout:.0f}s, "
+                      f"{waiting} queued items dropped")
+        finally:
+            for sink, executor in zip(self.sinks, sink_executors):
+                await self._call(sink, executor, sink.close)
+                executor.shutdown()
+            poll_executor.shutdown()
+            self.save_state()
+
+        for polled in self.sources:
+            print(f"✓ {polled.name}: {polled.polls} polls, {polled.fetched} entries fetched, "
+                  f"{polled.stale} skipped as older than the checkpoint, {polled.queued} queued, "
+                  f"{polled.errors} failed polls")
+            if polled.validator is not None:
+                print(f"  - {polled.validator.summary()}")
+
+
+def _parse_pairs(items: List[str], option: str) -> Dict[str, float]:
+    pairs = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        try:
+            pairs[name] = float(value)
+        except ValueError:
+            raise SystemExit(f"✗ {option} expects SOURCE=NUMBER, got {item!r}")
+    return pairs
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Poll Azure log sources continuously and write them to files, blob storage "
+                    "and/or the log store"
+    )
+    sources = parser.add_argument_group("sources")
+    sources.add_argument("--sources", nargs="+", default=["activity"], choices=sorted(DATASETS),
+                         help="Sources to poll (default: activity)")
+    sources.add_argument("--interval", action="append", default=[], metavar="SOURCE=SECONDS",
+                         help="Polling interval of a source, e.g. defender=900 (repeatable)")
+    sources.add_argument("--default-interval", type=float, default=DEFAULT_INTERVAL_SECONDS,
+                         help=f"Polling interval of other sources (default: {DEFAULT_INTERVAL_SECONDS}s)")
+    sources.add_argument("--rate-limit", action="append", default=[], metavar="SOURCE=RATE",
+                         help="Requests per second for a source, e.g. entra=2 (repeatable)")
+    sources.add_argument("--days", type=int, default=DEFAULT_LOOKBACK_DAYS,
+                         help="Lookback of the first poll when there is no checkpoint "
+                              f"(default: {DEFAULT_LOOKBACK_DAYS})")
+    sources.add_argument("--overlap-minutes", type=float, default=DEFAULT_OVERLAP_MINUTES,
+                         help="Re-read this much before each checkpoint for late events "
+                              f"(default: {DEFAULT_OVERLAP_MINUTES})")
+    sources.add_argument("--state-file", default=DEFAULT_STATE_FILE,
+                         help=f"Per-source checkpoints (default: {DEFAULT_STATE_FILE})")
+    sources.add_argument("--resource-group", help="Resource group for NSG flow logs and alerts")
+    sources.add_argument("--nsg-name", help="NSG whose flow logs to read (default: all)")
+    sources.add_argument("--project-claims", action="store_true",
+                         help="Keep only the useful claims fields of each activity log entry")
+    sources.add_argument("--window-hours", type=int, default=DEFAULT_WINDOW_HOURS,
+                         help="Size of each concurrently fetched activity log window")
+    sources.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                         help="Maximum concurrent activity log windows")
+
+    sinks = parser.add_argument_group("sinks")
+    sinks.add_argument("--sinks", nargs="+", default=["file"], choices=["file", "blob", "store"],
+                       help="Where entries go (default: file)")
+    sinks.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                       help=f"Directory for the file sink (default: {DEFAULT_OUTPUT_DIR})")
+    sinks.add_argument("--formats", nargs="+", default=["ndjson"], choices=["ndjson", "csv"],
+                       help="File sink formats (default: ndjson)")
+    sinks.add_argument("--compression", choices=["gzip", "zstd"], help="Compress file sink output")
+    sinks.add_argument("--rotate-mb", type=float, help="Rotate files at this size (uncompressed MB)")
+    sinks.add_argument("--rotate-minutes", type=float, default=60,
+                       help="Rotate files after this many minutes (default: 60)")
+    sinks.add_argument("--container", default=DEFAULT_CONTAINER,
+                       help=f"Blob sink container (default: {DEFAULT_CONTAINER})")
+    sinks.add_argument("--blob-prefix", default=DEFAULT_BLOB_PREFIX,
+                       help=f"Blob sink name prefix (default: {DEFAULT_BLOB_PREFIX})")
+    sinks.add_argument("--blob-batch-mb", type=float, default=DEFAULT_BLOB_BATCH_MB,
+                       help="Upload a source's blob once this much is buffered, even between "
+                            f"flushes (default: {DEFAULT_BLOB_BATCH_MB})")
+    sinks.add_argument("--store", default="logs.db", help="Log store database (default: logs.db)")
+
+    flow = parser.add_argument_group("flow control")
+    flow.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                      help=f"Entries per queued batch (default: {DEFAULT_BATCH_SIZE})")
+    flow.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                      help=f"Batches queued before sources block (default: {DEFAULT_QUEUE_SIZE})")
+    flow.add_argument("--sink-queue-size", type=int, default=DEFAULT_SINK_QUEUE_SIZE,
+                      help=f"Batches queued per sink (default: {DEFAULT_SINK_QUEUE_SIZE})")
+    flow.add_argument("--flush-seconds", type=float, default=DEFAULT_FLUSH_SECONDS,
+                      help=f"Flush sinks at least this often (default: {DEFAULT_FLUSH_SECONDS})")
+    flow.add_argument("--shutdown-timeout", type=float, default=DEFAULT_SHUTDOWN_TIMEOUT,
+                      help="Seconds to wait for sinks to drain on shutdown "
+                           f"(default: {DEFAULT_SHUTDOWN_TIMEOUT})")
+    flow.add_argument("--once", action="store_true",
+                      help="Poll every source once, flush and exit (a warm replacement for cron runs)")
+
+    add_auth_arguments(parser)
+    add_validation_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def build_daemon(args, collector: AzureLogCollector, rejects=None) -> CollectorDaemon:
+    """Sources, validation stages and sinks for parsed command line options"""
+    from validation import Deduplicator, ValidationStage
+
+    intervals = _parse_pairs(args.interval, "--interval")
+    rates = _parse_pairs(args.rate_limit, "--rate-limit")
+    polled = []
+    for source in collector.build_sources(args.sources, args.days, args.window_hours, args.max_workers,
+                                          rates, args.resource_group, args.nsg_name):
+        validator = None
+        if not args.no_validate:
+            validator = ValidationStage(DATASETS[source.name],
+                                        Deduplicator(args.dedup_horizon_hours, method=args.dedup),
+                                        rejects=rejects)
+        polled.append(PolledSource(source, intervals.get(source.name, args.default_interval), validator))
+
+    sinks = []
+    if "file" in args.sinks:
+        sinks.append(FileSink(
+            args.output_dir, args.formats, args.compression,
+            max_bytes=int(args.rotate_mb * 1024 * 1024) if args.rotate_mb else None,
+            max_seconds=args.rotate_minutes * 60 if args.rotate_minutes else None
+        ))
+    if "blob" in args.sinks:
+        if collector.blob_service_client is None:
+            raise SystemExit("✗ The blob sink needs AZURE_STORAGE_CONNECTION_STRING")
+        sinks.append(BlobSink(collector, args.container, args.blob_prefix,
+                              int(args.blob_batch_mb * 1024 * 1024)))
+    if "store" in args.sinks:
+        sinks.append(StoreSink(args.store))
+
+    return CollectorDaemon(
+        polled, sinks, args.batch_size, args.queue_size, args.sink_queue_size, args.flush_seconds,
+        args.shutdown_timeout, args.state_file, args.overlap_minutes,
+        max_polls=1 if args.once else None, metrics_file=args.metrics_file
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    from dotenv import load_dotenv
+
+    args = parse_args(argv)
+    load_dotenv()
+
+    subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
+    if not subscription_id:
+        print("ERROR: AZURE_SUBSCRIPTION_ID not set (see azure_log_collector.py for setup)")
+        sys.exit(1)
+
+    metrics.configure(pipeline="daemon", profile_dir=args.profile)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    # Built once: the credential, token cache and SDK clients stay warm across polls
+    collector = AzureLogCollector(
+        subscription_id, os.getenv("AZURE_TENANT_ID"), project_claims=args.project_claims,
+        credential_mode=args.auth, token_cache=None if args.no_token_cache else args.token_cache
+    )
+    rejects = open(args.rejects, 'a') if args.rejects and not args.no_validate else None
+    try:
+        daemon = build_daemon(args, collector, rejects)
+        intervals = ", ".join(f"{polled.name} every {polled.interval:g}s" for polled in daemon.sources)
+        print(f"[OK] Polling {intervals} into {', '.join(sink.name for sink in daemon.sinks)} sinks")
+        asyncio.run(daemon.run(handle_signals=True))
+    finally:
+        if rejects:
+            rejects.close()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Columnar Output for Zero-Trust Cloud Lab
+Writes generated and collected logs as Parquet or Arrow IPC with typed schemas
+"""
+
+from typing import Dict, Iterable, List
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from activity_records import ACTIVITY_CLAIM_FIELDS, project_claims
+
+DEFAULT_BATCH_SIZE = 65536
+
+
+def _category() -> pa.DataType:
+    """Dictionary-encoded string for low-cardinality columns"""
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+SCHEMAS = {
+    "authentication": pa.schema([
+        ("log_id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("user_id", _category()),
+        ("username", _category()),
+        ("authentication_method", _category()),
+        ("source_ip", _category()),
+        ("location", _category()),
+        ("device_info", _category()),
+        ("success", pa.bool_()),
+        ("risk_level", _category()),
+        ("mfa_status", _category()),
+        ("failure_reason", _category()),
+    ]),
+    "security": pa.schema([
+        ("event_id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("event_type", _category()),
+        ("severity", _category()),
+        ("source_ip", _category()),
+        ("destination_ip", _category()),
+        ("user_id", pa.string()),
+        ("resource", _category()),
+        ("action", _category()),
+        ("result", _category()),
+        ("threat_type", _category()),
+        ("metadata", pa.struct([
+            ("bytes_transferred", pa.int64()),
+            ("duration_ms", pa.int32()),
+            ("protocol", pa.string()),
+        ])),
+        ("risk_score", pa.float32()),
+    ]),
+    "network": pa.schema([
+        ("log_id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("protocol", _category()),
+        ("source_ip", _category()),
+        ("source_port", pa.int32()),
+        ("destination_ip", _category()),
+        ("destination_port", pa.int32()),
+        ("bytes_sent", pa.int64()),
+        ("bytes_received", pa.int64()),
+        ("packets", pa.int32()),
+        ("action", _category()),
+        ("flags", pa.list_(pa.string())),
+        ("session_duration", pa.int32()),
+    ]),
+    "activity": pa.schema([
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("level", _category()),
+        ("operation", _category()),
+        ("resource_group", _category()),
+        ("resource_id", _category()),
+        ("status", _category()),
+        ("caller", _category()),
+        ("category", _category()),
+        ("claims", pa.struct([(name, pa.string()) for name in ACTIVITY_CLAIM_FIELDS])),
+        ("event_id", pa.string()),
+        ("correlation_id", pa.string()),
+    ]),
+}
+
+# Output file name stem -> schema name, for callers that only know file names
+DATASET_ALIASES = {
+    "authentication_logs": "authentication",
+    "security_events": "security",
+    "network_logs": "network",
+    "azure_activity_logs": "activity",
+}
+
+
+def resolve_schema(dataset: str) -> pa.Schema:
+    """Look up a schema by dataset name or output file stem"""
+    name = DATASET_ALIASES.get(dataset, dataset)
+    if name not in SCHEMAS:
+        raise ValueError(f"Unknown dataset: {dataset} (expected one of {sorted(SCHEMAS)})")
+    return SCHEMAS[name]
+
+
+def _column(values: List, field: pa.Field) -> pa.Array:
+    """Build one typed column from Python values"""
+    if pa.types.is_timestamp(field.type):
+        # ISO-8601 strings parse natively, including "+00:00" offsets
+        return pa.array(values, type=pa.string()).cast(field.type)
+    if field.name == "claims":
+        values = [project_claims(claims) for claims in values]
+    return pa.array(values, type=field.type)
+
+
+def records_to_batch(records: List[Dict], schema: pa.Schema) -> pa.RecordBatch:
+    """Convert a list of record dicts into a RecordBatch with the given schema"""
+    columns = [
+        _column([record.get(field.name) for record in records], field)
+        for field in schema
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class ColumnarWriter:
+    """
+    Incremental Parquet / Arrow IPC writer
+
+    Records are buffered and converted to one RecordBatch (one Parquet row
+    group) every batch_size records, so it works with streaming generators
+    without materializing the whole dataset.
+
+    An Arrow IPC file allows one dictionary per column, extended only by
+    deltas, so for Arrow output each batch's dictionary columns are
+    re-coded against a vocabulary kept across batches; only the values new
+    in a batch are written as a delta.
+    """
+
+    def __init__(self, path: str, dataset: str, format: str = "parquet",
+                 batch_size: int = DEFAULT_BATCH_SIZE, compression: str = "zstd"):
+        """
+        Args:
+            path: Output file path
+            dataset: Schema name (authentication, security, network, activity)
+            format: "parquet" or "arrow"
+            batch_size: Records per row group / record batch
+            compression: Parquet codec or Arrow IPC buffer compression
+        """
+        self.path = path
+        self.schema = resolve_schema(dataset)
+        self.format = format
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending: List[Dict] = []
+        # Dictionary column -> {value: code} over every batch written so far (Arrow only)
+        self._vocabularies: Dict[str, Dict[str, int]] = {
+            field.name: {} for field in self.schema if pa.types.is_dictionary(field.type)
+        }
+
+        if format == "parquet":
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        elif format == "arrow":
+            options = ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = ipc.new_file(self._sink, self.schema, options=options)
+        else:
+            raise ValueError(f"Unsupported columnar format: {format}")
+
+    def write(self, record: Dict):
+        """Buffer one record, flushing a batch when full"""
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, records: Iterable[Dict]) -> int:
+        """Write every record from an iterable; returns the number written"""
+        start = self.count
+        for record in records:
+            self.write(record)
+        self.flush()
+        return self.count - start
+
+    def flush(self):
+        """Write buffered records as one batch"""
+        if not self._pending:
+            return
+        batch = records_to_batch(self._pending, self.schema)
+        if self.format == "arrow":
+            batch = self._extend_dictionaries(batch)
+        self._writer.write_batch(batch)
+        self.count += len(self._pending)
+        self._pending = []
+
+    def _extend_dictionaries(self, batch: pa.RecordBatch) -> pa.RecordBatch:
+        """Re-code dictionary columns so each batch's dictionary extends the last one"""
+        columns = batch.columns
+        for index, field in enumerate(self.schema):
+            vocabulary = self._vocabularies.get(field.name)
+            if vocabulary is None:
+                continue
+            column = columns[index]
+            codes = pa.array([vocabulary.setdefault(value, len(vocabulary))
+                              for value in column.dictionary.to_pylist()], pa.int32())
+            columns[index] = pa.DictionaryArray.from_arrays(
+                pc.take(codes, column.indices), pa.array(list(vocabulary), pa.string())
+            )
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def close(self):
+        """Flush and finalize the file"""
+        self.flush()
+        self._writer.close()
+        if self.format == "arrow":
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def write_records(records: Iterable[Dict], path: str, dataset: str, format: str = "parquet",
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Write records to a Parquet or Arrow IPC file in row-group batches
+
+    Returns:
+        Number of records written
+    """
+    with ColumnarWriter(path, dataset, format, batch_size) as writer:
+        writer.write_all(records)
+    print(f"[OK] Saved {writer.count} records to {path}")
+    return writer.count
+
+
+def read_table(path: str) -> pa.Table:
+    """Load a Parquet or Arrow IPC file written by ColumnarWriter"""
+    if path.endswith(".arrow"):
+        return ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return pq.read_table(path)
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Compact Network Logs for Zero-Trust Cloud Lab
+Array-backed in-memory store for network logs with subnet aggregation queries
+"""
+
+import argparse
+import ipaddress
+import json
+import warnings
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from batch_generator import SUSPICIOUS_FLAGS, BatchGenerator, format_uuids
+
+CHUNK_SIZE = 65536
+
+# Field order of the generator's network-log schema (and of iter_records output)
+NETWORK_FIELDS = (
+    "log_id", "timestamp", "protocol", "source_ip", "source_port", "destination_ip",
+    "destination_port", "bytes_sent", "bytes_received", "packets", "action", "flags",
+    "session_duration",
+)
+
+# session_duration is None for flows without one (NSG flow logs)
+NO_DURATION = np.iinfo(np.uint32).max
+
+# Column -> (dtype, trailing shape)
+COLUMNS = {
+    "log_id": (np.uint8, (16,)),
+    "timestamp": ("datetime64[us]", ()),
+    "protocol": (np.uint8, ()),
+    "source_ip": (np.uint32, ()),
+    "source_port": (np.uint16, ()),
+    "destination_ip": (np.uint32, ()),
+    "destination_port": (np.uint16, ()),
+    "bytes_sent": (np.uint64, ()),
+    "bytes_received": (np.uint64, ()),
+    "packets": (np.uint32, ()),
+    "action": (np.uint8, ()),
+    "flags": (np.uint16, ()),
+    "session_duration": (np.uint32, ()),
+}
+
+_NIBBLES = np.full(256, 255, dtype=np.uint8)
+_NIBBLES[np.frombuffer(b"0123456789abcdef", dtype=np.uint8)] = np.arange(16, dtype=np.uint8)
+_UUID_HEX_POSITIONS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+
+
+class Vocabulary:
+    """Code <-> string mapping for one categorical column, grown on first sight"""
+
+    def __init__(self, values: Iterable[str] = (), limit: int = 256):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.limit = limit
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) >= self.limit:
+                raise ValueError(f"More than {self.limit} distinct values; cannot encode {value!r}")
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values) -> np.ndarray:
+        uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        return np.array([self.code(value) for value in uniques.tolist()], dtype=np.uint16)[inverse]
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.array(self.values, dtype=object)[codes]
+
+
+def ipv4_to_int(address: str) -> int:
+    """Dotted IPv4 address -> integer, rejecting forms that would not round-trip"""
+    return int(ipaddress.IPv4Address(address))
+
+
+def encode_ipv4(addresses) -> np.ndarray:
+    """Array of dotted IPv4 strings -> uint32 (each distinct address is parsed once)"""
+    uniques, inverse = np.unique(np.asarray(addresses, dtype=str), return_inverse=True)
+    return np.array([ipv4_to_int(address) for address in uniques.tolist()], dtype=np.uint32)[inverse]
+
+
+def decode_ipv4(values: np.ndarray) -> np.ndarray:
+    """uint32 array -> object array of dotted IPv4 strings"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    return np.array([str(ipaddress.IPv4Address(int(value))) for value in uniques], dtype=object)[inverse]
+
+
+def encode_uuids(values) -> np.ndarray:
+    """Canonical lowercase UUID strings -> (n, 16) uint8"""
+    text = np.asarray(values, dtype=str)
+    if len(text) and not (np.char.str_len(text) == 36).all():
+        raise ValueError("log_id values must be canonical 36-character UUIDs")
+    chars = text.astype("S36").view(np.uint8).reshape(len(text), 36)
+    nibbles = _NIBBLES[chars[:, _UUID_HEX_POSITIONS]]
+    if (nibbles == 255).any() or (chars[:, [8, 13, 18, 23]] != ord("-")).any():
+        raise ValueError("log_id values must be canonical lowercase UUIDs")
+    return (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+
+
+def _render_timestamps(values: np.ndarray, whole_second_fraction: bool) -> np.ndarray:
+    """datetime64[us] -> ISO strings; whole seconds drop ".000000" like datetime.isoformat()"""
+    text = np.datetime_as_string(values, unit="us").astype(object)
+    if not whole_second_fraction:
+        whole = values.astype(np.int64) % 1000000 == 0
+        if whole.any():
+            text[whole] = np.datetime_as_string(values[whole], unit="s")
+    return text
+
+
+class CompactNetworkLogs:
+    """
+    Network logs held column-wise in NumPy arrays, 64 bytes per record
+
+    IPv4 addresses are uint32, log IDs 16 raw bytes, timestamps datetime64,
+    protocol and action one-byte dictionary codes and flags a bitmask over
+    the flag vocabulary. Every record is checked on the way in to convert
+    back to exactly the dict it came from, so a value the encoding cannot
+    hold (an IPv6 address, a non-UUID log ID) raises ValueError instead of
+    being altered.
+    """
+
+    def __init__(self, capacity: int = CHUNK_SIZE):
+        self.protocols = Vocabulary(["TCP", "UDP", "ICMP"])
+        self.actions = Vocabulary(["allow", "deny"])
+        self.flags = Vocabulary(SUSPICIOUS_FLAGS, limit=16)
+        self._flag_masks: Dict[Tuple[str, ...], int] = {}
+        self._flag_lists: Dict[int, List[str]] = {}
+        # How whole-second timestamps were written: "...:05" (isoformat) or "...:05.000000"
+        self.whole_second_fraction: Optional[bool] = None
+        self.size = 0
+        self.columns = {
+            name: np.zeros((capacity,) + shape, dtype=dtype) for name, (dtype, shape) in COLUMNS.items()
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "CompactNetworkLogs":
+        logs = cls()
+        logs.extend(records)
+        return logs
+
+    @classmethod
+    def generate(cls, num_records: int, **kwargs) -> "CompactNetworkLogs":
+        """
+        Draw network logs with batch_generator straight into compact form
+
+        Args:
+            num_records: Number of logs
+            **kwargs: BatchGenerator options (seed, days_ago, end_time, block_size)
+        """
+        logs = cls(capacity=num_records)
+        deny = logs.actions.code("deny")
+        suspicious_mask = logs.flag_mask(SUSPICIOUS_FLAGS)
+        for columns in BatchGenerator(**kwargs).iter_network_blocks(num_records):
+            suspicious = columns.pop("suspicious")
+            columns["action"] = np.where(suspicious, deny, logs.actions.code("allow"))
+            columns["flags"] = np.where(suspicious, suspicious_mask, 0)
+            logs._append(columns, encoded=("action", "flags"))
+        return logs
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the stored records (excluding spare capacity)"""
+        return sum(column[:self.size].nbytes for column in self.columns.values())
+
+    def flag_mask(self, flags: Iterable[str]) -> int:
+        """Bitmask for a flags list; the list must be in vocabulary order to round-trip"""
+        key = tuple(flags)
+        mask = self._flag_masks.get(key)
+        if mask is None:
+            mask = 0
+            for flag in key:
+                mask |= 1 << self.flags.code(flag)
+            if self.flag_list(mask) != list(key):
+                raise ValueError(f"flags {list(key)} are not in canonical order {self.flags.values}")
+            self._flag_masks[key] = mask
+        return mask
+
+    def flag_list(self, mask: int) -> List[str]:
+        flags = self._flag_lists.get(mask)
+        if flags is None:
+            flags = self._flag_lists[mask] = [
+                flag for bit, flag in enumerate(self.flags.values) if mask >> bit & 1
+            ]
+        return flags
+
+    def extend(self, records: Iterable[Dict], chunk_size: int = CHUNK_SIZE):
+        """Append records in the generator's network-log schema"""
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) == chunk_size:
+                self._append_records(chunk)
+                chunk = []
+        if chunk:
+            self._append_records(chunk)
+
+    def append(self, record: Dict):
+        self._append_records([record])
+
+    def _append_records(self, records: List[Dict]):
+        columns = {name: [record[name] for record in records] for name in NETWORK_FIELDS}
+        columns["flags"] = [self.flag_mask(flags) for flags in columns["flags"]]
+        columns["session_duration"] = [
+            NO_DURATION if duration is None else duration for duration in columns["session_duration"]
+        ]
+        self._append(columns, encoded=("flags",))
+
+    def _append(self, columns: Dict, encoded: Tuple[str, ...] = ()):
+        """Encode one block of columns (lists or arrays of schema values) and store it"""
+        n = len(columns["log_id"])
+        values = {
+            "log_id": encode_uuids(columns["log_id"]),
+            "timestamp": self._encode_timestamps(columns["timestamp"]),
+            "source_ip": encode_ipv4(columns["source_ip"]),
+            "destination_ip": encode_ipv4(columns["destination_ip"]),
+        }
+        for name, vocabulary in (("protocol", self.protocols), ("action", self.actions)):
+            values[name] = columns[name] if name in encoded else vocabulary.encode(columns[name])
+        for name in ("source_port", "destination_port", "bytes_sent", "bytes_received",
+                     "packets", "flags", "session_duration"):
+            column = np.asarray(columns[name])
+            dtype = COLUMNS[name][0]
+            info = np.iinfo(dtype)
+            if len(column) and (column.min() < info.min or column.max() > info.max):
+                raise ValueError(f"{name} out of range for {np.dtype(dtype).name}")
+            values[name] = column
+
+        self._reserve(self.size + n)
+        for name, column in values.items():
+            self.columns[name][self.size:self.size + n] = column
+        self.size += n
+
+    def _encode_timestamps(self, timestamps) -> np.ndarray:
+        text = np.asarray(timestamps, dtype=str)
+        with warnings.catch_warnings():
+            # Offsets are parsed (as UTC) with a warning; the round-trip check rejects them
+            warnings.simplefilter("ignore")
+            values = text.astype("datetime64[us]")
+        whole = values.astype(np.int64) % 1000000 == 0
+        if whole.any():
+            lengths = set(np.char.str_len(text[whole]).tolist())
+            styles = {length == 26 for length in lengths}
+            if self.whole_second_fraction is not None:
+                styles.add(self.whole_second_fraction)
+            if len(styles) > 1:
+                raise ValueError("whole-second timestamps are written both with and without microseconds")
+            self.whole_second_fraction = styles.pop()
+        rendered = _render_timestamps(values, bool(self.whole_second_fraction))
+        mismatched = np.flatnonzero(rendered != text.astype(object))
+        if len(mismatched):
+            raise ValueError(f"timestamp {text[mismatched[0]]!r} is not a naive ISO timestamp")
+        return values
+
+    def _reserve(self, size: int):
+        capacity = len(self.columns["log_id"])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for name, column in self.columns.items():
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def column(self, name: str) -> np.ndarray:
+        """The stored values of one column (a view, no copy)"""
+        return self.columns[name][:self.size]
+
+    # --- Output ---------------------------------------------------------------
+
+    def iter_records(self, start: int = 0, stop: Optional[int] = None,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+        """Yield records as dicts in the original schema, decoding a chunk at a time"""
+        stop = self.size if stop is None else min(stop, self.size)
+        for offset in range(start, stop, chunk_size):
+            end = min(offset + chunk_size, stop)
+            yield from self._decode(offset, end)
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return next(self._decode(index, index + 1))
+
+    def _decode(self, start: int, stop: int) -> Iterator[Dict]:
+        columns = {name: column[start:stop] for name, column in self.columns.items()}
+        durations = columns["session_duration"].astype(object)
+        durations[columns["session_duration"] == NO_DURATION] = None
+        flag_list = self.flag_list
+        for row in zip(
+            format_uuids(columns["log_id"]).tolist(),
+            _render_timestamps(columns["timestamp"], bool(self.whole_second_fraction)).tolist(),
+            self.protocols.decode(columns["protocol"]).tolist(),
+            decode_ipv4(columns["source_ip"]).tolist(),
+            columns["source_port"].tolist(),
+            decode_ipv4(columns["destination_ip"]).tolist(),
+            columns["destination_port"].tolist(),
+            columns["bytes_sent"].tolist(),
+            columns["bytes_received"].tolist(),
+            columns["packets"].tolist(),
+            self.actions.decode(columns["action"]).tolist(),
+            columns["flags"].tolist(),
+            durations.tolist(),
+        ):
+            yield {
+                "log_id": row[0],
+                "timestamp": row[1],
+                "protocol": row[2],
+                "source_ip": row[3],
+                "source_port": row[4],
+                "destination_ip": row[5],
+                "destination_port": row[6],
+                "bytes_sent": row[7],
+                "bytes_received": row[8],
+                "packets": row[9],
+                "action": row[10],
+                "flags": list(flag_list(row[11])),
+                "session_duration": row[12]
+            }
+
+    # --- Queries --------------------------------------------------------------
+
+    def where(self, action: Optional[str] = None, protocol: Optional[str] = None,
+              cidr: Optional[str] = None, field: str = "source_ip") -> np.ndarray:
+        """Boolean mask of records matching every given filter"""
+        mask = np.ones(self.size, dtype=bool)
+        if action is not None:
+            mask &= self.column("action") == self.actions.codes.get(action, -1)
+        if protocol is not None:
+            mask &= self.column("protocol") == self.protocols.codes.get(protocol, -1)
+        if cidr is not None:
+            network = ipaddress.IPv4Network(cidr, strict=False)
+            netmask = np.uint32(int(network.netmask))
+            mask &= (self.column(field) & netmask) == np.uint32(int(network.network_address))
+        return mask
+
+    def aggregate(self, field: str = "source_ip", prefix: int = 24, by: str = "count",
+                  mask: Optional[np.ndarray] = None) -> List[Tuple[str, int]]:
+        """
+        Totals per subnet, largest first
+
+        Args:
+            field: source_ip or destination_ip
+            prefix: Subnet prefix length to group by (32 = single addresses)
+            by: count, bytes (sent + received), bytes_sent, bytes_received or packets
+            mask: Only aggregate records where this boolean array is True
+
+        Returns:
+            [(CIDR, total)] sorted by total descending
+        """
+        if not 0 <= prefix <= 32:
+            raise ValueError(f"prefix must be between 0 and 32, got {prefix}")
+        netmask = np.uint32((0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF)
+        keys = self.column(field) & netmask
+        weights = None
+        if by == "bytes":
+            weights = self.column("bytes_sent") + self.column("bytes_received")
+        elif by != "count":
+            weights = self.column(by)
+        if mask is not None:
+            keys = keys[mask]
+            weights = None if weights is None else weights[mask]
+
+        subnets, inverse = np.unique(keys, return_inverse=True)
+        # float64 sums are exact up to 2**53 (8 PiB)
+        totals = np.bincount(inverse, weights=weights, minlength=len(subnets))
+        ranking = np.argsort(-totals, kind="stable")
+        return [
+            (f"{ipaddress.IPv4Address(int(subnets[i]))}/{prefix}", int(totals[i])) for i in ranking
+        ]
+
+    def top_talkers(self, n: int = 10, prefix: int = 32, field: str = "source_ip",
+                    by: str = "bytes") -> List[Tuple[str, int]]:
+        """Addresses (or subnets) with the most traffic"""
+        return self.aggregate(field, prefix, by)[:n]
+
+    def deny_counts(self, prefix: int = 24, field: str = "source_ip") -> List[Tuple[str, int]]:
+        """Denied flows per subnet, most first"""
+        return self.aggregate(field, prefix, "count", mask=self.where(action="deny"))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load network logs into compact form and run subnet aggregations"
+    )
+    parser.add_argument("inputs", nargs="*", help="Network log files (.json or .ndjson)")
+    parser.add_argument("--generate", type=int, help="Generate N network logs instead of reading files")
+    parser.add_argument("--seed", type=int, help="Seed for --generate")
+    parser.add_argument("--days", type=int, default=30, help="Days covered by --generate (default: 30)")
+    parser.add_argument("--top", type=int, default=10, help="Rows per report (default: 10)")
+    parser.add_argument("--prefix", type=int, default=24, help="Subnet prefix for deny counts (default: 24)")
+    parser.add_argument("--cidr", help="Only report flows whose source is in this subnet")
+    parser.add_argument("-o", "--output", help="Write the records back out as NDJSON")
+    args = parser.parse_args()
+
+    if args.generate:
+        logs = CompactNetworkLogs.generate(args.generate, seed=args.seed, days_ago=args.days)
+    elif args.inputs:
+        from anomaly_detector import iter_log_file
+        logs = CompactNetworkLogs()
+        for path in args.inputs:
+            logs.extend(iter_log_file(path))
+    else:
+        parser.error("give network log files or --generate N")
+
+    print(f"[OK] Loaded {len(logs)} network logs into {logs.nbytes / 2**20:.1f} MiB "
+          f"({logs.nbytes / max(len(logs), 1):.0f} bytes/record)")
+
+    mask = logs.where(cidr=args.cidr) if args.cidr else None
+    print(f"\nTop talkers by bytes{f' in {args.cidr}' if args.cidr else ''}:")
+    for address, total in logs.aggregate("source_ip", 32, "bytes", mask=mask)[:args.top]:
+        print(f"  - {address}: {total:,} bytes")
+    deny_mask = logs.where(action="deny", cidr=args.cidr)
+    print(f"\nDenied flows per /{args.prefix}:")
+    for subnet, count in logs.aggregate("source_ip", args.prefix, "count", mask=deny_mask)[:args.top]:
+        print(f"  - {subnet}: {count:,}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            for record in logs.iter_records():
+                f.write(json.dumps(record))
+                f.write("\n")
+        print(f"\n[OK] Saved {len(logs)} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Event Correlation for Zero-Trust Cloud Lab
+Time-windowed streaming join that attaches related security events and
+network flows to each authentication log
+"""
+
+import argparse
+import heapq
+import json
+import time
+from collections import deque
+from itertools import islice
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_WINDOW_SECONDS = 300
+DEFAULT_MAX_RELATED = 50
+
+# Dataset -> fields its records are hash-indexed on for the join
+SECURITY_KEYS = ("user_id", "source_ip")
+NETWORK_KEYS = ("source_ip",)
+# Record ID field per dataset (what --ids-only keeps)
+ID_FIELDS = {"security": "event_id", "network": "log_id"}
+
+AUTH, SECURITY, NETWORK = 0, 1, 2
+
+
+def to_epoch(timestamp: str) -> float:
+    """Seconds since the epoch for an ISO timestamp; naive values are taken as UTC"""
+    value = datetime.fromisoformat(timestamp)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _tagged(records: Iterable[Dict], kind: int) -> Iterator[Tuple[float, int, Dict]]:
+    """(epoch, kind, record) for one timestamp-sorted stream, checking the order"""
+    previous = float("-inf")
+    for record in records:
+        epoch = to_epoch(record["timestamp"])
+        if epoch < previous:
+            raise ValueError(f"{('authentication', 'security', 'network')[kind]} stream is not "
+                             f"sorted by timestamp at {record['timestamp']}")
+        previous = epoch
+        yield epoch, kind, record
+
+
+class WindowBuffer:
+    """
+    Recent records of one dataset, oldest first, with a hash index per key field
+
+    Records are evicted in arrival order, which is also their order within
+    every index bucket, so eviction pops from the front of each bucket.
+    """
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.records: deque = deque()
+        self.index: Dict[str, Dict[str, deque]] = {key: {} for key in keys}
+
+    def add(self, epoch: float, record: Dict):
+        self.records.append((epoch, record))
+        for key in self.keys:
+            value = record.get(key)
+            if value is not None:
+                bucket = self.index[key].get(value)
+                if bucket is None:
+                    bucket = self.index[key][value] = deque()
+                bucket.append(record)
+
+    def evict(self, cutoff: float):
+        """Drop records older than cutoff"""
+        records = self.records
+        while records and records[0][0] < cutoff:
+            _, record = records.popleft()
+            for key in self.keys:
+                value = record.get(key)
+                if value is not None:
+                    bucket = self.index[key][value]
+                    bucket.popleft()
+                    if not bucket:
+                        del self.index[key][value]
+
+    def matching(self, key: str, value) -> Iterable[Dict]:
+        return self.index[key].get(value, ())
+
+    def __len__(self):
+        return len(self.records)
+
+
+class PendingAuth:
+    """An authentication log whose window is still open, and what matched so far"""
+    __slots__ = ("epoch", "log", "related")
+
+    def __init__(self, epoch: float, log: Dict):
+        self.epoch = epoch
+        self.log = log
+        # Dicts keyed by id(record): a record matching on both user and IP counts once
+        self.related = ({}, {})
+
+    def attach(self, kind: int, record: Dict):
+        # Holding the record keeps its id() from being reused while the login is pending
+        self.related[kind - 1].setdefault(id(record), record)
+
+
+class CorrelationJoin:
+    """
+    Sorted-merge join of authentication logs with security events and flows
+
+    A security event is related to a login when it shares the user_id or the
+    source_ip; a network flow when it shares the source_ip. Either must fall
+    within [login - before, login + after]. The three timestamp-sorted
+    streams are merged into one sweep. Events seen in the last `before`
+    seconds sit in hash-indexed buffers for logins to look up. Logins stay
+    pending for `after` seconds, indexed the same way, so later events can
+    attach to them. Memory is bounded by the window, not the stream length,
+    and the work is linear in the input plus the matches.
+    """
+
+    def __init__(self, before: float = DEFAULT_WINDOW_SECONDS, after: float = DEFAULT_WINDOW_SECONDS,
+                 max_related: int = DEFAULT_MAX_RELATED, ids_only: bool = False):
+        """
+        Args:
+            before: Seconds before a login in which events count as related
+            after: Seconds after a login in which events count as related
+            max_related: Records attached per login and dataset (all are counted)
+            ids_only: Attach event_id / log_id instead of whole records
+        """
+        self.before = before
+        self.after = after
+        self.max_related = max_related
+        self.ids_only = ids_only
+        self.buffers = {SECURITY: WindowBuffer(SECURITY_KEYS), NETWORK: WindowBuffer(NETWORK_KEYS)}
+        self.pending: deque = deque()
+        self.pending_index: Dict[str, Dict[str, deque]] = {"user_id": {}, "source_ip": {}}
+        self.stats = {"authentication": 0, "security": 0, "network": 0,
+                      "with_security": 0, "with_network": 0}
+
+    def _add_pending(self, pending: PendingAuth):
+        self.pending.append(pending)
+        for key, index in self.pending_index.items():
+            value = pending.log.get(key)
+            if value is not None:
+                bucket = index.get(value)
+                if bucket is None:
+                    bucket = index[value] = deque()
+                bucket.append(pending)
+
+    def _finish(self, pending: PendingAuth) -> Dict:
+        for key, index in self.pending_index.items():
+            value = pending.log.get(key)
+            if value is not None:
+                bucket = index[value]
+                bucket.popleft()
+                if not bucket:
+                    del index[value]
+
+        counts = [len(related) for related in pending.related]
+        security, network = (
+            list(islice(related.values(), self.max_related)) for related in pending.related
+        )
+        if self.ids_only:
+            security = [record.get(ID_FIELDS["security"]) for record in security]
+            network = [record.get(ID_FIELDS["network"]) for record in network]
+        self.stats["with_security"] += counts[0] > 0
+        self.stats["with_network"] += counts[1] > 0
+        return {
+            **pending.log,
+            "related_security_events": security,
+            "related_network_flows": network,
+            "related_security_count": counts[0],
+            "related_network_count": counts[1],
+        }
+
+    def _on_auth(self, epoch: float, log: Dict):
+        pending = PendingAuth(epoch, log)
+        security = self.buffers[SECURITY]
+        for key in SECURITY_KEYS:
+            for record in security.matching(key, log.get(key)):
+                pending.attach(SECURITY, record)
+        for record in self.buffers[NETWORK].matching("source_ip", log.get("source_ip")):
+            pending.attach(NETWORK, record)
+        self._add_pending(pending)
+
+    def _on_event(self, epoch: float, kind: int, record: Dict):
+        self.buffers[kind].add(epoch, record)
+        keys = SECURITY_KEYS if kind == SECURITY else NETWORK_KEYS
+        for key in keys:
+            value = record.get(key)
+            if value is None:
+                continue
+            for pending in self.pending_index[key].get(value, ()):
+                pending.attach(kind, record)
+
+    def run(self, authentication: Iterable[Dict], security: Iterable[Dict] = (),
+            network: Iterable[Dict] = ()) -> Iterator[Dict]:
+        """
+        Yield each authentication log, in timestamp order, with its related records
+
+        Every input must be sorted by timestamp (generator and collector
+        output is); a ValueError is raised otherwise.
+        """
+        streams = heapq.merge(
+            _tagged(authentication, AUTH), _tagged(security, SECURITY), _tagged(network, NETWORK),
+            key=lambda item: (item[0], item[1])
+        )
+        names = ("authentication", "security", "network")
+        buffers = self.buffers
+        pending = self.pending
+        for epoch, kind, record in streams:
+            self.stats[names[kind]] += 1
+            # Logins whose window closed before this record are complete
+            while pending and pending[0].epoch + self.after < epoch:
+                yield self._finish(pending.popleft())
+            cutoff = epoch - self.before
+            buffers[SECURITY].evict(cutoff)
+            buffers[NETWORK].evict(cutoff)
+            if kind == AUTH:
+                self._on_auth(epoch, record)
+            else:
+                self._on_event(epoch, kind, record)
+        while pending:
+            yield self._finish(pending.popleft())
+
+
+def correlate(authentication: Iterable[Dict], security: Iterable[Dict] = (),
+              network: Iterable[Dict] = (), window_seconds: float = DEFAULT_WINDOW_SECONDS,
+              max_related: int = DEFAULT_MAX_RELATED, ids_only: bool = False) -> Iterator[Dict]:
+    """Correlate with a symmetric window (see CorrelationJoin)"""
+    join = CorrelationJoin(window_seconds, window_seconds, max_related, ids_only)
+    return join.run(authentication, security, network)
+
+
+def generated_streams(num_records: int, days: int = 30, seed: int = 0):
+    """Timestamp-sorted auth/security/network streams from the generator, sharing users"""
+    import random
+    from synthetic_data_generator import iter_dataset, seeded_user_ids
+    end_time = datetime.now().replace(microsecond=0)
+    user_ids = seeded_user_ids(seed)
+    counts = (("authentication_logs", num_records), ("security_events", num_records // 2),
+              ("network_logs", num_records * 2))
+    return tuple(
+        iter_dataset(dataset, count, days, end_time, random.Random(f"{seed}:{dataset}"), user_ids)
+        for dataset, count in counts
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Attach related security events and network flows to authentication logs"
+    )
+    parser.add_argument("--auth", help="Authentication log file (.json or .ndjson, timestamp-sorted)")
+    parser.add_argument("--security", help="Security event file")
+    parser.add_argument("--network", help="Network log file")
+    parser.add_argument("--generate", type=int,
+                        help="Correlate N generated logins (N/2 security events, 2N flows) instead of files")
+    parser.add_argument("--days", type=int, default=30, help="Days covered by --generate (default: 30)")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW_SECONDS,
+                        help=f"Seconds either side of a login (default: {DEFAULT_WINDOW_SECONDS})")
+    parser.add_argument("--before", type=float, help="Seconds before a login (overrides --window)")
+    parser.add_argument("--after", type=float, help="Seconds after a login (overrides --window)")
+    parser.add_argument("--max-related", type=int, default=DEFAULT_MAX_RELATED,
+                        help=f"Records attached per login and dataset (default: {DEFAULT_MAX_RELATED})")
+    parser.add_argument("--ids-only", action="store_true",
+                        help="Attach event_id / log_id instead of whole records")
+    parser.add_argument("-o", "--output", help="Write correlated logins to this NDJSON file")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        authentication, security, network = generated_streams(args.generate, args.days)
+    elif args.auth:
+        from anomaly_detector import iter_log_file
+        authentication = iter_log_file(args.auth)
+        security = iter_log_file(args.security) if args.security else ()
+        network = iter_log_file(args.network) if args.network else ()
+    else:
+        parser.error("give --auth (with --security/--network) or --generate N")
+
+    join = CorrelationJoin(
+        args.window if args.before is None else args.before,
+        args.window if args.after is None else args.after,
+        args.max_related, args.ids_only
+    )
+    out = open(args.output, 'w') if args.output else None
+    # Failed logins with the most related activity, for the summary
+    top: List[Tuple[int, str, str, str]] = []
+    start = time.perf_counter()
+    try:
+        for log in join.run(authentication, security, network):
+            if out:
+                out.write(json.dumps(log))
+                out.write("\n")
+            if not log["success"]:
+                related = log["related_security_count"] + log["related_network_count"]
+                item = (related, log["timestamp"], log["username"], log["source_ip"])
+                if len(top) < 5:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    stats = join.stats
+    records = stats["authentication"] + stats["security"] + stats["network"]
+    print(f"[OK] Correlated {stats['authentication']} logins with {stats['security']} security events "
+          f"and {stats['network']} flows in {elapsed:.1f}s ({records / elapsed:,.0f} records/s)")
+    if stats["authentication"]:
+        print(f"  - Logins with related security events: {stats['with_security']} "
+              f"({stats['with_security'] / stats['authentication'] * 100:.1f}%)")
+        print(f"  - Logins with related network flows: {stats['with_network']} "
+              f"({stats['with_network'] / stats['authentication'] * 100:.1f}%)")
+    for related, timestamp, username, source_ip in sorted(top, reverse=True):
+        print(f"  - Failed login {username} from {source_ip} at {timestamp}: {related} related records")
+    if out:
+        print(f"[OK] Saved correlated logins to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
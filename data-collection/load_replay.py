@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Load Replay Driver for Zero-Trust Cloud Lab
+Replays synthetic authentication logs as login/MFA requests against the auth
+service, preserving inter-arrival times, and reports latency and throughput
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_BASE_URL = "http://localhost:8081"
+DEFAULT_EMAIL_DOMAIN = "zerotrust.local"
+DEFAULT_PASSWORD = "ReplayP@ssw0rd1"
+DEFAULT_CONCURRENCY = 256
+DEFAULT_CONNECTIONS = 64
+
+LOGIN_PATH = "/api/auth/login"
+VERIFY_MFA_PATH = "/api/auth/verify-mfa"
+
+
+def to_requests(log: Dict, email_domain: str = DEFAULT_EMAIL_DOMAIN,
+                password: str = DEFAULT_PASSWORD) -> List[Tuple[str, Dict]]:
+    """
+    Translate one authentication log into the auth service calls it implies
+
+    Failed logins send a wrong password; successful logins with
+    mfa_status "verified" are followed by a verify-mfa call.
+
+    Returns:
+        List of (path, JSON body) pairs, sent in order
+    """
+    body = {
+        "email": f"{log['username']}@{email_domain}",
+        "password": password if log.get("success") else password + "-wrong",
+    }
+    calls = [(LOGIN_PATH, body)]
+    if log.get("success") and log.get("mfa_status") == "verified":
+        calls.append((VERIFY_MFA_PATH, {"token": f"{random.randrange(10 ** 6):06d}"}))
+    return calls
+
+
+class ReplayStats:
+    """Latency samples and status counts per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors = 0
+        self.max_lag = 0.0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, path: str, status, latency: float):
+        self.latencies.setdefault(path, []).append(latency)
+        counts = self.statuses.setdefault(path, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+
+    @property
+    def requests(self) -> int:
+        return sum(len(samples) for samples in self.latencies.values())
+
+    @staticmethod
+    def percentile(sorted_samples: List[float], q: float) -> float:
+        if not sorted_samples:
+            return 0.0
+        index = min(len(sorted_samples) - 1, int(round(q / 100 * (len(sorted_samples) - 1))))
+        return sorted_samples[index]
+
+    def summary(self) -> Dict:
+        """Per-endpoint p50/p90/p99/max latency (ms), status counts and overall throughput"""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for path, samples in self.latencies.items():
+            ordered = sorted(samples)
+            endpoints[path] = {
+                "requests": len(ordered),
+                "p50_ms": round(self.percentile(ordered, 50) * 1000, 2),
+                "p90_ms": round(self.percentile(ordered, 90) * 1000, 2),
+                "p99_ms": round(self.percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "statuses": self.statuses[path],
+            }
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(self.requests / max(elapsed, 1e-9), 1),
+            "max_schedule_lag_ms": round(self.max_lag * 1000, 2),
+            "endpoints": endpoints,
+        }
+
+
+async def _send(session, base_url: str, calls: List[Tuple[str, Dict]], stats: ReplayStats):
+    """Send one log's calls in sequence over the shared session"""
+    import aiohttp
+
+    mfa_token = None
+    for path, body in calls:
+        if path == VERIFY_MFA_PATH and mfa_token:
+            body = dict(body, mfaToken=mfa_token)
+        start = time.perf_counter()
+        try:
+            async with session.post(base_url + path, json=body) as response:
+                payload = await response.read()
+                stats.record(path, response.status, time.perf_counter() - start)
+                if path == LOGIN_PATH and response.status == 200:
+                    try:
+                        mfa_token = json.loads(payload).get("mfaToken")
+                    except ValueError:
+                        pass
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            stats.errors += 1
+            stats.record(path, "error", time.perf_counter() - start)
+            return
+
+
+async def replay(logs: Iterable[Dict], base_url: str = DEFAULT_BASE_URL,
+                 speedup: Optional[float] = 1.0,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 connections: int = DEFAULT_CONNECTIONS,
+                 timeout: float = 10.0,
+                 email_domain: str = DEFAULT_EMAIL_DOMAIN,
+                 password: str = DEFAULT_PASSWORD) -> ReplayStats:
+    """
+    Fire requests for a time-ordered stream of authentication logs
+
+    Each log is scheduled at (its timestamp - first timestamp) / speedup
+    after the start; speedup None sends as fast as concurrency allows.
+    Requests share one keep-alive connection pool, and at most concurrency
+    logs are in flight, so a slow server delays the schedule rather than
+    growing memory (the worst lag is reported).
+
+    Args:
+        logs: Authentication logs in timestamp order
+        base_url: Auth service root, e.g. http://localhost:8081
+        speedup: Time compression factor, or None for no pacing
+        concurrency: Maximum logs in flight
+        connections: Size of the keep-alive connection pool
+        timeout: Per-request timeout in seconds
+        email_domain: Domain appended to usernames to form login emails
+        password: Password sent for successful logins
+
+    Returns:
+        ReplayStats with latency samples and status counts
+    """
+    import aiohttp
+
+    base_url = base_url.rstrip("/")
+    stats = ReplayStats()
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def run(calls):
+        try:
+            await _send(session, base_url, calls, stats)
+        finally:
+            slots.release()
+
+    connector = aiohttp.TCPConnector(limit=connections, keepalive_timeout=60)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first = None
+        for log in logs:
+            if speedup:
+                at = datetime.fromisoformat(log["timestamp"])
+                first = first or at
+                due = start + (at - first).total_seconds() / speedup
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    stats.max_lag = max(stats.max_lag, -delay)
+            await slots.acquire()
+            task = asyncio.ensure_future(run(to_requests(log, email_domain, password)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    stats.finished = time.perf_counter()
+    return stats
+
+
+async def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0):
+    """
+    Start a minimal stand-in for the auth service's login/MFA endpoints
+
+    Passwords ending in "-wrong" get 401; other logins return an MFA token
+    half of the time. Useful for exercising the driver without the stack.
+
+    Returns:
+        (runner, base_url); call runner.cleanup() to stop
+    """
+    from aiohttp import web
+
+    async def login(request):
+        body = await request.json()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if str(body.get("password", "")).endswith("-wrong"):
+            return web.json_response({"error": "Invalid credentials"}, status=401)
+        if random.random() < 0.5:
+            return web.json_response({"requiresMfa": True, "mfaToken": "stub-mfa-token"})
+        return web.json_response({"accessToken": "stub-access-token"})
+
+    async def verify_mfa(request):
+        await request.json()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return web.json_response({"accessToken": "stub-access-token"})
+
+    app = web.Application()
+    app.router.add_post(LOGIN_PATH, login)
+    app.router.add_post(VERIFY_MFA_PATH, verify_mfa)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def iter_logs(args: argparse.Namespace) -> Iterator[Dict]:
+    """Logs to replay: generated on the fly or read from files"""
+    if args.generate:
+        from synthetic_data_generator import iter_authentication_log
+        return iter_authentication_log(args.generate, days_ago=args.days)
+    from anomaly_detector import iter_log_file
+    return (log for path in args.inputs for log in iter_log_file(path))
+
+
+async def run_replay(args: argparse.Namespace) -> Dict:
+    """Run the replay described by the CLI arguments, starting a stub server if asked"""
+    runner = None
+    base_url = args.base_url
+    if args.stub:
+        runner, base_url = await start_stub_server(latency_ms=args.stub_latency_ms)
+        print(f"Stub auth service listening on {base_url}")
+    try:
+        stats = await replay(
+            iter_logs(args), base_url,
+            speedup=None if args.no_wait else args.speedup,
+            concurrency=args.concurrency, connections=args.connections,
+            timeout=args.timeout, email_domain=args.email_domain, password=args.password
+        )
+    finally:
+        if runner:
+            await runner.cleanup()
+    return stats.summary()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Replay authentication logs against the auth service")
+    parser.add_argument("inputs", nargs="*", help="Authentication log files (.json or .ndjson)")
+    parser.add_argument("--generate", type=int, help="Replay N freshly generated logs instead of files")
+    parser.add_argument("--days", type=float, default=1,
+                        help="History covered by --generate logs (default: 1 day)")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL,
+                        help=f"Auth service base URL (default: {DEFAULT_BASE_URL})")
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="Replay N times faster than the original inter-arrival times")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Ignore timestamps and send as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum logs in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"Keep-alive connection pool size (default: {DEFAULT_CONNECTIONS})")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--email-domain", default=DEFAULT_EMAIL_DOMAIN,
+                        help="Domain appended to usernames for login emails")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD,
+                        help="Password sent for logins that succeeded in the log")
+    parser.add_argument("--stub", action="store_true",
+                        help="Replay against a local stub server instead of --base-url")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0,
+                        help="Artificial latency added by the stub server")
+    parser.add_argument("--report", help="Write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    if not args.generate and not args.inputs:
+        parser.error("give input files or --generate N")
+
+    summary = asyncio.run(run_replay(args))
+
+    print(f"[OK] Sent {summary['requests']} requests in {summary['elapsed_seconds']}s "
+          f"({summary['requests_per_second']:,} req/sec, {summary['errors']} errors, "
+          f"max lag {summary['max_schedule_lag_ms']} ms)")
+    for path, endpoint in summary["endpoints"].items():
+        print(f"  {path}: p50 {endpoint['p50_ms']} ms, p90 {endpoint['p90_ms']} ms, "
+              f"p99 {endpoint['p99_ms']} ms, statuses {endpoint['statuses']}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"[OK] Saved report to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
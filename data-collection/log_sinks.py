@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Streaming Log Sinks for Zero-Trust Cloud Lab
+Writes log entries to NDJSON and CSV (plus optional Parquet/Arrow) in a
+single pass with buffering, optional compression and size/time based file rotation
+"""
+
+import csv
+import gzip
+import io
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024  # 1 MiB
+COMPRESSION_EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def open_compressed(path: str, compression: Optional[str] = None):
+    """
+    Open a binary output stream, optionally compressed
+
+    Args:
+        path: Output file path
+        compression: None, "gzip" or "zstd"
+
+    Returns:
+        Writable binary file object
+    """
+    if compression is None:
+        return open(path, 'wb')
+    if compression == "gzip":
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires: pip install zstandard")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class RotatingFileWriter:
+    """
+    Buffered binary writer that rolls over to a new file by size or age
+
+    Rotated files are named base.0001.ext, base.0002.ext, ...; without
+    rotation the single file is base.ext. Size limits apply to
+    uncompressed bytes and rotation only happens between writes, so a
+    record is never split across files.
+    """
+
+    def __init__(self, base_path: str, extension: str, compression: Optional[str] = None,
+                 max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                 header: bytes = b"", buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        Args:
+            base_path: Output path without extension
+            extension: File extension such as ".ndjson"
+            compression: None, "gzip" or "zstd"
+            max_bytes: Rotate once a file reaches this many uncompressed bytes
+            max_seconds: Rotate once a file has been open this long
+            header: Bytes written at the start of every file (e.g. a CSV header)
+            buffer_size: Bytes accumulated in memory before each write
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.base_path = base_path
+        self.extension = extension + COMPRESSION_EXTENSIONS[compression]
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.header = header
+        self.buffer_size = buffer_size
+        self.rotating = bool(max_bytes or max_seconds)
+
+        self.files: List[str] = []
+        self._stream = None
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._file_bytes = 0
+        self._opened_at = 0.0
+
+    def _next_path(self) -> str:
+        if not self.rotating:
+            return self.base_path + self.extension
+        return f"{self.base_path}.{len(self.files) + 1:04d}{self.extension}"
+
+    def _open(self):
+        path = self._next_path()
+        self._stream = open_compressed(path, self.compression)
+        self.files.append(path)
+        self._file_bytes = 0
+        self._opened_at = time.monotonic()
+        if self.header:
+            self._buffer(self.header)
+
+    def _buffer(self, data: bytes):
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        self._file_bytes += len(data)
+        if self._pending_bytes >= self.buffer_size:
+            self.flush()
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self._file_bytes >= self.max_bytes:
+            return True
+        if self.max_seconds and time.monotonic() - self._opened_at >= self.max_seconds:
+            return True
+        return False
+
+    def write(self, data: bytes):
+        """Buffer one complete record, rotating first if the current file is full"""
+        if self._stream is None:
+            self._open()
+        elif self.rotating and self._should_rotate():
+            self._close_current()
+            self._open()
+        self._buffer(data)
+
+    def flush(self):
+        """Write buffered bytes to the underlying stream"""
+        if self._pending and self._stream is not None:
+            self._stream.write(b"".join(self._pending))
+        self._pending = []
+        self._pending_bytes = 0
+
+    def sync(self):
+        """Flush, then push the open file's own buffer to the OS"""
+        self.flush()
+        if self._stream is not None:
+            self._stream.flush()
+
+    def _close_current(self):
+        self.flush()
+        self._stream.close()
+        self._stream = None
+
+    def close(self):
+        """Flush and close the current file"""
+        if self._stream is not None:
+            self._close_current()
+
+
+class LogSink:
+    """
+    Single-pass sink writing log entries to NDJSON, CSV, Parquet and/or Arrow
+
+    Each entry is JSON-serialized exactly once for the NDJSON output, and
+    formatted once more as a CSV row; nothing is kept after it is written,
+    so memory stays flat however many entries flow through.
+
+    Usage:
+        with LogSink("azure_activity_logs", compression="gzip") as sink:
+            sink.write_all(collector.iter_activity_logs(days=7))
+    """
+
+    def __init__(self, base_path: str, formats: Sequence[str] = ("ndjson", "csv"),
+                 fieldnames: Optional[Sequence[str]] = None, compression: Optional[str] = None,
+                 max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, dataset: str = "activity"):
+        """
+        Args:
+            base_path: Output path without extension
+            formats: Any of "ndjson", "csv", "parquet" and "arrow"
+            fieldnames: CSV columns (defaults to the keys of the first entry)
+            compression: None, "gzip" or "zstd"
+            max_bytes: Rotate files at this many uncompressed bytes
+            max_seconds: Rotate files after this many seconds
+            buffer_size: Bytes buffered per output before writing
+            dataset: Columnar schema name for parquet/arrow output (not rotated)
+        """
+        unknown = set(formats) - {"ndjson", "csv", "parquet", "arrow"}
+        if unknown:
+            raise ValueError(f"Unsupported sink formats: {sorted(unknown)}")
+        self.base_path = base_path
+        self.formats = tuple(formats)
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.count = 0
+        self._writer_options = dict(
+            compression=compression, max_bytes=max_bytes,
+            max_seconds=max_seconds, buffer_size=buffer_size
+        )
+
+        self._ndjson = None
+        if "ndjson" in self.formats:
+            self._ndjson = RotatingFileWriter(base_path, ".ndjson", **self._writer_options)
+        self._csv = None
+        self._row_buffer = io.StringIO()
+        self._row_writer = csv.writer(self._row_buffer)
+
+        self._columnar = []
+        for columnar_format in ("parquet", "arrow"):
+            if columnar_format in self.formats:
+                from columnar_output import ColumnarWriter
+                self._columnar.append(ColumnarWriter(
+                    f"{base_path}.{columnar_format}", dataset, columnar_format
+                ))
+
+    def _csv_row(self, values: List) -> bytes:
+        self._row_buffer.seek(0)
+        self._row_buffer.truncate()
+        self._row_writer.writerow(values)
+        return self._row_buffer.getvalue().encode()
+
+    def _open_csv(self, entry: Dict):
+        if self.fieldnames is None:
+            self.fieldnames = list(entry.keys())
+        self._csv = RotatingFileWriter(
+            self.base_path, ".csv", header=self._csv_row(self.fieldnames), **self._writer_options
+        )
+
+    def write(self, entry: Dict):
+        """Write one log entry to every configured format"""
+        if self._ndjson is not None:
+            self._ndjson.write(json.dumps(entry, default=str).encode() + b"\n")
+        if "csv" in self.formats:
+            if self._csv is None:
+                self._open_csv(entry)
+            self._csv.write(self._csv_row([entry.get(name) for name in self.fieldnames]))
+        for writer in self._columnar:
+            writer.write(entry)
+        self.count += 1
+
+    def write_all(self, entries: Iterable[Dict]) -> int:
+        """
+        Consume an iterable of entries
+
+        Returns:
+            Number of entries written by this call
+        """
+        start = self.count
+        for entry in entries:
+            self.write(entry)
+        return self.count - start
+
+    @property
+    def files(self) -> List[str]:
+        """All files produced so far, NDJSON first"""
+        files = []
+        for writer in (self._ndjson, self._csv):
+            if writer is not None:
+                files.extend(writer.files)
+        files.extend(writer.path for writer in self._columnar)
+        return files
+
+    def flush(self):
+        """Push buffered NDJSON/CSV bytes to the OS (columnar batches stay buffered)"""
+        for writer in (self._ndjson, self._csv):
+            if writer is not None:
+                writer.sync()
+
+    def close(self):
+        """Flush buffers and close all outputs"""
+        for writer in (self._ndjson, self._csv, *self._columnar):
+            if writer is not None:
+                writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Log Sources for Zero-Trust Cloud Lab
+Pluggable collection sources (activity logs, NSG flow logs, Entra ID sign-ins,
+Defender for Cloud alerts), a token-bucket rate limiter and a scheduler that
+runs sources concurrently
+"""
+
+import argparse
+import codecs
+import io
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+from metrics import REGISTRY as metrics
+
+DEFAULT_READ_SIZE = 1024 * 1024
+NSG_FLOW_LOG_CONTAINER = "insights-logs-networksecuritygroupflowevent"
+GRAPH_SIGNINS_URL = "https://graph.microsoft.com/v1.0/auditLogs/signIns"
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+# Namespace for deterministic flow log IDs, so re-reading a blob yields the same log_id
+FLOW_LOG_NAMESPACE = uuid.UUID("5f0d7c3e-6a53-4c1e-9d0b-2b7a5e0f9c41")
+
+SEVERITY_RISK_SCORES = {"high": 90.0, "medium": 60.0, "low": 30.0, "informational": 10.0}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Allows bursts of up to capacity calls, refilled at rate tokens per
+    second; acquire() blocks until a token is available. A rate of None
+    disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(rate or 1.0, 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Take tokens, sleeping until the bucket has refilled enough"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.waited += wait
+            self.sleep(wait)
+
+    def pages(self, pager: Iterable) -> Iterator:
+        """
+        Yield the pages of a lazy Azure pager, taking a token before each one
+
+        Pagers send a request when advanced, so each page costs one token
+        (plus one for the final advance that finds no further page).
+        """
+        pager = iter(pager)
+        while True:
+            self.acquire()
+            try:
+                page = next(pager)
+            except StopIteration:
+                return
+            yield page
+
+
+class HttpStatusError(Exception):
+    """HTTP error carrying status_code/response so call_with_retry can back off"""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}: {response.url}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+class LogSource:
+    """
+    Base class for a collection source
+
+    Subclasses implement collect(), calling self.limiter.acquire() before
+    each remote request (API page, blob download; limiter.pages() does this
+    for an Azure pager), and yield entries in the schema named by output_name.
+    """
+
+    name = "source"
+    output_name = "logs"
+    default_rate: Optional[float] = None  # requests per second
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.limiter = TokenBucket(rate if rate is not None else self.default_rate, burst)
+
+    def collect(self) -> Iterator[Dict]:
+        raise NotImplementedError
+
+    def collect_since(self, since: Optional[datetime]) -> Iterator[Dict]:
+        """
+        Entries from since onwards, for repeated polling (None: the full lookback)
+
+        Sources without a time filter return everything collect() does;
+        pollers deduplicate what was already seen.
+        """
+        return self.collect()
+
+
+class ActivityLogSource(LogSource):
+    """Azure Monitor activity logs via AzureLogCollector's windowed fan-out"""
+
+    name = "activity"
+    output_name = "azure_activity_logs"
+
+    def __init__(self, collector, days: int = 7, window_hours: int = 6, max_workers: int = 4,
+                 rate: Optional[float] = None, burst: Optional[float] = None):
+        super().__init__(rate, burst)
+        self.collector = collector
+        self.days = days
+        self.window_hours = window_hours
+        self.max_workers = max_workers
+
+    def collect(self) -> Iterator[Dict]:
+        self.collector.rate_limiter = self.limiter
+        return self.collector.iter_activity_logs(self.days, self.window_hours, self.max_workers)
+
+    def collect_since(self, since: Optional[datetime]) -> Iterator[Dict]:
+        if since is None:
+            return self.collect()
+        self.collector.rate_limiter = self.limiter
+        return self.collector.iter_activity_logs_between(
+            since, datetime.now(timezone.utc), self.window_hours, self.max_workers
+        )
+
+
+def _epoch_to_iso(value: str) -> str:
+    return datetime.fromtimestamp(int(value), timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _int_or_none(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+
+def flow_tuple_to_log(flow_tuple: str, resource_id: str = "", rule: str = "") -> Dict:
+    """
+    Decode one NSG flow log tuple into the generator's network-log schema
+
+    Version 2 tuples are "ts,src,dst,sport,dport,proto,dir,decision,state,
+    pkts_out,bytes_out,pkts_in,bytes_in"; version 1 stops after decision.
+    Counters are empty on flow-begin ("B") tuples.
+    """
+    fields = flow_tuple.split(",")
+    (timestamp, source_ip, destination_ip, source_port, destination_port,
+     protocol, _direction, decision) = fields[:8]
+    packets_out = _int_or_none(fields[9]) if len(fields) > 9 else None
+    bytes_out = _int_or_none(fields[10]) if len(fields) > 10 else None
+    packets_in = _int_or_none(fields[11]) if len(fields) > 11 else None
+    bytes_in = _int_or_none(fields[12]) if len(fields) > 12 else None
+    return {
+        "log_id": str(uuid.uuid5(FLOW_LOG_NAMESPACE, f"{resource_id}|{rule}|{flow_tuple}")),
+        "timestamp": _epoch_to_iso(timestamp),
+        "protocol": "TCP" if protocol == "T" else "UDP" if protocol == "U" else protocol,
+        "source_ip": source_ip,
+        "source_port": int(source_port),
+        "destination_ip": destination_ip,
+        "destination_port": int(destination_port),
+        "bytes_sent": bytes_out or 0,
+        "bytes_received": bytes_in or 0,
+        "packets": (packets_out or 0) + (packets_in or 0),
+        "action": "deny" if decision == "D" else "allow",
+        "flags": [],
+        "session_duration": None
+    }
+
+
+def _iter_json_array_items(stream: Union[TextIO, BinaryIO],
+                           read_size: int = DEFAULT_READ_SIZE) -> Iterator[Dict]:
+    """
+    Yield the objects of the top-level "records" array one at a time
+
+    Only the current record is held in memory, so hour-long flow log blobs
+    (hundreds of MB) are parsed with flat memory. Binary streams are decoded
+    as UTF-8 incrementally, so characters split across chunks survive.
+    """
+    decoder = json.JSONDecoder()
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        chunk = stream.read(read_size)
+        while isinstance(chunk, bytes):
+            text = decode(chunk, final=not chunk)
+            # A chunk holding only part of a character decodes to nothing yet
+            chunk = stream.read(read_size) if chunk and not text else text
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    # Skip to the opening bracket of the records array
+    while True:
+        index = buffer.find("[", position)
+        if index >= 0:
+            position = index + 1
+            break
+        position = len(buffer)
+        if not fill():
+            return
+
+    while True:
+        # Skip whitespace and separators between records
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) or not fill():
+                break
+        if position >= len(buffer) or buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Record spans the chunk boundary; read more and retry
+            if eof or not fill():
+                raise
+            continue
+        position = end
+        yield item
+
+
+def parse_flow_log(stream: Union[TextIO, BinaryIO],
+                   read_size: int = DEFAULT_READ_SIZE) -> Iterator[Dict]:
+    """
+    Stream network-log entries out of an NSG flow log blob (versions 1 and 2)
+
+    Args:
+        stream: Text or binary (UTF-8) stream over a PT1H.json blob ({"records": [...]})
+        read_size: Characters (bytes, for a binary stream) read per chunk
+    """
+    for record in _iter_json_array_items(stream, read_size):
+        resource_id = record.get("resourceId", "")
+        for rule_flows in record.get("properties", {}).get("flows", []):
+            rule = rule_flows.get("rule", "")
+            for mac_flows in rule_flows.get("flows", []):
+                for flow_tuple in mac_flows.get("flowTuples", []):
+                    yield flow_tuple_to_log(flow_tuple, resource_id, rule)
+
+
+class NsgFlowLogSource(LogSource):
+    """
+    NSG flow logs read from their storage container
+
+    Blobs are listed under an optional prefix (e.g. one NSG's resourceId
+    path), downloaded one at a time as streams and parsed record by record.
+    """
+
+    name = "nsg"
+    output_name = "nsg_flow_logs"
+    default_rate = 20.0
+
+    def __init__(self, blob_service_client, container: str = NSG_FLOW_LOG_CONTAINER,
+                 prefix: Optional[str] = None, since: Optional[datetime] = None,
+                 rate: Optional[float] = None, burst: Optional[float] = None):
+        super().__init__(rate, burst)
+        self.blob_service_client = blob_service_client
+        self.container = container
+        self.prefix = prefix
+        self.since = since
+
+    @staticmethod
+    def blob_prefix(subscription_id: str, resource_group: str, nsg_name: str) -> str:
+        """Blob name prefix Azure uses for one NSG's flow logs"""
+        return (f"resourceId=/SUBSCRIPTIONS/{subscription_id}/RESOURCEGROUPS/{resource_group}/"
+                f"PROVIDERS/MICROSOFT.NETWORK/NETWORKSECURITYGROUPS/{nsg_name}/").upper()
+
+    def collect(self) -> Iterator[Dict]:
+        return self.collect_since(None)
+
+    def collect_since(self, since: Optional[datetime]) -> Iterator[Dict]:
+        # Hourly blobs are rewritten as the hour fills, so modified time is the filter
+        since = max(filter(None, (self.since, since)), default=None)
+        container = self.blob_service_client.get_container_client(self.container)
+        for blob in container.list_blobs(name_starts_with=self.prefix):
+            if since and blob.last_modified and blob.last_modified < since:
+                continue
+            self.limiter.acquire()
+            downloader = container.get_blob_client(blob.name).download_blob()
+            stream = io.TextIOWrapper(_ChunkReader(downloader.chunks()), encoding="utf-8")
+            yield from parse_flow_log(stream)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Raw binary stream over an iterator of byte chunks (a blob download)"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def signin_to_log(signin: Dict) -> Dict:
+    """Map a Microsoft Graph signIn resource onto the authentication-log schema"""
+    status = signin.get("status") or {}
+    success = status.get("errorCode", 0) == 0
+    location = signin.get("location") or {}
+    device = signin.get("deviceDetail") or {}
+    mfa = signin.get("authenticationRequirement") == "multiFactorAuthentication"
+    risk_level = signin.get("riskLevelAggregated") or "none"
+    return {
+        "log_id": signin.get("id"),
+        "timestamp": signin.get("createdDateTime"),
+        "user_id": signin.get("userId"),
+        "username": signin.get("userPrincipalName"),
+        "authentication_method": "mfa" if mfa else "sso" if signin.get("isInteractive") is False else "password",
+        "source_ip": signin.get("ipAddress"),
+        "location": ", ".join(part for part in (location.get("city"), location.get("countryOrRegion")) if part),
+        "device_info": " / ".join(part for part in (device.get("browser"), device.get("operatingSystem")) if part),
+        "success": success,
+        "risk_level": "low" if risk_level in ("none", "hidden", "unknownFutureValue") else risk_level,
+        "mfa_status": "verified" if mfa and success else "not_required",
+        "failure_reason": None if success else status.get("failureReason")
+    }
+
+
+class EntraSignInSource(LogSource):
+    """Entra ID (Azure AD) sign-in logs from Microsoft Graph, paged via @odata.nextLink"""
+
+    name = "entra"
+    output_name = "entra_signin_logs"
+    default_rate = 5.0
+
+    def __init__(self, credential, days: int = 1, session=None, page_size: int = 999,
+                 rate: Optional[float] = None, burst: Optional[float] = None):
+        super().__init__(rate, burst)
+        self.credential = credential
+        self.days = days
+        self.session = session
+        self.page_size = page_size
+
+    def _get_page(self, url: str, params: Optional[Dict]) -> Dict:
+        token = self.credential.get_token(GRAPH_SCOPE).token
+        response = self.session.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code >= 400:
+            raise HttpStatusError(response)
+        return response.json()
+
+    def collect(self) -> Iterator[Dict]:
+        return self.collect_since(None)
+
+    def collect_since(self, since: Optional[datetime]) -> Iterator[Dict]:
+        from azure_log_collector import call_with_retry
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+
+        if since is None:
+            since = datetime.now(timezone.utc) - timedelta(days=self.days)
+        url = GRAPH_SIGNINS_URL
+        params = {
+            "$filter": f"createdDateTime ge {since.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            "$top": str(self.page_size),
+        }
+        while url:
+            self.limiter.acquire()
+            page = call_with_retry(lambda: self._get_page(url, params))
+            metrics.inc("pages_fetched_total", source=self.name)
+            for signin in page.get("value", []):
+                yield signin_to_log(signin)
+            # nextLink already carries the query string
+            url, params = page.get("@odata.nextLink"), None
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def alert_to_event(alert) -> Dict:
+    """Map a Defender for Cloud Alert model onto the security-event schema"""
+    severity = (getattr(alert.severity, "value", alert.severity) or "").lower()
+    status = (getattr(alert.status, "value", alert.status) or "").lower()
+    resources = alert.resource_identifiers or []
+    resource = getattr(resources[0], "azure_resource_id", None) if resources else None
+    entities = alert.entities or []
+    source_ip = next((
+        (entity.additional_properties or {}).get("address")
+        for entity in entities
+        if entity.type == "ip"
+    ), None)
+    return {
+        "event_id": alert.system_alert_id or alert.name,
+        "timestamp": _isoformat(alert.time_generated_utc or alert.start_time_utc),
+        "event_type": "security_alert",
+        "severity": severity,
+        "source_ip": source_ip,
+        "destination_ip": None,
+        "user_id": None,
+        "resource": resource or alert.compromised_entity,
+        "action": getattr(alert.intent, "value", alert.intent),
+        "result": status,
+        "threat_type": alert.alert_type,
+        "metadata": {
+            "alert_display_name": alert.alert_display_name,
+            "product": alert.product_name,
+            "is_incident": alert.is_incident,
+        },
+        "risk_score": SEVERITY_RISK_SCORES.get(severity, 10.0)
+    }
+
+
+class DefenderAlertSource(LogSource):
+    """Microsoft Defender for Cloud (Security Center) alerts"""
+
+    name = "defender"
+    output_name = "defender_alerts"
+    default_rate = 2.0
+
+    def __init__(self, security_client, resource_group: Optional[str] = None,
+                 rate: Optional[float] = None, burst: Optional[float] = None):
+        super().__init__(rate, burst)
+        self.security_client = security_client
+        self.resource_group = resource_group
+
+    def collect(self) -> Iterator[Dict]:
+        return self.collect_since(None)
+
+    def collect_since(self, since: Optional[datetime]) -> Iterator[Dict]:
+        if self.resource_group:
+            alerts = self.security_client.alerts.list_by_resource_group(self.resource_group)
+        else:
+            alerts = self.security_client.alerts.list()
+        # The pager fetches each page lazily while we iterate. The alerts API
+        # has no time filter, so older alerts are skipped here
+        for alert in (alert for page in self.limiter.pages(alerts.by_page()) for alert in page):
+            generated = alert.time_generated_utc or alert.start_time_utc
+            if since and isinstance(generated, datetime):
+                if generated.tzinfo is None:
+                    generated = generated.replace(tzinfo=timezone.utc)
+                if generated < since:
+                    continue
+            yield alert_to_event(alert)
+
+
+class SourceResult:
+    """Outcome of one source run"""
+
+    def __init__(self, source: LogSource):
+        self.source = source
+        self.count = 0
+        self.seconds = 0.0
+        self.error: Optional[Exception] = None
+        self.entries: List[Dict] = []
+
+
+class SourceScheduler:
+    """
+    Runs sources concurrently, one worker thread per source
+
+    Each source keeps its own rate limiter, so a slow or throttled API
+    does not hold back the others. A failing source is reported in its
+    result rather than aborting the run.
+    """
+
+    def __init__(self, sources: List[LogSource], max_workers: Optional[int] = None,
+                 on_entries: Optional[Callable[[LogSource, List[Dict]], None]] = None,
+                 batch_size: int = 1000):
+        """
+        Args:
+            sources: Sources to run
+            max_workers: Concurrent sources (default: all at once)
+            on_entries: Called with (source, batch) as entries arrive; when
+                        omitted, entries are kept on each SourceResult
+            batch_size: Entries per on_entries call
+        """
+        self.sources = sources
+        self.max_workers = max_workers or max(len(sources), 1)
+        self.on_entries = on_entries
+        self.batch_size = batch_size
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._futures: List[Future] = []
+
+    def _run(self, source: LogSource) -> SourceResult:
+        result = SourceResult(source)
+        batch: List[Dict] = []
+        with metrics.stage("source", source=source.name) as stage:
+            try:
+                for entry in source.collect():
+                    result.count += 1
+                    if self.on_entries:
+                        batch.append(entry)
+                        if len(batch) >= self.batch_size:
+                            self.on_entries(source, batch)
+                            batch = []
+                    else:
+                        result.entries.append(entry)
+                if batch:
+                    self.on_entries(source, batch)
+            except Exception as e:
+                result.error = e
+            stage.records = result.count
+        result.seconds = stage.elapsed
+        metrics.inc("rate_limited_seconds_total", source.limiter.waited, source=source.name)
+        return result
+
+    def start(self) -> "SourceScheduler":
+        """Submit every source and return immediately"""
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="source")
+        self._futures = [self._pool.submit(self._run, source) for source in self.sources]
+        return self
+
+    def join(self) -> List[SourceResult]:
+        """Wait for all sources and report how each went"""
+        results = [future.result() for future in self._futures]
+        self._pool.shutdown()
+        for result in results:
+            if result.error:
+                print(f"✗ {result.source.name}: {result.error}")
+            else:
+                print(f"✓ {result.source.name}: {result.count} entries in {result.seconds:.1f}s "
+                      f"(rate-limited {result.source.limiter.waited:.1f}s)")
+        return results
+
+    def run(self) -> List[SourceResult]:
+        return self.start().join()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Decode NSG flow log blobs into network-log NDJSON")
+    parser.add_argument("files", nargs="+", help="Downloaded PT1H.json flow log blobs")
+    parser.add_argument("-o", "--output", help="NDJSON output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w') if args.output else None
+    count = 0
+    try:
+        for path in args.files:
+            with open(path) as f:
+                for entry in parse_flow_log(f):
+                    line = json.dumps(entry)
+                    if out:
+                        out.write(line + "\n")
+                    else:
+                        print(line)
+                    count += 1
+    finally:
+        if out:
+            out.close()
+    if out:
+        print(f"[OK] Decoded {count} flows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
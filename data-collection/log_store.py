@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Local Log Store for Zero-Trust Cloud Lab
+SQLite store for collected and generated logs with indexed time-range and
+field queries, bulk ingest and a small query CLI
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_PATH = "logs.db"
+DEFAULT_BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    record_id TEXT,
+    ts TEXT NOT NULL,
+    user_id TEXT,
+    source_ip TEXT,
+    event_type TEXT,
+    record TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_events_record ON events (dataset, record_id);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS idx_events_dataset_ts ON events (dataset, ts);
+CREATE INDEX IF NOT EXISTS idx_events_user_ts ON events (user_id, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ip_ts ON events (source_ip, ts);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (event_type, ts);
+"""
+
+
+def normalize_time(value) -> str:
+    """
+    Render a timestamp as a sortable ISO string
+
+    Aware times are converted to UTC and stored without an offset; naive
+    times (the generators) are taken as-is. Microseconds are always
+    written so string order matches time order. Raises ValueError for a
+    missing or unparseable timestamp.
+    """
+    if value is None:
+        raise ValueError("missing timestamp")
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def _authentication_event_type(record: Dict) -> str:
+    return "login" if record.get("success") else "login_failed"
+
+
+# Dataset -> (record id key, user key, source IP getter, event type getter)
+DATASET_FIELDS: Dict[str, Tuple[str, str, Callable, Callable]] = {
+    "authentication": ("log_id", "user_id",
+                       lambda r: r.get("source_ip"), _authentication_event_type),
+    "security": ("event_id", "user_id",
+                 lambda r: r.get("source_ip"), lambda r: r.get("event_type")),
+    "network": ("log_id", None,
+                lambda r: r.get("source_ip"), lambda r: r.get("action")),
+    "activity": ("event_id", "caller",
+                 lambda r: (r.get("claims") or {}).get("ipaddr"), lambda r: r.get("operation")),
+}
+
+
+def infer_dataset(record: Dict) -> str:
+    """Guess which dataset a record belongs to from its keys"""
+    if "operation" in record:
+        return "activity"
+    if "authentication_method" in record:
+        return "authentication"
+    if "severity" in record:
+        return "security"
+    if "destination_port" in record:
+        return "network"
+    raise ValueError(f"Cannot infer dataset from record keys: {sorted(record)}")
+
+
+def _open_text(path: str):
+    """Open a possibly gzip/zstd compressed NDJSON file as text"""
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt')
+    import zstandard
+    return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')))
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Yield records from a JSON array, NDJSON or compressed NDJSON file"""
+    if path.endswith((".gz", ".zst")):
+        with _open_text(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    from anomaly_detector import iter_log_file
+    yield from iter_log_file(path)
+
+
+class LogStore:
+    """
+    SQLite-backed store for all datasets
+
+    Every record lands in one events table with its indexed fields pulled
+    out into columns (timestamp, user_id/caller, source_ip, event_type) and
+    the full record kept as JSON. Queries filter on the indexed columns, so
+    SQLite answers them with index range scans instead of reading every row.
+    Records are de-duplicated on (dataset, record id), so re-ingesting an
+    overlapping incremental collection is harmless. Records without a usable
+    timestamp cannot be indexed; they are skipped and counted in skipped.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self.skipped = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _row(self, dataset: str, record: Dict) -> Tuple:
+        id_key, user_key, source_ip, event_type = DATASET_FIELDS[dataset]
+        serialized = json.dumps(record, default=str)
+        # Older files lack IDs; fall back to a content hash so re-ingest stays idempotent
+        record_id = record.get(id_key) or hashlib.sha1(serialized.encode()).hexdigest()
+        return (
+            dataset,
+            record_id,
+            normalize_time(record.get("timestamp")),
+            record.get(user_key) if user_key else None,
+            source_ip(record),
+            event_type(record),
+            serialized,
+        )
+
+    def ingest(self, records: Iterable[Dict], dataset: Optional[str] = None,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Insert records in executemany batches inside a single transaction
+
+        Args:
+            records: Records of one dataset (any iterable, consumed once)
+            dataset: Dataset name; inferred from the first record if omitted
+            batch_size: Rows per executemany call
+
+        Returns:
+            Number of new rows inserted (duplicates and records without a
+            valid timestamp are skipped)
+        """
+        sql = ("INSERT OR IGNORE INTO events "
+               "(dataset, record_id, ts, user_id, source_ip, event_type, record) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+        before = self.conn.total_changes
+        batch: List[Tuple] = []
+        with self.conn:
+            for record in records:
+                if dataset is None:
+                    dataset = infer_dataset(record)
+                try:
+                    batch.append(self._row(dataset, record))
+                except ValueError:
+                    self.skipped += 1
+                if len(batch) >= batch_size:
+                    self.conn.executemany(sql, batch)
+                    batch = []
+            if batch:
+                self.conn.executemany(sql, batch)
+        return self.conn.total_changes - before
+
+    def ingest_file(self, path: str, dataset: Optional[str] = None) -> int:
+        """Ingest a JSON/NDJSON(.gz/.zst) file produced by the generators or the collector"""
+        skipped_before = self.skipped
+        inserted = self.ingest(iter_records(path), dataset)
+        skipped = self.skipped - skipped_before
+        note = f" ({skipped} without a valid timestamp skipped)" if skipped else ""
+        print(f"[OK] Ingested {inserted} new records from {path}{note}")
+        return inserted
+
+    @staticmethod
+    def _where(dataset=None, start=None, end=None, user_id=None,
+               source_ip=None, event_type=None) -> Tuple[str, List]:
+        clauses, params = [], []
+        for column, value in (("dataset", dataset), ("user_id", user_id),
+                              ("source_ip", source_ip), ("event_type", event_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(normalize_time(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(normalize_time(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, dataset: Optional[str] = None, start=None, end=None,
+              user_id: Optional[str] = None, source_ip: Optional[str] = None,
+              event_type: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Yield matching records in timestamp order
+
+        Args:
+            dataset: authentication, security, network or activity
+            start: Inclusive lower time bound (datetime or ISO string)
+            end: Exclusive upper time bound
+            user_id: user_id, or caller for activity logs
+            source_ip: Source IP (claims ipaddr for activity logs)
+            event_type: event_type / operation / action, or login / login_failed
+            limit: Maximum number of records
+        """
+        where, params = self._where(dataset, start, end, user_id, source_ip, event_type)
+        sql = f"SELECT record FROM events{where} ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for (record,) in self.conn.execute(sql, params):
+            yield json.loads(record)
+
+    def count(self, **filters) -> int:
+        """Number of records matching the same filters as query()"""
+        where, params = self._where(**filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    def explain(self, **filters) -> List[str]:
+        """SQLite's plan for a query, to check it uses an index"""
+        where, params = self._where(**filters)
+        rows = self.conn.execute(f"EXPLAIN QUERY PLAN SELECT record FROM events{where} ORDER BY ts", params)
+        return [row[-1] for row in rows]
+
+    def stats(self) -> Dict[str, Dict]:
+        """Record count and time span per dataset"""
+        rows = self.conn.execute(
+            "SELECT dataset, COUNT(*), MIN(ts), MAX(ts) FROM events GROUP BY dataset"
+        )
+        return {dataset: {"records": count, "first": first, "last": last}
+                for dataset, count, first, last in rows}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Ingest and query logs in a local SQLite store")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"Database file (default: {DEFAULT_DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Load JSON/NDJSON files into the store")
+    ingest.add_argument("files", nargs="+")
+    ingest.add_argument("--dataset", choices=sorted(DATASET_FIELDS),
+                        help="Dataset of the files (inferred from records if omitted)")
+
+    query = commands.add_parser("query", help="Print matching records as NDJSON")
+    query.add_argument("--dataset", choices=sorted(DATASET_FIELDS))
+    query.add_argument("--start", help="Inclusive ISO start time")
+    query.add_argument("--end", help="Exclusive ISO end time")
+    query.add_argument("--user", help="user_id, or caller for activity logs")
+    query.add_argument("--source-ip")
+    query.add_argument("--event-type", help="event_type / operation / action, or login / login_failed")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--count", action="store_true", help="Print only the number of matches")
+    query.add_argument("--explain", action="store_true", help="Print the query plan instead")
+
+    commands.add_parser("stats", help="Show record counts per dataset")
+    args = parser.parse_args(argv)
+
+    with LogStore(args.db) as store:
+        if args.command == "ingest":
+            total = sum(store.ingest_file(path, args.dataset) for path in args.files)
+            print(f"Total: {total} new records in {args.db}")
+        elif args.command == "query":
+            filters = dict(dataset=args.dataset, start=args.start, end=args.end, user_id=args.user,
+                           source_ip=args.source_ip, event_type=args.event_type)
+            if args.explain:
+                print("\n".join(store.explain(**filters)))
+            elif args.count:
+                print(store.count(**filters))
+            else:
+                for record in store.query(limit=args.limit, **filters):
+                    print(json.dumps(record))
+        else:
+            for dataset, info in store.stats().items():
+                print(f"  - {dataset}: {info['records']} records ({info['first']} .. {info['last']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics for Zero-Trust Cloud Lab
+Per-stage timings and counters for the collector and generator, exported in
+the Prometheus text format to a file or an HTTP endpoint, with an optional
+cProfile hook around each stage
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+NAMESPACE = "ztlab"
+
+# name -> (type, help); every series is prefixed with NAMESPACE
+METRICS = {
+    "stage_duration_seconds_total": ("counter", "Wall time spent in each pipeline stage"),
+    "stage_runs_total": ("counter", "Times each pipeline stage ran"),
+    "stage_records_total": ("counter", "Records handled by each pipeline stage"),
+    "stage_records_per_second": ("gauge", "Throughput of the last run of each pipeline stage"),
+    "pages_fetched_total": ("counter", "Result pages fetched from Azure APIs"),
+    "retries_total": ("counter", "Requests retried after throttling, by HTTP status"),
+    "rate_limited_seconds_total": ("counter", "Time sources spent waiting on their rate limit"),
+    "records_written_total": ("counter", "Records written to output files, by format"),
+    "bytes_written_total": ("counter", "Bytes written to output files, by format"),
+    "serialization_seconds_total": ("counter", "Time spent serializing and writing output files, by format"),
+    "bytes_uploaded_total": ("counter", "Bytes uploaded to blob storage"),
+    "records_rejected_total": ("counter", "Entries failing schema validation, by dataset and field"),
+    "records_duplicate_total": ("counter", "Duplicate entries dropped before saving, by dataset"),
+    "polls_total": ("counter", "Daemon source polls, by source and status"),
+    "queue_depth": ("gauge", "Batches waiting in a daemon queue, by queue"),
+    "backpressure_seconds_total": ("counter", "Time sources waited on a full daemon queue"),
+    "sink_errors_total": ("counter", "Daemon sink writes or flushes that failed, by sink"),
+    "last_run_timestamp_seconds": ("gauge", "Unix time the pipeline last finished"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class StageTimer:
+    """Handle yielded by Metrics.stage(); set .records for throughput"""
+    __slots__ = ("records", "elapsed")
+
+    def __init__(self):
+        self.records = 0
+        self.elapsed = 0.0
+
+
+class Metrics:
+    """
+    Thread-safe counter and gauge registry
+
+    Series are identified by metric name plus labels. render() gives the
+    Prometheus text exposition format; write() saves it atomically for the
+    node-exporter textfile collector and serve() exposes it on /metrics.
+    """
+
+    def __init__(self, pipeline: str = None):
+        """
+        Args:
+            pipeline: Value of the pipeline label added to every series
+        """
+        self.pipeline = pipeline
+        self.profile_dir: Optional[str] = None
+        self.profile_top = 15
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if self.pipeline:
+            labels = dict(labels, pipeline=self.pipeline)
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        key = self._key(labels)
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def get(self, name: str, **labels) -> float:
+        return self._values.get(name, {}).get(self._key(labels), 0)
+
+    def configure(self, pipeline: str = None, profile_dir: str = None, profile_top: int = 15):
+        """
+        Args:
+            pipeline: Value of the pipeline label ("collector", "generator")
+            profile_dir: Write a cProfile dump per stage here (None disables)
+            profile_top: Functions to print from each profile, by cumulative time
+        """
+        if pipeline:
+            self.pipeline = pipeline
+        self.profile_dir = profile_dir
+        self.profile_top = profile_top
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str, **labels):
+        """
+        Time a pipeline stage and count its records
+
+        When profiling is enabled, the outermost stage on each thread is run
+        under cProfile (which only sees that thread, not worker pools).
+
+        Usage:
+            with metrics.stage("save", dataset="network") as stage:
+                stage.records = write(records)
+        """
+        timer = StageTimer()
+        profiler = None
+        if self.profile_dir and not getattr(self._local, "profiling", False):
+            import cProfile
+            profiler = cProfile.Profile()
+            self._local.profiling = True
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            timer.elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._local.profiling = False
+                self._dump_profile(profiler, name, labels)
+            labels = dict(labels, stage=name)
+            self.inc("stage_duration_seconds_total", timer.elapsed, **labels)
+            self.inc("stage_runs_total", 1, **labels)
+            if timer.records:
+                self.inc("stage_records_total", timer.records, **labels)
+                if timer.elapsed > 0:
+                    self.set("stage_records_per_second", timer.records / timer.elapsed, **labels)
+
+    def _dump_profile(self, profiler, name: str, labels: Dict[str, str]):
+        import pstats
+        suffix = "".join(f"-{value}" for _, value in sorted(labels.items()))
+        filename = os.path.join(self.profile_dir, f"{self.pipeline or 'pipeline'}-{name}{suffix}.prof")
+        profiler.dump_stats(filename)
+        print(f"\nProfile of stage {name}{suffix} saved to {filename}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(self.profile_top)
+
+    @contextmanager
+    def timed_write(self, filename: str, format: str, records: int):
+        """Count serialization time, records and bytes of one file write (appends too)"""
+        before = os.path.getsize(filename) if os.path.exists(filename) else 0
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        written = os.path.getsize(filename) - before if os.path.exists(filename) else 0
+        self.record_write(format, records, max(written, 0), elapsed)
+
+    def record_write(self, format: str, records: int, size: int, seconds: float = None):
+        self.inc("records_written_total", records, format=format)
+        self.inc("bytes_written_total", size, format=format)
+        if seconds is not None:
+            self.inc("serialization_seconds_total", seconds, format=format)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            snapshot = {name: dict(series) for name, series in self._values.items()}
+        for name in sorted(snapshot):
+            metric_type, help_text = METRICS.get(name, ("untyped", name))
+            full_name = f"{NAMESPACE}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for key, value in sorted(snapshot[name].items()):
+                label_text = ",".join(f'{label}="{_escape(text)}"' for label, text in key)
+                series = f"{full_name}{{{label_text}}}" if label_text else full_name
+                lines.append(f"{series} {value:.6g}" if isinstance(value, float) else f"{series} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the metrics file atomically (scrapers never see a partial file)"""
+        self.set("last_run_timestamp_seconds", round(time.time()))
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+        print(f"[OK] Wrote metrics to {path}")
+
+    def serve(self, port: int, host: str = "0.0.0.0"):
+        """
+        Serve /metrics from a daemon thread for the life of the process
+
+        Returns:
+            The running ThreadingHTTPServer (call shutdown() to stop it)
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[OK] Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def add_metrics_arguments(parser):
+    """--metrics-file / --metrics-port / --profile options shared by both scripts"""
+    parser.add_argument("--metrics-file",
+                        help="Write Prometheus metrics to this file at the end of the run "
+                             "(e.g. for the node-exporter textfile collector)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve Prometheus metrics on this port while running")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Run each stage under cProfile and save .prof files here")
+
+
+# Default registry used by the collector, generator and log sources
+REGISTRY = Metrics()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Log Reader for Zero-Trust Cloud Lab
+Random access, time-range seeks and parallel iteration over large NDJSON and
+JSON-array log files through a sidecar offset index
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from correlation import to_epoch
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+DEFAULT_BLOCK_SIZE = 4096   # records per timestamp block
+SCAN_CHUNK_SIZE = 64 * 2**20
+
+# First "timestamp" key of a record: every file written here puts the
+# record's own timestamp ahead of any nested object
+TIMESTAMP_PATTERN = re.compile(rb'"timestamp"\s*:\s*"([^"]*)"')
+
+# Open ends of a time range; a block without timestamps has min _LATEST, max _EARLIEST
+_EARLIEST = np.iinfo(np.int64).min
+_LATEST = np.iinfo(np.int64).max
+
+QUOTE, BACKSLASH, NEWLINE = ord('"'), ord("\\"), ord("\n")
+WHITESPACE = tuple(b" \t\r")
+OPENERS = (ord("{"), ord("["))
+CLOSERS = (ord("}"), ord("]"))
+# Byte -> is a bracket (a table lookup is much faster than np.isin on large chunks)
+_BRACKETS = np.zeros(256, dtype=bool)
+_BRACKETS[list(OPENERS + CLOSERS)] = True
+
+
+def to_microseconds(timestamp: str) -> int:
+    """ISO timestamp -> microseconds since the epoch (naive values are UTC)"""
+    return round(to_epoch(timestamp) * 1000000)
+
+
+def _parse_timestamps(stamps: List[bytes]) -> np.ndarray:
+    """
+    ISO timestamps -> epoch microseconds
+
+    Naive timestamps (the generator's) and a uniform "+00:00" (the
+    collector's) are parsed vectorized; other offsets one by one.
+    """
+    if all(stamp.endswith(b"+00:00") for stamp in stamps):
+        stamps = [stamp[:-6] for stamp in stamps]
+    try:
+        with warnings.catch_warnings():
+            # NumPy only warns on offsets it would silently apply
+            warnings.simplefilter("error")
+            return np.array(stamps).astype("datetime64[us]").astype(np.int64)
+    except (ValueError, Warning):
+        return np.array([to_microseconds(stamp.decode()) for stamp in stamps], dtype=np.int64)
+
+
+def _backslash_run(view: np.ndarray, position: int) -> int:
+    """Number of consecutive backslashes ending just before position"""
+    run = 0
+    while position - run > 0 and view[position - run - 1] == BACKSLASH:
+        run += 1
+    return run
+
+
+def _ndjson_spans(view: np.ndarray, chunk_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(start, length) of every non-blank line"""
+    newlines = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+        np.flatnonzero(view[offset:offset + chunk_size] == NEWLINE) + offset
+        for offset in range(0, len(view), chunk_size)
+    ])
+    starts = np.concatenate([[0], newlines + 1])
+    lengths = np.concatenate([newlines, [len(view)]]) - starts
+    keep = lengths > 0
+    # Lines starting with whitespace (rare) may be blank; check those one by one
+    for line in np.flatnonzero(keep)[np.isin(view[starts[keep]], WHITESPACE)].tolist():
+        if not view[starts[line]:starts[line] + lengths[line]].tobytes().strip():
+            keep[line] = False
+    return starts[keep], lengths[keep]
+
+
+def _array_spans(view: np.ndarray, chunk_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (start, length) of every element of a top-level JSON array
+
+    Finds brackets outside strings with a vectorized scan, chunk by chunk:
+    a quote delimits a string unless preceded by an odd run of backslashes
+    (rare, checked one by one), and the bracket depth is a running sum
+    carried between chunks.
+    """
+    starts, ends = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    depth = 0
+    in_string = 0
+    for offset in range(0, len(view), chunk_size):
+        data = view[offset:offset + chunk_size]
+        quotes = np.flatnonzero(data == QUOTE) + offset
+        after_backslash = quotes[(quotes > 0) & (view[np.maximum(quotes - 1, 0)] == BACKSLASH)]
+        escaped = [quote for quote in after_backslash.tolist() if _backslash_run(view, quote) % 2]
+        if escaped:
+            quotes = np.setdiff1d(quotes, escaped, assume_unique=True)
+
+        brackets = np.flatnonzero(_BRACKETS[data]) + offset
+        # Brackets after an odd number of string delimiters are inside a string
+        brackets = brackets[(np.searchsorted(quotes, brackets) + in_string) % 2 == 0]
+        step = np.where((view[brackets] == OPENERS[0]) | (view[brackets] == OPENERS[1]), 1, -1)
+        after = depth + np.cumsum(step)
+        before = after - step
+        starts.append(brackets[(step == 1) & (before == 1)])
+        ends.append(brackets[(step == -1) & (after == 1)] + 1)
+        if len(after):
+            depth = int(after[-1])
+        in_string = (in_string + len(quotes)) % 2
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    if depth or len(starts) != len(ends):
+        raise ValueError("unbalanced brackets: the JSON array is truncated or malformed")
+    return starts, ends - starts
+
+
+class LogFile:
+    """
+    A log file opened through mmap with a sidecar offset index
+
+    The index (FILE.idx) holds each record's byte offset and length plus the
+    min/max timestamp of every block of records. It is built on first open
+    and rebuilt whenever the file's size or mtime changes. Records are only
+    parsed when read, so opening a multi-GB file costs the index (12 bytes
+    per record), not the data.
+
+    Usage:
+        with LogFile("network_logs.json") as logs:
+            logs[12345]
+            for log in logs.iter_range("2025-01-01T00:00", "2025-01-02T00:00"):
+                ...
+    """
+
+    def __init__(self, path: str, index_path: Optional[str] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE, rebuild: bool = False):
+        """
+        Args:
+            path: NDJSON or JSON-array log file
+            index_path: Where to keep the index (defaults to path + ".idx")
+            block_size: Records per timestamp block when building the index
+            rebuild: Rebuild the index even if it is current
+        """
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self.block_size = block_size
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        stat = os.stat(path)
+        self._source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.index_built = False
+        if rebuild or not self._load_index():
+            self._build_index()
+            self._save_index()
+            self.index_built = True
+
+    # --- Index ----------------------------------------------------------------
+
+    def _load_index(self) -> bool:
+        try:
+            with np.load(self.index_path, allow_pickle=False) as index:
+                meta = json.loads(str(index["meta"]))
+                if meta.get("version") != INDEX_VERSION or meta.get("source") != self._source:
+                    return False
+                self.format = meta["format"]
+                self.block_size = meta["block_size"]
+                self.starts = index["starts"]
+                self.lengths = index["lengths"]
+                self.block_min = index["block_min"]
+                self.block_max = index["block_max"]
+            return True
+        except (OSError, KeyError, ValueError):
+            return False
+
+    def _build_index(self):
+        view = np.frombuffer(self._map, dtype=np.uint8) if len(self._map) else np.zeros(0, np.uint8)
+        first = re.search(rb"\S", self._map[:4096]) if len(self._map) else None
+        self.format = "json" if first and first.group() == b"[" else "ndjson"
+        spans = _array_spans if self.format == "json" else _ndjson_spans
+        starts, lengths = spans(view, SCAN_CHUNK_SIZE)
+        self.starts = starts.astype(np.uint64)
+        self.lengths = lengths.astype(np.uint32)
+        self.block_min, self.block_max = self._block_times()
+
+    def _block_times(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Min/max timestamp (epoch microseconds) per block of records"""
+        count = len(self.starts)
+        num_blocks = (count + self.block_size - 1) // self.block_size
+        block_min = np.full(num_blocks, _LATEST, dtype=np.int64)
+        block_max = np.full(num_blocks, _EARLIEST, dtype=np.int64)
+        search = TIMESTAMP_PATTERN.search
+        data = self._map
+        for block in range(num_blocks):
+            first = block * self.block_size
+            spans = zip(self.starts[first:first + self.block_size].tolist(),
+                        self.lengths[first:first + self.block_size].tolist())
+            matches = (search(data, start, start + length) for start, length in spans)
+            stamps = [match.group(1) for match in matches if match]
+            if stamps:
+                times = _parse_timestamps(stamps)
+                block_min[block] = times.min()
+                block_max[block] = times.max()
+        return block_min, block_max
+
+    def _save_index(self):
+        meta = {"version": INDEX_VERSION, "format": self.format, "block_size": self.block_size,
+                "source": self._source}
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), starts=self.starts, lengths=self.lengths,
+                         block_min=self.block_min, block_max=self.block_max)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            # Read-only location: keep the in-memory index and carry on
+            print(f"Warning: could not save index {self.index_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # --- Access ---------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.starts)
+
+    def raw(self, index: int) -> bytes:
+        """The undecoded JSON text of one record"""
+        start = int(self.starts[index])
+        return self._map[start:start + int(self.lengths[index])]
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return json.loads(self.raw(index))
+
+    def iter_records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """Yield records start..stop-1 in file order"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        data = self._map
+        loads = json.loads
+        for offset, length in zip(self.starts[start:stop].tolist(), self.lengths[start:stop].tolist()):
+            yield loads(data[offset:offset + length])
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield records with start <= timestamp < end, in file order
+
+        Only blocks whose [min, max] overlaps the range are read, so on a
+        time-sorted file a narrow range touches one or two blocks.
+        """
+        low = to_microseconds(start) if start else _EARLIEST
+        high = to_microseconds(end) if end else _LATEST
+        candidates = np.flatnonzero((self.block_max >= low) & (self.block_min < high))
+        for block in candidates.tolist():
+            first = block * self.block_size
+            for record in self.iter_records(first, first + self.block_size):
+                timestamp = record.get("timestamp")
+                if timestamp and low <= to_microseconds(timestamp) < high:
+                    yield record
+
+    def time_span(self) -> Tuple[Optional[int], Optional[int]]:
+        """(earliest, latest) timestamp in epoch microseconds, from the block index"""
+        known = self.block_min != _LATEST
+        if not known.any():
+            return None, None
+        return int(self.block_min[known].min()), int(self.block_max[known].max())
+
+    def chunks(self, count: int) -> List[Tuple[int, int]]:
+        """Split the records into `count` contiguous (start, stop) ranges"""
+        bounds = np.linspace(0, len(self), max(count, 1) + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _map_chunk(path: str, index_path: Optional[str], func: Callable, start: int, stop: int):
+    with LogFile(path, index_path) as logs:
+        return func(logs.iter_records(start, stop))
+
+
+def parallel_map(path: str, func: Callable[[Iterator[Dict]], object], workers: Optional[int] = None,
+                 chunks: Optional[int] = None, index_path: Optional[str] = None) -> list:
+    """
+    Run func over contiguous chunks of a log file in worker processes
+
+    The index is built once here; each worker maps the file itself (the OS
+    shares the pages) and reads only its own records.
+
+    Args:
+        path: Log file
+        func: Picklable function taking an iterator of records
+        workers: Worker processes (defaults to the CPU count)
+        chunks: Number of chunks (defaults to 4 per worker)
+
+    Returns:
+        func's results, in file order
+    """
+    workers = workers or os.cpu_count() or 1
+    with LogFile(path, index_path) as logs:
+        ranges = logs.chunks(chunks or workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_map_chunk, path, index_path, func, start, stop)
+                   for start, stop in ranges]
+        return [future.result() for future in futures]
+
+
+class FieldCounter:
+    """Picklable chunk function counting the values of one field"""
+
+    def __init__(self, field: str):
+        self.field = field
+
+    def __call__(self, records: Iterator[Dict]) -> Counter:
+        return Counter(str(record.get(self.field)) for record in records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed, memory-mapped access to log files")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    info = subcommands.add_parser("info", help="Build or load the index and describe the file")
+    info.add_argument("paths", nargs="+")
+    info.add_argument("--rebuild", action="store_true", help="Rebuild the index even if current")
+
+    get = subcommands.add_parser("get", help="Print records by position")
+    get.add_argument("path")
+    get.add_argument("positions", nargs="+", type=int)
+
+    time_range = subcommands.add_parser("range", help="Print records in a time range as NDJSON")
+    time_range.add_argument("path")
+    time_range.add_argument("--start", help="Inclusive ISO timestamp")
+    time_range.add_argument("--end", help="Exclusive ISO timestamp")
+    time_range.add_argument("--count", action="store_true", help="Only print the number of records")
+
+    count = subcommands.add_parser("count", help="Count values of a field with parallel workers")
+    count.add_argument("path")
+    count.add_argument("--field", default="action", help="Field to count (default: action)")
+    count.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        for path in args.paths:
+            with LogFile(path, rebuild=args.rebuild) as logs:
+                earliest, latest = logs.time_span()
+                status = "built" if logs.index_built else "loaded"
+                print(f"[OK] {path}: {len(logs)} {logs.format} records, index {status} "
+                      f"({os.path.getsize(logs.index_path) / 2**20:.1f} MiB)")
+                if earliest is not None:
+                    print(f"  - Time span: {np.datetime64(earliest, 'us')} .. {np.datetime64(latest, 'us')}")
+                print(f"  - Blocks: {len(logs.block_min)} of {logs.block_size} records")
+    elif args.command == "get":
+        with LogFile(args.path) as logs:
+            for position in args.positions:
+                print(json.dumps(logs[position], indent=2))
+    elif args.command == "range":
+        with LogFile(args.path) as logs:
+            records = logs.iter_range(args.start, args.end)
+            if args.count:
+                print(sum(1 for _ in records))
+            else:
+                for record in records:
+                    print(json.dumps(record))
+    elif args.command == "count":
+        totals = Counter()
+        for partial in parallel_map(args.path, FieldCounter(args.field), args.workers):
+            totals.update(partial)
+        print(f"[OK] {sum(totals.values())} records by {args.field}:")
+        for value, total in totals.most_common():
+            print(f"  - {value}: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Risk Scoring for Zero-Trust Cloud Lab
+Configurable risk rules with a per-record scorer and a vectorized batch scorer,
+plus a CLI to rescore existing JSON/NDJSON/Parquet datasets
+"""
+
+import argparse
+import json
+import re
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+DEFAULT_EVENT_TYPE_WEIGHTS = {
+    "failed_login": 30,
+    "suspicious_login": 50,
+    "brute_force": 80,
+    "privilege_escalation": 90,
+    "data_exfiltration": 95,
+    "anomalous_access": 60
+}
+
+
+@dataclass
+class RiskRules:
+    """Weight table and heuristics used to score events"""
+    event_type_weights: Dict[str, float] = field(
+        default_factory=lambda: dict(DEFAULT_EVENT_TYPE_WEIGHTS)
+    )
+    default_weight: float = 10
+    failure_weight: float = 20
+    # Night hours are hour < night_end_hour or hour > night_start_hour
+    night_weight: float = 15
+    night_start_hour: int = 22
+    night_end_hour: int = 6
+    # Locations containing any of these substrings count as foreign
+    foreign_weight: float = 10
+    foreign_locations: Tuple[str, ...] = ("Tokyo", "Singapore")
+    max_score: float = 100.0
+
+    @classmethod
+    def from_file(cls, path: str) -> "RiskRules":
+        """Load rules from a JSON file; omitted keys keep their defaults"""
+        with open(path) as f:
+            data = json.load(f)
+        if "foreign_locations" in data:
+            data["foreign_locations"] = tuple(data["foreign_locations"])
+        return cls(**data)
+
+    def to_dict(self) -> Dict:
+        """Rules as a JSON-serializable dict"""
+        data = asdict(self)
+        data["foreign_locations"] = list(self.foreign_locations)
+        return data
+
+
+DEFAULT_RULES = RiskRules()
+
+
+def score_record(event: Dict, timestamp: datetime = None, rules: RiskRules = DEFAULT_RULES) -> float:
+    """
+    Score a single event
+
+    Args:
+        event: Event dict (event_type, success, location are used if present)
+        timestamp: Event time, used for the night-hours rule
+        rules: Risk rules to apply
+
+    Returns:
+        Risk score between 0 and rules.max_score
+    """
+    risk = rules.event_type_weights.get(event.get("event_type", ""), rules.default_weight)
+
+    # Increase risk for multiple failures
+    if event.get("success") is False:
+        risk += rules.failure_weight
+
+    # Unusual time (night hours)
+    if timestamp:
+        hour = timestamp.hour
+        if hour < rules.night_end_hour or hour > rules.night_start_hour:
+            risk += rules.night_weight
+
+    # Foreign location (simple heuristic)
+    location = event.get("location") or ""
+    if any(name in location for name in rules.foreign_locations):
+        risk += rules.foreign_weight
+
+    return float(min(risk, rules.max_score))
+
+
+def score_frame(frame, rules: RiskRules = DEFAULT_RULES):
+    """
+    Score every row of a DataFrame at once
+
+    Uses the columns event_type, success, timestamp and location when
+    present; missing columns simply contribute nothing, matching
+    score_record on dicts without those keys.
+
+    Args:
+        frame: pandas DataFrame
+        rules: Risk rules to apply
+
+    Returns:
+        NumPy float array of risk scores
+    """
+    import numpy as np
+    import pandas as pd
+
+    n = len(frame)
+    risk = np.full(n, float(rules.default_weight))
+
+    if "event_type" in frame:
+        # Map on the (few) distinct categories instead of every row
+        event_types = frame["event_type"].astype("category")
+        weights = pd.Series(event_types.cat.categories).map(rules.event_type_weights)
+        weights = weights.fillna(rules.default_weight).to_numpy(dtype=float)
+        codes = event_types.cat.codes.to_numpy()
+        risk = np.where(codes >= 0, weights[codes], rules.default_weight)
+
+    if "success" in frame:
+        risk += np.where(frame["success"].eq(False).to_numpy(), rules.failure_weight, 0.0)
+
+    if "timestamp" in frame:
+        timestamps = frame["timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, format="ISO8601")
+        hours = timestamps.dt.hour.to_numpy()
+        night = (hours < rules.night_end_hour) | (hours > rules.night_start_hour)
+        risk += np.where(night & timestamps.notna().to_numpy(), rules.night_weight, 0.0)
+
+    if "location" in frame and rules.foreign_locations:
+        pattern = "|".join(re.escape(name) for name in rules.foreign_locations)
+        foreign = frame["location"].astype("string").str.contains(pattern, regex=True)
+        risk += np.where(foreign.fillna(False).to_numpy(dtype=bool), rules.foreign_weight, 0.0)
+
+    return np.minimum(risk, rules.max_score)
+
+
+def load_frame(path: str):
+    """Load a JSON array, NDJSON, CSV or Parquet dataset into a DataFrame"""
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".ndjson"):
+        return pd.read_json(path, lines=True, convert_dates=False)
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    with open(path) as f:
+        return pd.DataFrame(json.load(f))
+
+
+def save_frame(frame, path: str):
+    """Save a DataFrame in the format implied by the file extension"""
+    if path.endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    elif path.endswith(".ndjson"):
+        frame.to_json(path, orient="records", lines=True, date_format="iso")
+    elif path.endswith(".csv"):
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_json(path, orient="records", indent=2, date_format="iso")
+
+
+def rescore_file(input_path: str, output_path: str, rules: RiskRules = DEFAULT_RULES) -> int:
+    """
+    Recompute risk_score for every record in a dataset file
+
+    Returns:
+        Number of records rescored
+    """
+    frame = load_frame(input_path)
+    frame["risk_score"] = score_frame(frame, rules)
+    save_frame(frame, output_path)
+    print(f"[OK] Rescored {len(frame)} records -> {output_path}")
+    return len(frame)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Rescore an existing dataset with configurable risk rules")
+    parser.add_argument("input", nargs="?", help="Input .json, .ndjson, .csv or .parquet file")
+    parser.add_argument("-o", "--output", help="Output file (defaults to overwriting the input)")
+    parser.add_argument("--rules", help="JSON file overriding the default risk rules")
+    parser.add_argument("--print-rules", action="store_true", help="Print the effective rules and exit")
+    args = parser.parse_args(argv)
+
+    rules = RiskRules.from_file(args.rules) if args.rules else DEFAULT_RULES
+    if args.print_rules:
+        print(json.dumps(rules.to_dict(), indent=2))
+        return
+    if not args.input:
+        parser.error("an input file is required")
+    rescore_file(args.input, args.output or args.input, rules)
+
+
+if __name__ == "__main__":
+    main()
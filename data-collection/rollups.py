@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Rollups for Zero-Trust Cloud Lab
+Single-pass, mergeable aggregates over generated and collected logs: per
+minute/hour counts, top-N breakdowns and histogram percentiles
+"""
+
+import argparse
+import json
+import math
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+HIGH_RISK_THRESHOLD = 70
+
+
+class Histogram:
+    """
+    Fixed-width sparse histogram
+
+    Two histograms with the same bin width merge by adding bin counts, so
+    percentiles of a union can be computed from per-shard partials.
+    Percentiles are the lower edge of their bin: exact for values that are
+    multiples of the bin width (integer scores with width 1), otherwise at
+    most one bin width low.
+    """
+
+    def __init__(self, bin_width: float = 1.0, bins: Optional[Dict[int, int]] = None):
+        self.bin_width = bin_width
+        self.bins = Counter(bins or {})
+        self.count = sum(self.bins.values())
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.bins[int(math.floor(value / self.bin_width))] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Histogram"):
+        if other.bin_width != self.bin_width:
+            raise ValueError(f"Cannot merge histograms with bin widths {self.bin_width} and {other.bin_width}")
+        self.bins.update(other.bins)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Lower edge of the bin containing the q-th percentile"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= rank:
+                return index * self.bin_width
+        return max(self.bins) * self.bin_width
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict:
+        return {"bin_width": self.bin_width, "total": self.total,
+                "bins": {str(index): count for index, count in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Histogram":
+        histogram = cls(data["bin_width"], {int(index): count for index, count in data["bins"].items()})
+        histogram.total = data["total"]
+        return histogram
+
+
+class Rollup:
+    """
+    Mergeable aggregates for all datasets
+
+    add() updates every aggregate from one record, so a single pass over a
+    stream computes all of them. Partials from shards, workers or earlier
+    incremental runs combine with merge(), and round-trip through
+    to_dict()/from_dict() (or save()/load()) as JSON.
+    """
+
+    COUNTERS = (
+        "records", "per_minute", "per_hour",
+        "failures_by_user", "denies_by_port", "bytes_by_protocol",
+        "events_by_type", "operations", "status", "callers",
+        "failed_logins", "high_risk_events", "blocked_connections",
+        "invalid",
+    )
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, Counter())
+        self.risk_scores = Histogram(1.0)
+        self.flow_bytes = Histogram(1024.0)
+
+    def add(self, record: Dict, dataset: str):
+        """
+        Fold one record into the aggregates
+
+        Records without a string timestamp (collected with --no-validate)
+        are only counted in invalid.
+
+        Args:
+            record: Generated or collected log record
+            dataset: authentication, security, network or activity
+        """
+        timestamp = record.get("timestamp")
+        if not isinstance(timestamp, str):
+            self.invalid[dataset] += 1
+            return
+        self.records[dataset] += 1
+        # ISO strings: first 16 chars are the minute, first 13 the hour
+        self.per_minute[f"{dataset}|{timestamp[:16]}"] += 1
+        self.per_hour[f"{dataset}|{timestamp[:13]}"] += 1
+
+        if dataset == "authentication":
+            if not record["success"]:
+                self.failed_logins[dataset] += 1
+                self.failures_by_user[record["username"]] += 1
+        elif dataset == "security":
+            risk_score = record["risk_score"]
+            self.risk_scores.add(risk_score)
+            self.events_by_type[record["event_type"]] += 1
+            if risk_score > HIGH_RISK_THRESHOLD:
+                self.high_risk_events[dataset] += 1
+        elif dataset == "network":
+            flow_bytes = record["bytes_sent"] + record["bytes_received"]
+            self.bytes_by_protocol[record["protocol"]] += flow_bytes
+            self.flow_bytes.add(flow_bytes)
+            if record["action"] == "deny":
+                self.blocked_connections[dataset] += 1
+                self.denies_by_port[str(record["destination_port"])] += 1
+        elif dataset == "activity":
+            self.operations[record.get("operation")] += 1
+            self.status[record.get("status")] += 1
+            self.callers[record.get("caller")] += 1
+
+    def add_all(self, records: Iterable[Dict], dataset: str) -> "Rollup":
+        for record in records:
+            self.add(record, dataset)
+        return self
+
+    def observe(self, records: Iterable[Dict], dataset: str) -> Iterator[Dict]:
+        """Pass records through unchanged while folding them in (for streaming writers)"""
+        for record in records:
+            self.add(record, dataset)
+            yield record
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        """Add another partial into this one"""
+        for name in self.COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        self.risk_scores.merge(other.risk_scores)
+        self.flow_bytes.merge(other.flow_bytes)
+        return self
+
+    def to_dict(self) -> Dict:
+        data = {name: dict(getattr(self, name)) for name in self.COUNTERS}
+        data["risk_scores"] = self.risk_scores.to_dict()
+        data["flow_bytes"] = self.flow_bytes.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Rollup":
+        rollup = cls()
+        for name in cls.COUNTERS:
+            getattr(rollup, name).update(data.get(name, {}))
+        if "risk_scores" in data:
+            rollup.risk_scores = Histogram.from_dict(data["risk_scores"])
+        if "flow_bytes" in data:
+            rollup.flow_bytes = Histogram.from_dict(data["flow_bytes"])
+        return rollup
+
+    def save(self, filename: str):
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, filename: str) -> "Rollup":
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
+
+    def buckets(self, dataset: str, granularity: str = "hour") -> Dict[str, int]:
+        """Time-ordered counts per minute or hour for one dataset"""
+        source = self.per_minute if granularity == "minute" else self.per_hour
+        prefix = f"{dataset}|"
+        return {key[len(prefix):]: count for key, count in sorted(source.items())
+                if key.startswith(prefix)}
+
+    def summary(self, top: int = 5) -> Dict:
+        """Headline figures, top-N breakdowns and percentiles"""
+        def share(part: int, dataset: str) -> float:
+            return round(part / self.records[dataset] * 100, 1) if self.records[dataset] else 0.0
+
+        failed = self.failed_logins["authentication"]
+        high_risk = self.high_risk_events["security"]
+        blocked = self.blocked_connections["network"]
+        busiest = {dataset: max(self.buckets(dataset).items(), key=lambda item: item[1], default=None)
+                   for dataset in self.records}
+        return {
+            "records": dict(self.records),
+            "failed_logins": {"count": failed, "percent": share(failed, "authentication")},
+            "high_risk_events": {"count": high_risk, "percent": share(high_risk, "security")},
+            "blocked_connections": {"count": blocked, "percent": share(blocked, "network")},
+            "top_failing_users": self.failures_by_user.most_common(top),
+            "top_denied_ports": self.denies_by_port.most_common(top),
+            "bytes_by_protocol": dict(self.bytes_by_protocol),
+            "risk_score_percentiles": {f"p{q}": self.risk_scores.percentile(q) for q in (50, 90, 99)},
+            "flow_bytes_percentiles": {f"p{q}": self.flow_bytes.percentile(q) for q in (50, 90, 99)},
+            "top_operations": self.operations.most_common(top),
+            "busiest_hour": busiest,
+            "invalid_records": dict(self.invalid),
+        }
+
+    def print_insights(self):
+        """Print the security insights shown at the end of generation/collection"""
+        summary = self.summary()
+        print("\nSecurity Insights:")
+        if self.records["authentication"]:
+            failed = summary["failed_logins"]
+            print(f"  - Failed login attempts: {failed['count']} ({failed['percent']:.1f}%)")
+        if self.records["security"]:
+            high_risk = summary["high_risk_events"]
+            percentiles = summary["risk_score_percentiles"]
+            print(f"  - High-risk events: {high_risk['count']} ({high_risk['percent']:.1f}%)")
+            print(f"  - Risk score p50/p90/p99: {percentiles['p50']}/{percentiles['p90']}/{percentiles['p99']}")
+        if self.records["network"]:
+            blocked = summary["blocked_connections"]
+            print(f"  - Blocked connections: {blocked['count']} ({blocked['percent']:.1f}%)")
+            if summary["top_denied_ports"]:
+                ports = ", ".join(f"{port} ({count})" for port, count in summary["top_denied_ports"])
+                print(f"  - Most denied ports: {ports}")
+        if summary["top_failing_users"]:
+            users = ", ".join(f"{user} ({count})" for user, count in summary["top_failing_users"])
+            print(f"  - Most failing users: {users}")
+        if self.invalid:
+            invalid = ", ".join(f"{dataset} ({count})" for dataset, count in self.invalid.items())
+            print(f"  - Skipped without a timestamp: {invalid}")
+        if self.records["activity"]:
+            operations = ", ".join(f"{op} ({count})" for op, count in summary["top_operations"][:3])
+            print(f"  - Activity log entries: {self.records['activity']}; top operations: {operations}")
+
+
+def dataset_for_file(path: str) -> str:
+    """Dataset name from an output file name such as network_logs.ndjson"""
+    name = path.rsplit("/", 1)[-1]
+    for prefix, dataset in (("authentication", "authentication"), ("security", "security"),
+                            ("network", "network"), ("azure_activity", "activity")):
+        if name.startswith(prefix):
+            return dataset
+    raise ValueError(f"Cannot tell the dataset of {path}; name it like the generator output")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compute or merge rollups over log files")
+    parser.add_argument("inputs", nargs="*", help="Dataset files (.json/.ndjson) to roll up")
+    parser.add_argument("--merge", nargs="+", default=[], help="Existing rollup JSON files to merge in")
+    parser.add_argument("-o", "--output", help="Save the combined rollup to this JSON file")
+    parser.add_argument("--summary", action="store_true", help="Print the full summary as JSON")
+    args = parser.parse_args(argv)
+
+    from anomaly_detector import iter_log_file
+
+    rollup = Rollup()
+    for path in args.merge:
+        rollup.merge(Rollup.load(path))
+    for path in args.inputs:
+        rollup.add_all(iter_log_file(path), dataset_for_file(path))
+
+    if args.summary:
+        print(json.dumps(rollup.summary(), indent=2))
+    else:
+        rollup.print_insights()
+    if args.output:
+        rollup.save(args.output)
+        print(f"[OK] Saved rollup to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,20 @@ Generates realistic security events and authentication logs for testing
 """
 
 import json
+import os
+import heapq
 import random
 import uuid
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
 import csv
 
+from risk_scoring import score_record
+from metrics import REGISTRY as metrics, add_metrics_arguments
+from rollups import Rollup
+
 # Sample data pools
 USERNAMES = [
     "john.doe", "jane.smith", "bob.wilson", "alice.jones", "charlie.brown",
@@ -52,10 +60,49 @@ THREAT_TYPES = [
     "anomalous_access", "privilege_escalation", "data_exfiltration"
 ]
 
+# Each user has their own workstation address, so their logins, security
+# events and flows share an IP that correlation.py can join on and that no
+# other user's traffic comes from. Most flows are east-west traffic between
+# lab servers, whose addresses never log in.
+HOME_IPS = {username: f"10.1.0.{10 + index}" for index, username in enumerate(USERNAMES)}
+SERVER_IPS = [f"10.2.0.{host}" for host in range(10, 60)]
+# Share of each user's logins/events that come from their home address, and of
+# flows that originate from some user's home address
+HOME_IP_PROBABILITY = 0.8
+USER_FLOW_PROBABILITY = 0.1
+
+# Lowest chance a login succeeds after a run of failures
+MIN_SUCCESS_PROBABILITY = 0.3
+
+# Records per shard in parallel mode; fixed so output does not depend on worker count
+DEFAULT_SHARD_SIZE = 100000
+
+# User IDs shared by every dataset generated in this process (see default_user_ids)
+_default_user_ids: Dict[str, str] = {}
 
-def generate_user_id() -> str:
+
+def generate_uuid(rng: Optional[random.Random] = None) -> str:
+    """Generate a random UUID string (drawn from rng when given)"""
+    if rng is None:
+        return str(uuid.uuid4())
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_user_id(rng: Optional[random.Random] = None) -> str:
     """Generate a random UUID for user"""
-    return str(uuid.uuid4())
+    return generate_uuid(rng)
+
+
+def default_user_ids() -> Dict[str, str]:
+    """
+    Username -> user ID mapping used when a generator is not given one
+    
+    Created once per process, so authentication logs and security events
+    generated separately still agree on who each user is.
+    """
+    if not _default_user_ids:
+        _default_user_ids.update({username: generate_user_id() for username in USERNAMES})
+    return _default_user_ids
 
 
 def generate_timestamp(days_ago: int = 30) -> datetime:
@@ -67,66 +114,98 @@ def generate_timestamp(days_ago: int = 30) -> datetime:
     return start + timedelta(seconds=random_seconds)
 
 
+def iter_timestamps(num_records: int, days_ago: int = 30,
+                    end_time: Optional[datetime] = None,
+                    rng: Optional[random.Random] = None) -> Iterator[datetime]:
+    """
+    Yield num_records timestamps in increasing order within the last N days
+
+    Each value is drawn as the next order statistic of the remaining uniform
+    samples, so the sequence is distributed like sorted uniform timestamps
+    without holding them in memory or sorting afterwards.
+    """
+    rng = rng or random
+    end = end_time or datetime.now()
+    start = end - timedelta(days=days_ago)
+    span = (end - start).total_seconds()
+    position = 0.0
+    for remaining in range(num_records, 0, -1):
+        position += (1.0 - position) * (1.0 - rng.random() ** (1.0 / remaining))
+        yield start + timedelta(seconds=position * span)
+
+
+def iter_timeline(num_records: int, days_ago: int = 30,
+                  end_time: Optional[datetime] = None,
+                  rng: Optional[random.Random] = None,
+                  arrivals: Optional[Iterable] = None) -> Iterator[tuple]:
+    """
+    Yield (timestamp, campaign) pairs that drive a generator
+
+    With arrivals (e.g. traffic_model.iter_arrivals) those are used as-is and
+    num_records/days_ago are ignored; otherwise timestamps are uniform over
+    the window and no record belongs to an attack campaign.
+    """
+    if arrivals is not None:
+        return iter(arrivals)
+    return ((timestamp, None) for timestamp in iter_timestamps(num_records, days_ago, end_time, rng))
+
+
 def calculate_risk_score(event: Dict, timestamp: datetime = None) -> float:
-    """Calculate risk score based on event characteristics"""
-    risk = 0.0
-    
-    # Base risk by event type
-    risk_factors = {
-        "failed_login": 30,
-        "suspicious_login": 50,
-        "brute_force": 80,
-        "privilege_escalation": 90,
-        "data_exfiltration": 95,
-        "anomalous_access": 60
-    }
-    
-    risk += risk_factors.get(event.get("event_type", ""), 10)
-    
-    # Increase risk for multiple failures
-    if event.get("success") is False:
-        risk += 20
-    
-    # Unusual time (night hours)
-    if timestamp:
-        hour = timestamp.hour
-        if hour < 6 or hour > 22:
-            risk += 15
-    
-    # Foreign location (simple heuristic)
-    if "Tokyo" in event.get("location", "") or "Singapore" in event.get("location", ""):
-        risk += 10
-    
-    return min(risk, 100.0)
+    """Calculate risk score based on event characteristics (see risk_scoring.RiskRules)"""
+    return score_record(event, timestamp)
 
 
-def generate_authentication_log(num_records: int = 1000) -> List[Dict]:
-    """Generate synthetic authentication logs"""
-    logs = []
+def iter_authentication_log(num_records: int = 1000, days_ago: int = 30,
+                            end_time: Optional[datetime] = None,
+                            rng: Optional[random.Random] = None,
+                            user_ids: Optional[Dict[str, str]] = None,
+                            arrivals: Optional[Iterable] = None) -> Iterator[Dict]:
+    """
+    Yield synthetic authentication logs in timestamp order
+    
+    Args:
+        num_records: Number of logs to generate
+        days_ago: Days of history to cover
+        end_time: End of the generated window (defaults to now)
+        rng: Random stream to draw from (defaults to the global random module)
+        user_ids: Username -> user_id mapping shared with the other datasets
+                  (defaults to default_user_ids())
+        arrivals: (timestamp, campaign) pairs from traffic_model; replaces
+                  num_records/days_ago and injects attack traffic
+    """
+    rng = rng or random
+    user_ids = user_ids or default_user_ids()
     user_sessions = {}  # Track user sessions for realistic patterns
     
-    for _ in range(num_records):
-        username = random.choice(USERNAMES)
+    for timestamp, campaign in iter_timeline(num_records, days_ago, end_time, rng, arrivals):
+        if campaign is not None and campaign.kind == "brute_force" and campaign.target:
+            username = campaign.target
+        else:
+            username = rng.choice(USERNAMES)
         
         # Get or create user ID
         if username not in user_sessions:
             user_sessions[username] = {
-                "user_id": generate_user_id(),
+                "user_id": user_ids.get(username) or generate_user_id(rng),
                 "failed_attempts": 0,
                 "last_login": None
             }
         
         user_data = user_sessions[username]
-        timestamp = generate_timestamp(30)
         
-        # 80% success rate normally, but increase failures if previous failures
-        success_probability = 0.8 - (user_data["failed_attempts"] * 0.1)
-        success = random.random() < success_probability
+        if campaign is not None:
+            yield attack_authentication_log(campaign, timestamp, rng, username, user_data["user_id"])
+            continue
+        
+        # 80% success rate normally, but increase failures if previous failures;
+        # the floor keeps a run of failures from locking a user out for good
+        success_probability = max(0.8 - (user_data["failed_attempts"] * 0.1), MIN_SUCCESS_PROBABILITY)
+        success = rng.random() < success_probability
         
         if success:
             user_data["failed_attempts"] = 0
             user_data["last_login"] = timestamp
-            mfa_required = random.random() < 0.3  # 30% require MFA
+            mfa_required = rng.random() < 0.3  # 30% require MFA
         else:
             user_data["failed_attempts"] += 1
             mfa_required = False
@@ -134,7 +213,7 @@ def generate_authentication_log(num_records: int = 1000) -> List[Dict]:
         # Determine authentication method
         auth_methods = ["password", "mfa", "sso", "biometric"]
         weights = [0.5, 0.25, 0.15, 0.1]
-        auth_method = random.choices(auth_methods, weights=weights)[0]
+        auth_method = rng.choices(auth_methods, weights=weights)[0]
         
         # Risk level
         if not success:
@@ -147,89 +226,141 @@ def generate_authentication_log(num_records: int = 1000) -> List[Dict]:
             risk_levels = ["low", "medium", "high"]
             risk_weights = [0.7, 0.2, 0.1]
         
-        risk_level = random.choices(risk_levels, weights=risk_weights)[0]
+        risk_level = rng.choices(risk_levels, weights=risk_weights)[0]
         
-        log = {
-            "log_id": str(uuid.uuid4()),
+        yield {
+            "log_id": generate_uuid(rng),
             "timestamp": timestamp.isoformat(),
             "user_id": user_data["user_id"],
             "username": username,
             "authentication_method": auth_method,
-            "source_ip": random.choice(IP_ADDRESSES),
-            "location": random.choice(LOCATIONS),
-            "device_info": random.choice(USER_AGENTS),
+            "source_ip": HOME_IPS[username] if rng.random() < HOME_IP_PROBABILITY else rng.choice(IP_ADDRESSES),
+            "location": rng.choice(LOCATIONS),
+            "device_info": rng.choice(USER_AGENTS),
             "success": success,
             "risk_level": risk_level,
             "mfa_status": "verified" if mfa_required and success else "not_required",
-            "failure_reason": random.choice([
+            "failure_reason": rng.choice([
                 "invalid_password", "account_locked", "expired_token", "invalid_mfa"
             ]) if not success else None
         }
-        
-        logs.append(log)
+
+
+def attack_authentication_log(campaign, timestamp: datetime, rng: random.Random,
+                              username: str, user_id: str) -> Dict:
+    """
+    Render one failed login from an attack campaign
     
-    return sorted(logs, key=lambda x: x["timestamp"])
+    brute_force hammers the campaign's target account; credential_stuffing
+    sprays random accounts. Both come from the campaign's source IP.
+    """
+    return {
+        "log_id": generate_uuid(rng),
+        "timestamp": timestamp.isoformat(),
+        "user_id": user_id,
+        "username": username,
+        "authentication_method": "password",
+        "source_ip": campaign.source_ip,
+        "location": rng.choice(LOCATIONS),
+        "device_info": rng.choice(USER_AGENTS),
+        "success": False,
+        "risk_level": "high",
+        "mfa_status": "not_required",
+        "failure_reason": "invalid_password" if rng.random() < 0.9 else "account_locked"
+    }
 
 
-def generate_security_events(num_records: int = 500) -> List[Dict]:
-    """Generate synthetic security events"""
-    events = []
+def generate_authentication_log(num_records: int = 1000, days_ago: int = 30) -> List[Dict]:
+    """Generate synthetic authentication logs"""
+    return list(iter_authentication_log(num_records, days_ago))
+
+
+def iter_security_events(num_records: int = 500, days_ago: int = 30,
+                         end_time: Optional[datetime] = None,
+                         rng: Optional[random.Random] = None,
+                         arrivals: Optional[Iterable] = None,
+                         user_ids: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+    """
+    Yield synthetic security events in timestamp order (see iter_timeline for arrivals)
     
-    for _ in range(num_records):
-        timestamp = generate_timestamp(30)
-        event_type = random.choice(EVENT_TYPES)
+    Events belong to the same users as the authentication logs (user_ids,
+    defaulting to default_user_ids(); users missing from it get a generated
+    ID kept for the whole stream) and mostly come from their home IPs.
+    """
+    rng = rng or random
+    user_ids = dict(user_ids or default_user_ids())
+    for timestamp, campaign in iter_timeline(num_records, days_ago, end_time, rng, arrivals):
+        event_type = rng.choice(EVENT_TYPES)
+        username = rng.choice(USERNAMES)
+        user_id = user_ids.get(username)
+        if user_id is None:
+            user_id = user_ids[username] = generate_user_id(rng)
         
         # Determine if this is a security incident
-        is_incident = random.random() < 0.15  # 15% are incidents
+        is_incident = campaign is not None or rng.random() < 0.15  # 15% are incidents
         
-        if is_incident:
-            threat_type = random.choice(THREAT_TYPES)
-            severity = random.choice(["high", "critical"])
-            result = "blocked" if random.random() < 0.7 else "allowed"
+        if campaign is not None:
+            event_type = "suspicious_activity"
+            threat_type = campaign.kind
+            severity = rng.choice(["high", "critical"])
+            result = "blocked" if rng.random() < 0.7 else "allowed"
+        elif is_incident:
+            threat_type = rng.choice(THREAT_TYPES)
+            severity = rng.choice(["high", "critical"])
+            result = "blocked" if rng.random() < 0.7 else "allowed"
         else:
             threat_type = None
-            severity = random.choice(["low", "medium"])
+            severity = rng.choice(["low", "medium"])
             result = "allowed"
         
         event = {
-            "event_id": str(uuid.uuid4()),
+            "event_id": generate_uuid(rng),
             "timestamp": timestamp.isoformat(),
             "event_type": event_type,
             "severity": severity,
-            "source_ip": random.choice(IP_ADDRESSES),
-            "destination_ip": random.choice(IP_ADDRESSES),
-            "user_id": generate_user_id(),
-            "resource": random.choice(RESOURCES),
-            "action": random.choice(ACTIONS),
+            "source_ip": campaign.source_ip if campaign else (
+                HOME_IPS[username] if rng.random() < HOME_IP_PROBABILITY else rng.choice(IP_ADDRESSES)
+            ),
+            "destination_ip": rng.choice(IP_ADDRESSES),
+            "user_id": user_id,
+            "resource": rng.choice(RESOURCES),
+            "action": rng.choice(ACTIONS),
             "result": result,
             "threat_type": threat_type,
             "metadata": {
-                "bytes_transferred": random.randint(100, 1000000),
-                "duration_ms": random.randint(10, 5000),
-                "protocol": random.choice(["HTTPS", "HTTP", "SSH", "RDP"])
+                "bytes_transferred": rng.randint(100, 1000000),
+                "duration_ms": rng.randint(10, 5000),
+                "protocol": rng.choice(["HTTPS", "HTTP", "SSH", "RDP"])
             }
         }
         
         event["risk_score"] = calculate_risk_score(event, timestamp)
-        events.append(event)
-    
-    return sorted(events, key=lambda x: x["timestamp"])
+        yield event
 
 
-def generate_network_logs(num_records: int = 2000) -> List[Dict]:
-    """Generate synthetic network security logs"""
-    logs = []
-    
-    for _ in range(num_records):
-        timestamp = generate_timestamp(30)
+def generate_security_events(num_records: int = 500, days_ago: int = 30) -> List[Dict]:
+    """Generate synthetic security events"""
+    return list(iter_security_events(num_records, days_ago))
+
+
+def iter_network_logs(num_records: int = 2000, days_ago: int = 30,
+                      end_time: Optional[datetime] = None,
+                      rng: Optional[random.Random] = None,
+                      arrivals: Optional[Iterable] = None) -> Iterator[Dict]:
+    """Yield synthetic network security logs in timestamp order (see iter_timeline for arrivals)"""
+    rng = rng or random
+    for timestamp, campaign in iter_timeline(num_records, days_ago, end_time, rng, arrivals):
+        if campaign is not None:
+            yield attack_network_log(campaign, timestamp, rng)
+            continue
         
         # Network connection
         protocols = ["TCP", "UDP", "ICMP"]
         weights = [0.7, 0.2, 0.1]
-        protocol = random.choices(protocols, weights=weights)[0]
+        protocol = rng.choices(protocols, weights=weights)[0]
         
         # Determine if suspicious
-        is_suspicious = random.random() < 0.1  # 10% suspicious
+        is_suspicious = rng.random() < 0.1  # 10% suspicious
         
         if is_suspicious:
             action = "deny"
@@ -238,79 +369,444 @@ def generate_network_logs(num_records: int = 2000) -> List[Dict]:
             action = "allow"
             flags = []
         
-        log = {
-            "log_id": str(uuid.uuid4()),
+        yield {
+            "log_id": generate_uuid(rng),
             "timestamp": timestamp.isoformat(),
             "protocol": protocol,
-            "source_ip": random.choice(IP_ADDRESSES),
-            "source_port": random.randint(1024, 65535),
-            "destination_ip": random.choice(IP_ADDRESSES),
-            "destination_port": random.choice([80, 443, 22, 3389, 5432, 3306]),
-            "bytes_sent": random.randint(64, 100000),
-            "bytes_received": random.randint(64, 100000),
-            "packets": random.randint(1, 1000),
+            # Some user traffic from home addresses, the rest between lab servers
+            "source_ip": HOME_IPS[rng.choice(USERNAMES)] if rng.random() < USER_FLOW_PROBABILITY else rng.choice(SERVER_IPS),
+            "source_port": rng.randint(1024, 65535),
+            "destination_ip": rng.choice(IP_ADDRESSES),
+            "destination_port": rng.choice([80, 443, 22, 3389, 5432, 3306]),
+            "bytes_sent": rng.randint(64, 100000),
+            "bytes_received": rng.randint(64, 100000),
+            "packets": rng.randint(1, 1000),
             "action": action,
             "flags": flags,
-            "session_duration": random.randint(1, 3600)
+            "session_duration": rng.randint(1, 3600)
         }
-        
-        logs.append(log)
+
+
+def attack_network_log(campaign, timestamp: datetime, rng: random.Random) -> Dict:
+    """
+    Render one denied connection from an attack campaign
     
-    return sorted(logs, key=lambda x: x["timestamp"])
+    PORT_SCAN probes many ports with tiny flows; SYN_FLOOD and DDoS_ATTEMPT
+    hit a single service with short, packet-heavy flows.
+    """
+    scan = campaign.kind == "PORT_SCAN"
+    return {
+        "log_id": generate_uuid(rng),
+        "timestamp": timestamp.isoformat(),
+        "protocol": "TCP",
+        "source_ip": campaign.source_ip,
+        "source_port": rng.randint(1024, 65535),
+        "destination_ip": campaign.target or rng.choice(IP_ADDRESSES),
+        "destination_port": rng.randint(1, 65535) if scan else rng.choice([80, 443]),
+        "bytes_sent": rng.randint(40, 120) if scan else rng.randint(40, 1500),
+        "bytes_received": 0,
+        "packets": rng.randint(1, 3) if scan else rng.randint(100, 1000),
+        "action": "deny",
+        "flags": [campaign.kind],
+        "session_duration": rng.randint(0, 1) if scan else rng.randint(1, 10)
+    }
+
+
+def generate_network_logs(num_records: int = 2000, days_ago: int = 30) -> List[Dict]:
+    """Generate synthetic network security logs"""
+    return list(iter_network_logs(num_records, days_ago))
 
 
 def save_to_json(data: List[Dict], filename: str):
     """Save data to JSON file"""
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=2)
+    with metrics.timed_write(filename, "json", len(data)):
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
     print(f"[OK] Saved {len(data)} records to {filename}")
 
 
+def flatten_record(record: Dict) -> Dict:
+    """Flatten nested metadata dict into metadata_* columns for CSV"""
+    flat_record = record.copy()
+    if 'metadata' in flat_record:
+        metadata = flat_record.pop('metadata')
+        for key, value in metadata.items():
+            flat_record[f'metadata_{key}'] = value
+    return flat_record
+
+
 def save_to_csv(data: List[Dict], filename: str):
     """Save data to CSV file"""
     if not data:
         return
     
-    with open(filename, 'w', newline='') as f:
-        # Flatten nested dicts for CSV
-        flat_data = []
-        for record in data:
-            flat_record = record.copy()
-            if 'metadata' in flat_record:
-                metadata = flat_record.pop('metadata')
-                for key, value in metadata.items():
-                    flat_record[f'metadata_{key}'] = value
-            flat_data.append(flat_record)
-        
-        writer = csv.DictWriter(f, fieldnames=flat_data[0].keys())
-        writer.writeheader()
-        writer.writerows(flat_data)
+    with metrics.timed_write(filename, "csv", len(data)):
+        with open(filename, 'w', newline='') as f:
+            # Flatten nested dicts for CSV
+            flat_data = [flatten_record(record) for record in data]
+            
+            writer = csv.DictWriter(f, fieldnames=flat_data[0].keys())
+            writer.writeheader()
+            writer.writerows(flat_data)
     
     print(f"[OK] Saved {len(data)} records to {filename}")
 
 
-def main():
-    """Generate all synthetic datasets"""
-    print("Generating synthetic security datasets...")
+def stream_to_files(records: Iterable[Dict], ndjson_filename: Optional[str] = None,
+                    csv_filename: Optional[str] = None) -> int:
+    """
+    Write records to NDJSON and/or CSV incrementally in a single pass
+    
+    Records are written as they are produced, so memory use does not depend
+    on the number of records. The CSV header is taken from the first record.
+    
+    Returns:
+        Number of records written
+    """
+    json_file = open(ndjson_filename, 'w') if ndjson_filename else None
+    csv_file = open(csv_filename, 'w', newline='') if csv_filename else None
+    writer = None
+    count = 0
+    
+    try:
+        for record in records:
+            if json_file:
+                json_file.write(json.dumps(record))
+                json_file.write("\n")
+            if csv_file:
+                flat_record = flatten_record(record)
+                if writer is None:
+                    writer = csv.DictWriter(csv_file, fieldnames=flat_record.keys())
+                    writer.writeheader()
+                writer.writerow(flat_record)
+            count += 1
+    finally:
+        if json_file:
+            json_file.close()
+        if csv_file:
+            csv_file.close()
+    
+    for filename, format in ((ndjson_filename, "ndjson"), (csv_filename, "csv")):
+        if filename:
+            # Serialization interleaves with generation here, so only volume is recorded
+            metrics.record_write(format, count, os.path.getsize(filename))
+            print(f"[OK] Streamed {count} records to {filename}")
+    return count
+
+
+def save_columnar(records: Iterable[Dict], basename: str, format: str) -> int:
+    """Save records to {basename}.parquet / .arrow in row-group batches"""
+    from columnar_output import write_records
+    filename = f"{basename}.{format}"
+    count = write_records(records, filename, basename, format)
+    metrics.record_write(format, count, os.path.getsize(filename))
+    return count
+
+
+def save_dataset(data: List[Dict], basename: str, format: str = "json"):
+    """Save a dataset as JSON + CSV, or as a single columnar file"""
+    if format == "json":
+        save_to_json(data, f"{basename}.json")
+        save_to_csv(data, f"{basename}.csv")
+    else:
+        save_columnar(data, basename, format)
+
+
+def stream_datasets(args: argparse.Namespace):
+    """Generate all datasets in streaming mode with constant memory"""
+    rollup = Rollup()
+    datasets = [
+        ("authentication logs", "authentication_logs",
+         rollup.observe(iter_authentication_log(args.auth_records, args.days), "authentication")),
+        ("security events", "security_events",
+         rollup.observe(iter_security_events(args.security_events, args.days), "security")),
+        ("network logs", "network_logs",
+         rollup.observe(iter_network_logs(args.network_logs, args.days), "network")),
+    ]
+    
+    total = 0
+    for index, (label, basename, records) in enumerate(datasets, start=1):
+        print(f"\n{index}. Streaming {label}...")
+        with metrics.stage("stream", dataset=basename) as stage:
+            if args.format == "json":
+                stage.records = stream_to_files(records, f"{basename}.ndjson", f"{basename}.csv")
+            else:
+                stage.records = save_columnar(records, basename, args.format)
+        total += stage.records
+    
+    print("\n" + "=" * 50)
+    print("Dataset Generation Complete!")
+    print("=" * 50)
+    print(f"Total: {total} records")
+    rollup.print_insights()
+
+
+def generate_traffic(args: argparse.Namespace):
+    """
+    Generate all datasets from the traffic model at a target events/sec
+    
+    The total rate is split across datasets in proportion to the record
+    count options, and each dataset gets its own attack campaigns.
+    """
+    from traffic_model import TrafficProfile, iter_arrivals, random_campaigns
+    
+    rng = random.Random(args.seed)
+    end = datetime.fromisoformat(args.end_time) if args.end_time else datetime.now()
+    start = end - (timedelta(hours=args.hours) if args.hours else timedelta(days=args.days))
+    attacker_ips = IP_ADDRESSES[5:]  # The public-range addresses
+    
+    datasets = [
+        ("authentication logs", "authentication_logs", "authentication",
+         args.auth_records, USERNAMES, iter_authentication_log),
+        ("security events", "security_events", "security",
+         args.security_events, None, iter_security_events),
+        ("network logs", "network_logs", "network",
+         args.network_logs, IP_ADDRESSES, iter_network_logs),
+    ]
+    weight_total = sum(dataset[3] for dataset in datasets) or 1
+    
+    rollup = Rollup()
+    total = 0
+    for index, (label, basename, kind, weight, targets, generator) in enumerate(datasets, start=1):
+        profile = TrafficProfile.for_target_eps(args.traffic_eps * weight / weight_total)
+        profile.campaigns = random_campaigns(kind, start, end, args.attack_campaigns,
+                                             attacker_ips, targets, rng)
+        # Campaigns take their share of the dataset's rate instead of adding to it
+        profile.budget_campaigns(start, end, args.attack_fraction)
+        print(f"\n{index}. Streaming {label} "
+              f"(~{profile.expected_events(start, end):,.0f} expected, "
+              f"{len(profile.campaigns)} attack campaigns)...")
+        arrivals = iter_arrivals(profile, start, end, random.Random(rng.getrandbits(64)))
+        records = rollup.observe(generator(rng=random.Random(rng.getrandbits(64)), arrivals=arrivals), kind)
+        with metrics.stage("stream", dataset=basename) as stage:
+            if args.format == "json":
+                stage.records = stream_to_files(records, f"{basename}.ndjson", f"{basename}.csv")
+            else:
+                stage.records = save_columnar(records, basename, args.format)
+        total += stage.records
+    
+    print("\n" + "=" * 50)
+    print("Dataset Generation Complete!")
+    print("=" * 50)
+    print(f"Total: {total} records")
+    rollup.print_insights()
+
+
+# Sharded output file stem -> rollup dataset name
+SHARD_DATASETS = {
+    "authentication_logs": "authentication",
+    "security_events": "security",
+    "network_logs": "network",
+}
+
+
+def shard_rng(seed: int, dataset: str, shard_index: int) -> random.Random:
+    """Derive an independent random stream for one shard of a dataset"""
+    return random.Random(f"{seed}:{dataset}:{shard_index}")
+
+
+def seeded_user_ids(seed: int) -> Dict[str, str]:
+    """Derive stable user IDs so every shard and dataset agrees on who each user is"""
+    rng = random.Random(f"{seed}:users")
+    return {username: generate_user_id(rng) for username in USERNAMES}
+
+
+def iter_dataset(dataset: str, num_records: int, days_ago: int, end_time: datetime,
+                 rng: random.Random, user_ids: Dict[str, str]) -> Iterator[Dict]:
+    """Dispatch to the generator for a dataset name"""
+    if dataset == "authentication_logs":
+        return iter_authentication_log(num_records, days_ago, end_time, rng, user_ids)
+    if dataset == "security_events":
+        return iter_security_events(num_records, days_ago, end_time, rng, user_ids=user_ids)
+    if dataset == "network_logs":
+        return iter_network_logs(num_records, days_ago, end_time, rng)
+    raise ValueError(f"Unknown dataset: {dataset}")
+
+
+def generate_shard(dataset: str, shard_index: int, num_records: int, seed: int,
+                   days_ago: int, end_time: datetime, output_dir: str) -> tuple:
+    """
+    Generate one shard of a dataset into an NDJSON file (runs in a worker process)
+    
+    The shard's content depends only on (seed, dataset, shard_index), never
+    on which worker runs it.
+    
+    Returns:
+        (path of the shard file, partial Rollup of its records)
+    """
+    rng = shard_rng(seed, dataset, shard_index)
+    records = iter_dataset(dataset, num_records, days_ago, end_time, rng, seeded_user_ids(seed))
+    filename = os.path.join(output_dir, f"{dataset}.shard-{shard_index:05d}.ndjson")
+    rollup = Rollup()
+    
+    with open(filename, 'w') as f:
+        for record in rollup.observe(records, SHARD_DATASETS[dataset]):
+            f.write(json.dumps(record))
+            f.write("\n")
+    return filename, rollup
+
+
+def iter_ndjson(filename: str) -> Iterator[Dict]:
+    """Yield records from an NDJSON file one line at a time"""
+    with open(filename) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def merge_shards(filenames: List[str], ndjson_filename: str, csv_filename: str) -> int:
+    """
+    K-way merge timestamp-sorted shard files into single NDJSON/CSV outputs
+    
+    Ties keep shard order, so the merged output is deterministic. Shard
+    files are removed once merged.
+    
+    Returns:
+        Number of records merged
+    """
+    merged = heapq.merge(*(iter_ndjson(name) for name in filenames),
+                         key=lambda record: record["timestamp"])
+    count = stream_to_files(merged, ndjson_filename, csv_filename)
+    for name in filenames:
+        os.remove(name)
+    return count
+
+
+def generate_sharded(args: argparse.Namespace):
+    """Generate all datasets as shards in a process pool with per-shard seeding"""
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    if args.end_time:
+        end_time = datetime.fromisoformat(args.end_time)
+    else:
+        end_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    print(f"Seed: {seed}  End time: {end_time.isoformat()}  Workers: {args.workers}")
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    datasets = [
+        ("authentication_logs", args.auth_records),
+        ("security_events", args.security_events),
+        ("network_logs", args.network_logs),
+    ]
+    
+    # Workers run in other processes, so this process records the whole
+    # pool as one stage plus the size of every file it produced
+    with metrics.stage("sharded") as stage, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        shard_futures = {}
+        for dataset, num_records in datasets:
+            shard_futures[dataset] = [
+                pool.submit(generate_shard, dataset, index, min(args.shard_size, num_records - offset),
+                            seed, args.days, end_time, args.output_dir)
+                for index, offset in enumerate(range(0, num_records, args.shard_size))
+            ]
+        
+        rollup = Rollup()
+        merge_futures = []
+        for dataset, _ in datasets:
+            filenames = []
+            for future in shard_futures[dataset]:
+                filename, partial = future.result()
+                filenames.append(filename)
+                rollup.merge(partial)
+                metrics.record_write("ndjson", partial.records[SHARD_DATASETS[dataset]],
+                                     os.path.getsize(filename))
+            print(f"[OK] Generated {len(filenames)} shards for {dataset}")
+            if args.merge:
+                basename = os.path.join(args.output_dir, dataset)
+                merge_futures.append((basename, pool.submit(
+                    merge_shards, filenames, f"{basename}.ndjson", f"{basename}.csv"
+                )))
+        
+        total = 0
+        for basename, future in merge_futures:
+            count = future.result()
+            total += count
+            for format in ("ndjson", "csv"):
+                metrics.record_write(format, count, os.path.getsize(f"{basename}.{format}"))
+        stage.records = sum(rollup.records.values())
+    
+    print("\n" + "=" * 50)
+    print("Dataset Generation Complete!")
     print("=" * 50)
+    print(f"Total: {total or sum(count for _, count in datasets)} records")
+    rollup.print_insights()
+    rollup.save(os.path.join(args.output_dir, "rollup.json"))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    from traffic_model import DEFAULT_ATTACK_FRACTION
     
+    parser = argparse.ArgumentParser(description="Generate synthetic security datasets")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream records to NDJSON/CSV with constant memory")
+    parser.add_argument("--format", choices=["json", "parquet", "arrow"], default="json",
+                        help="Output format: JSON+CSV (default), Parquet or Arrow IPC")
+    parser.add_argument("--auth-records", type=int, default=1000,
+                        help="Number of authentication logs (default: 1000)")
+    parser.add_argument("--security-events", type=int, default=500,
+                        help="Number of security events (default: 500)")
+    parser.add_argument("--network-logs", type=int, default=2000,
+                        help="Number of network logs (default: 2000)")
+    parser.add_argument("--days", type=int, default=30,
+                        help="Days of history to cover (default: 30)")
+    parser.add_argument("--workers", type=int,
+                        help="Generate shards in parallel with N worker processes")
+    parser.add_argument("--seed", type=int,
+                        help="Seed for reproducible output (implies sharded mode)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f"Records per shard (default: {DEFAULT_SHARD_SIZE})")
+    parser.add_argument("--merge", action="store_true",
+                        help="K-way merge shard files by timestamp into one file per dataset")
+    parser.add_argument("--end-time",
+                        help="ISO end of the generated window in sharded/traffic mode "
+                             "(default: today at midnight / now)")
+    parser.add_argument("--traffic-eps", type=float,
+                        help="Drive generation from the traffic model at this average "
+                             "total events/sec (record counts become rate weights)")
+    parser.add_argument("--attack-campaigns", type=int, default=3,
+                        help="Attack campaigns injected per dataset in traffic mode (default: 3)")
+    parser.add_argument("--attack-fraction", type=float, default=DEFAULT_ATTACK_FRACTION,
+                        help="Share of traffic-mode events that belong to attack campaigns "
+                             f"(default: {DEFAULT_ATTACK_FRACTION})")
+    parser.add_argument("--hours", type=float,
+                        help="Window length in hours for traffic mode (overrides --days)")
+    parser.add_argument("--output-dir", default=".",
+                        help="Directory for sharded output (default: current directory)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    if not 0 <= args.attack_fraction <= 1:
+        parser.error("--attack-fraction must be between 0 and 1")
+    return args
+
+
+def generate_datasets(args: argparse.Namespace):
+    """Generate all datasets in memory, then save each one"""
     # Generate authentication logs
     print("\n1. Generating authentication logs...")
-    auth_logs = generate_authentication_log(1000)
-    save_to_json(auth_logs, "authentication_logs.json")
-    save_to_csv(auth_logs, "authentication_logs.csv")
+    with metrics.stage("generate", dataset="authentication_logs") as stage:
+        auth_logs = generate_authentication_log(args.auth_records, args.days)
+        stage.records = len(auth_logs)
+    with metrics.stage("save", dataset="authentication_logs") as stage:
+        save_dataset(auth_logs, "authentication_logs", args.format)
+        stage.records = len(auth_logs)
     
     # Generate security events
     print("\n2. Generating security events...")
-    security_events = generate_security_events(500)
-    save_to_json(security_events, "security_events.json")
-    save_to_csv(security_events, "security_events.csv")
+    with metrics.stage("generate", dataset="security_events") as stage:
+        security_events = generate_security_events(args.security_events, args.days)
+        stage.records = len(security_events)
+    with metrics.stage("save", dataset="security_events") as stage:
+        save_dataset(security_events, "security_events", args.format)
+        stage.records = len(security_events)
     
     # Generate network logs
     print("\n3. Generating network logs...")
-    network_logs = generate_network_logs(2000)
-    save_to_json(network_logs, "network_logs.json")
-    save_to_csv(network_logs, "network_logs.csv")
+    with metrics.stage("generate", dataset="network_logs") as stage:
+        network_logs = generate_network_logs(args.network_logs, args.days)
+        stage.records = len(network_logs)
+    with metrics.stage("save", dataset="network_logs") as stage:
+        save_dataset(network_logs, "network_logs", args.format)
+        stage.records = len(network_logs)
     
     # Statistics
     print("\n" + "=" * 50)
@@ -322,14 +818,36 @@ def main():
     print(f"Total: {len(auth_logs) + len(security_events) + len(network_logs)} records")
     
     # Security insights
-    failed_logins = sum(1 for log in auth_logs if not log["success"])
-    high_risk_events = sum(1 for event in security_events if event["risk_score"] > 70)
-    blocked_connections = sum(1 for log in network_logs if log["action"] == "deny")
-    
-    print("\nSecurity Insights:")
-    print(f"  - Failed login attempts: {failed_logins} ({failed_logins/len(auth_logs)*100:.1f}%)")
-    print(f"  - High-risk events: {high_risk_events} ({high_risk_events/len(security_events)*100:.1f}%)")
-    print(f"  - Blocked connections: {blocked_connections} ({blocked_connections/len(network_logs)*100:.1f}%)")
+    rollup = Rollup()
+    rollup.add_all(auth_logs, "authentication")
+    rollup.add_all(security_events, "security")
+    rollup.add_all(network_logs, "network")
+    rollup.print_insights()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Generate all synthetic datasets"""
+    args = parse_args(argv)
+    
+    metrics.configure(pipeline="generator", profile_dir=args.profile)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    
+    print("Generating synthetic security datasets...")
+    print("=" * 50)
+    
+    try:
+        if args.traffic_eps:
+            generate_traffic(args)
+        elif args.workers or args.seed is not None:
+            generate_sharded(args)
+        elif args.stream:
+            stream_datasets(args)
+        else:
+            generate_datasets(args)
+    finally:
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+"""
+Test setup for the data-collection scripts
+
+The scripts import each other as top-level modules, so the package
+directory goes on sys.path, as the benchmarks do.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
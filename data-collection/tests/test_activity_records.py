@@ -0,0 +1,41 @@
+"""Tests for activity_records.ActivityNormalizer"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from activity_records import ActivityNormalizer
+
+
+def event(index: int, caller: str = "alice@example.com"):
+    return SimpleNamespace(
+        event_timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        level=SimpleNamespace(value="Informational"),
+        operation_name=SimpleNamespace(value="Microsoft.Compute/virtualMachines/write"),
+        resource_group_name="rg-lab",
+        resource_id=f"/subscriptions/s/resourceGroups/rg-lab/providers/vm-{index}",
+        status=SimpleNamespace(value="Succeeded"),
+        caller=caller,
+        category=SimpleNamespace(value="Administrative"),
+        claims=None,
+        event_data_id=f"event-{index}",
+        correlation_id=f"correlation-{index}",
+    )
+
+
+def test_repeated_values_share_one_string():
+    normalizer = ActivityNormalizer()
+
+    first = normalizer.to_entry(event(1, "".join(["bob", "@example.com"])))
+    second = normalizer.to_entry(event(2, "".join(["bob", "@example.com"])))
+
+    assert first["caller"] is second["caller"]
+
+
+def test_string_cache_stays_bounded():
+    normalizer = ActivityNormalizer(max_strings=50)
+
+    entries = [normalizer.to_entry(event(index)) for index in range(1000)]
+
+    assert len(normalizer._strings) <= 50
+    assert [entry["resource_id"] for entry in entries] == [
+        f"/subscriptions/s/resourceGroups/rg-lab/providers/vm-{index}" for index in range(1000)]
@@ -0,0 +1,91 @@
+"""Tests for anomaly_detector.AuthAnomalyDetector over hand-built login sequences"""
+
+from datetime import datetime, timedelta
+
+from anomaly_detector import AuthAnomalyDetector, DetectorConfig
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def login(seconds: float, username: str = "alice", success: bool = False,
+          source_ip: str = "203.0.113.5", location: str = "New York, US"):
+    return {
+        "timestamp": (START + timedelta(seconds=seconds)).isoformat(),
+        "user_id": f"id-{username}", "username": username, "success": success,
+        "source_ip": source_ip, "location": location,
+    }
+
+
+def alert_types(detector, logs):
+    return [alert["alert_type"] for alert in detector.run(logs)]
+
+
+def test_brute_force_needs_the_threshold_inside_the_window():
+    detector = AuthAnomalyDetector()
+
+    spread = [login(seconds) for seconds in range(0, 5 * 301, 301)]
+    assert alert_types(detector, spread) == []
+
+    burst = [login(2000 + seconds) for seconds in range(5)]
+    assert alert_types(detector, burst) == ["brute_force"]
+
+
+def test_user_failures_are_capped_at_the_threshold():
+    detector = AuthAnomalyDetector()
+
+    list(detector.run(login(seconds / 10) for seconds in range(1000)))
+
+    assert len(detector.users["id-alice"].failures) == 5
+
+
+def test_credential_stuffing_counts_distinct_users_per_ip():
+    detector = AuthAnomalyDetector()
+    logs = [login(index, username=f"user-{index % 4}") for index in range(12)]
+
+    types = alert_types(detector, logs)
+
+    assert types == ["credential_stuffing"]
+    assert len(detector.ips["203.0.113.5"].failed_users) == 4
+
+
+def test_failed_users_are_trimmed_to_the_threshold():
+    detector = AuthAnomalyDetector()
+
+    list(detector.run(login(index, username=f"user-{index}") for index in range(500)))
+
+    assert list(detector.ips["203.0.113.5"].failed_users) == [f"id-user-{index}" for index in range(496, 500)]
+
+
+def test_impossible_travel_between_successful_logins():
+    detector = AuthAnomalyDetector()
+    logs = [
+        login(0, success=True, location="New York, US"),
+        login(3600, success=True, location="Tokyo, JP"),
+        # Two days later the same trip is plausible
+        login(3600 + 2 * 86400, success=True, location="New York, US"),
+    ]
+
+    alerts = list(detector.run(logs))
+
+    assert [alert["alert_type"] for alert in alerts] == ["impossible_travel"]
+    assert alerts[0]["from_location"] == "New York, US"
+    assert alerts[0]["to_location"] == "Tokyo, JP"
+
+
+def test_alerts_repeat_only_after_the_cooldown():
+    detector = AuthAnomalyDetector()
+    logs = [login(seconds) for seconds in range(0, 600, 10)]
+
+    alerts = list(detector.run(logs))
+
+    assert [alert["timestamp"] for alert in alerts] == [login(40)["timestamp"], login(340)["timestamp"]]
+
+
+def test_least_recently_seen_users_are_evicted():
+    detector = AuthAnomalyDetector(DetectorConfig(max_tracked_keys=3))
+
+    for index, username in enumerate(["a", "b", "c", "a", "d"]):
+        detector.process(login(index, username=username, success=True))
+
+    assert list(detector.users) == ["id-c", "id-a", "id-d"]
+    assert detector.users.evicted == 1
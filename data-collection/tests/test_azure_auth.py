@@ -0,0 +1,51 @@
+"""Tests for azure_auth token caching"""
+
+import time
+
+import pytest
+from azure.core.credentials import AccessToken
+
+from azure_auth import USER_DELEGATED_MODES, CachedCredential, get_credential
+
+SCOPE = "https://management.azure.com/.default"
+
+
+class FakeCredential:
+    """Issues a new token naming its principal on every call"""
+
+    def __init__(self, principal: str):
+        self.principal = principal
+        self.calls = 0
+
+    def get_token(self, *scopes, **kwargs):
+        self.calls += 1
+        return AccessToken(f"{self.principal}-{self.calls}", int(time.time()) + 3600)
+
+
+@pytest.mark.parametrize("mode", USER_DELEGATED_MODES + ("auto",))
+def test_user_delegated_and_prebuilt_auto_credentials_do_not_share_the_file_cache(tmp_path, mode):
+    path = str(tmp_path / "tokens.json")
+    alice, bob = FakeCredential("alice"), FakeCredential("bob")
+
+    alice_token = get_credential(mode, "tenant", path, alice).get_token(SCOPE)
+    bob_token = get_credential(mode, "tenant", path, bob).get_token(SCOPE)
+
+    assert alice_token.token == "alice-1"
+    assert bob_token.token == "bob-1"
+    assert not (tmp_path / "tokens.json").exists()
+
+
+def test_application_identities_reuse_cached_tokens(tmp_path, monkeypatch):
+    path = str(tmp_path / "tokens.json")
+    monkeypatch.setenv("AZURE_CLIENT_ID", "app-1")
+    first, second = FakeCredential("app-1"), FakeCredential("app-1-again")
+
+    get_credential("secret", "tenant", path, first).get_token(SCOPE)
+    cached = get_credential("secret", "tenant", path, second)
+
+    assert isinstance(cached, CachedCredential)
+    assert cached.get_token(SCOPE).token == "app-1-1"
+    assert second.calls == 0
+
+    monkeypatch.setenv("AZURE_CLIENT_ID", "app-2")
+    assert get_credential("secret", "tenant", path, second).get_token(SCOPE).token == "app-1-again-1"
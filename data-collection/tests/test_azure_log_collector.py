@@ -0,0 +1,119 @@
+"""Tests for azure_log_collector against a fake activity log API"""
+
+from datetime import datetime, timedelta, timezone
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from azure_log_collector import AzureLogCollector, parse_args, save, split_time_range
+from columnar_output import read_table
+from log_sources import TokenBucket
+from synthetic_data_generator import (generate_authentication_log, generate_network_logs,
+                                      generate_security_events)
+
+START = datetime(2025, 1, 1, 0, 0, 0, 500000, tzinfo=timezone.utc)
+
+
+def event(index: int, timestamp: datetime):
+    text = lambda value: SimpleNamespace(value=value)  # noqa: E731
+    return SimpleNamespace(
+        event_timestamp=timestamp, level=text("Informational"),
+        operation_name=text("Microsoft.Compute/virtualMachines/write"), resource_group_name="rg-lab",
+        resource_id="/subscriptions/s/resourceGroups/rg-lab/vm-1", status=text("Succeeded"),
+        caller="alice@example.com", category=text("Administrative"), claims=None,
+        event_data_id=f"event-{index}", correlation_id=f"correlation-{index}",
+    )
+
+
+class FakeActivityLogs:
+    """Serves events matching a filter, inclusive at both ends with second precision, in pages"""
+
+    def __init__(self, timestamps, page_size: int = 2):
+        self.events = [event(index, timestamp) for index, timestamp in enumerate(timestamps)]
+        self.page_size = page_size
+        self.pages = 0
+
+    def list(self, filter: str, select: str = None):
+        low, high = (datetime.strptime(part.split("'")[1], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+                     for part in filter.split(" and "))
+        matching = [log for log in self.events if low <= log.event_timestamp <= high]
+
+        def by_page():
+            for offset in range(0, len(matching), self.page_size):
+                self.pages += 1
+                yield matching[offset:offset + self.page_size]
+
+        return SimpleNamespace(by_page=by_page)
+
+
+def collector(timestamps, **kwargs):
+    activity_logs = FakeActivityLogs(timestamps, **kwargs)
+    client = SimpleNamespace(activity_logs=activity_logs)
+    return AzureLogCollector("subscription", "tenant", monitor_client=client), activity_logs
+
+
+def test_windows_are_aligned_to_whole_seconds():
+    windows = split_time_range(START, START + timedelta(hours=12), timedelta(hours=6))
+
+    assert [edge.microsecond for window in windows for edge in window] == [0] * 4
+    assert windows[0][1] == windows[1][0] == datetime(2025, 1, 1, 6, tzinfo=timezone.utc)
+
+
+def test_event_on_a_window_edge_is_collected_once():
+    edge = datetime(2025, 1, 1, 6, tzinfo=timezone.utc)
+    timestamps = [edge - timedelta(seconds=1), edge, edge + timedelta(seconds=1)]
+    azure, _ = collector(timestamps)
+
+    logs = azure.collect_activity_logs_between(START, START + timedelta(hours=12), window_hours=6)
+
+    assert [log["event_id"] for log in logs] == ["event-0", "event-1", "event-2"]
+
+
+def test_rate_limiter_is_taken_per_page():
+    timestamps = [START + timedelta(minutes=minute) for minute in range(9)]
+    azure, activity_logs = collector(timestamps)
+    azure.rate_limiter = TokenBucket(1.0, 100, clock=lambda: 0.0)
+
+    logs = azure.collect_activity_logs_between(START, START + timedelta(hours=1), window_hours=6)
+
+    assert len(logs) == 9
+    # Five pages plus the advance that finds no further page
+    assert activity_logs.pages == 5
+    assert azure.rate_limiter.tokens == 94
+
+
+def test_rate_limit_is_parsed_without_other_sources():
+    assert parse_args(["--rate-limit", "activity=0.5"]).rate_limit == {"activity": 0.5}
+
+
+@pytest.mark.parametrize("item", ["activity", "activity=fast", "storage=2"])
+def test_malformed_rate_limit_is_a_usage_error(item, capsys):
+    with pytest.raises(SystemExit) as error:
+        parse_args(["collect", "--rate-limit", item])
+
+    assert error.value.code == 2
+    assert "--rate-limit" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("generate", [generate_authentication_log, generate_security_events,
+                                      generate_network_logs])
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_save_writes_columnar_files_in_the_inputs_schema(tmp_path, generate, format):
+    logs = generate(50)
+    source, output = tmp_path / "logs.json", tmp_path / f"logs.{format}"
+    source.write_text(json.dumps(logs, default=str))
+
+    save(parse_args(["save", str(source), str(output)]))
+
+    assert read_table(str(output)).num_rows == 50
+
+
+@pytest.mark.parametrize("option", [["--stream"], ["--compression", "gzip"], ["--columnar", "parquet"],
+                                    ["--rotate-mb", "10"], ["--rotate-minutes", "5"]])
+def test_incremental_rejects_stream_options(option, capsys):
+    with pytest.raises(SystemExit) as error:
+        parse_args(["collect", "--incremental"] + option)
+
+    assert error.value.code == 2
+    assert option[0] in capsys.readouterr().err
@@ -0,0 +1,20 @@
+"""Tests for batch_generator against the per-record generator"""
+
+import random
+
+import pytest
+
+from batch_generator import iter_authentication_records
+from synthetic_data_generator import iter_authentication_log
+
+
+def failure_rate(logs) -> float:
+    logs = list(logs)
+    return sum(not log["success"] for log in logs) / len(logs)
+
+
+def test_authentication_failure_rates_match():
+    batch = failure_rate(iter_authentication_records(20000, seed=1))
+    per_record = failure_rate(iter_authentication_log(20000, 30, rng=random.Random(1)))
+
+    assert batch == pytest.approx(per_record, abs=0.02)
@@ -0,0 +1,45 @@
+"""Tests for blob_upload.upload_blocks against an in-memory blob client"""
+
+import threading
+
+from blob_upload import make_block_id, upload_blocks
+
+
+class FakeBlobClient:
+    """Keeps staged blocks and the committed block list, like a BlockBlob"""
+
+    def __init__(self):
+        self.staged = {}
+        self.committed = None
+        self._lock = threading.Lock()
+
+    def stage_block(self, block_id, data):
+        with self._lock:
+            self.staged[block_id] = data
+
+    def commit_block_list(self, block_list):
+        self.committed = list(block_list)
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.staged[block_id] for block_id in self.committed)
+
+
+def test_upload_blocks_commits_plain_block_ids_in_order():
+    client = FakeBlobClient()
+    data = bytes(range(256)) * 100
+
+    size = upload_blocks(client, data, block_size=1000, max_concurrency=3)
+
+    assert size == len(data)
+    assert client.committed == [make_block_id(index) for index in range(26)]
+    assert client.content == data
+
+
+def test_upload_blocks_rechunks_iterables_of_str_and_bytes():
+    client = FakeBlobClient()
+    chunks = ["abc" * 10, b"xyz" * 7, "", b"!"]
+
+    upload_blocks(client, chunks, block_size=8)
+
+    assert client.content == ("abc" * 10).encode() + b"xyz" * 7 + b"!"
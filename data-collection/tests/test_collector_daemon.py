@@ -0,0 +1,246 @@
+"""End-to-end tests for collector_daemon.CollectorDaemon with in-memory sources and sinks"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from collector_daemon import BlobSink, CollectorDaemon, DaemonSink, PolledSource
+from log_sources import DefenderAlertSource, LogSource, TokenBucket
+from metrics import REGISTRY as metrics
+from synthetic_data_generator import iter_security_events
+from validation import Deduplicator, ValidationStage
+
+
+def security_events(count: int, days: int):
+    """Events spread over the last days, ending before the daemon's overlap window"""
+    end_time = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=1)
+    return list(iter_security_events(count, days, end_time, random.Random(1)))
+
+
+class FakeSource(LogSource):
+    """Returns every entry on every poll, like the Defender alerts API"""
+
+    name = "defender"
+    output_name = "defender_alerts"
+
+    def __init__(self, entries, failing_polls: int = 0):
+        super().__init__()
+        self.entries = entries
+        self.failing_polls = failing_polls
+        self.calls = []
+
+    def collect_since(self, since):
+        self.calls.append(since)
+        if len(self.calls) <= self.failing_polls:
+            raise ConnectionError("service unavailable")
+        for entry in self.entries:
+            yield dict(entry)
+
+
+class MemorySink(DaemonSink):
+    """Keeps written entries in memory; the first failing_writes writes raise"""
+
+    name = "memory"
+
+    def __init__(self, delay: float = 0.0, failing_writes: int = 0):
+        self.delay = delay
+        self.failing_writes = failing_writes
+        self.entries = []
+        self.flushes = 0
+        self.closed = False
+        self.threads = set()
+
+    def write(self, batch):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        if self.failing_writes:
+            self.failing_writes -= 1
+            raise OSError("disk full")
+        self.entries.extend(batch.entries)
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed = True
+
+    def ids(self):
+        return [entry["event_id"] for entry in self.entries]
+
+
+def polled(source, horizon_hours: float = 24):
+    return PolledSource(source, 0, ValidationStage("security", Deduplicator(horizon_hours)))
+
+
+def test_entries_of_a_failed_write_are_written_by_the_next_poll():
+    events = security_events(500, 1)
+    source = FakeSource(events)
+    sink = MemorySink(failing_writes=1)
+    daemon = CollectorDaemon([polled(source, 48)], [sink], batch_size=100, max_polls=3)
+
+    asyncio.run(daemon.run())
+
+    assert set(sink.ids()) == {event["event_id"] for event in events}
+    assert daemon.sources[0].since is not None
+
+
+class FakeBlobCollector:
+    """Stands in for AzureLogCollector.upload_to_blob_storage; the first upload fails"""
+
+    def __init__(self, failing_uploads: int = 1):
+        self.failing_uploads = failing_uploads
+        self.blobs = {}
+
+    def upload_to_blob_storage(self, container, blob_name, chunks):
+        if self.failing_uploads:
+            self.failing_uploads -= 1
+            return False
+        self.blobs[blob_name] = b"".join(chunks)
+        return True
+
+    def ids(self):
+        return [json.loads(line)["event_id"]
+                for data in self.blobs.values() for line in data.splitlines()]
+
+
+def test_failed_blob_upload_is_not_uploaded_twice():
+    events = security_events(50, 1)
+    collector = FakeBlobCollector()
+    daemon = CollectorDaemon([polled(FakeSource(events), 48)], [BlobSink(collector)], batch_size=10,
+                             max_polls=2)
+
+    asyncio.run(daemon.run())
+
+    assert sorted(collector.ids()) == sorted(event["event_id"] for event in events)
+    assert daemon.sources[0].since is not None
+
+
+def test_sources_without_a_time_filter_write_each_entry_once():
+    # Ten days of events: most dedup buckets are evicted between polls
+    events = security_events(500, 10)
+    source = FakeSource(events)
+    sink = MemorySink()
+    daemon = CollectorDaemon([polled(source)], [sink], batch_size=100, max_polls=3)
+
+    asyncio.run(daemon.run())
+
+    assert sorted(sink.ids()) == sorted(event["event_id"] for event in events)
+    assert daemon.sources[0].stale == 1000
+
+
+def test_failed_first_poll_keeps_the_lookback(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    source = FakeSource(security_events(200, 2), failing_polls=1)
+    sink = MemorySink()
+    daemon = CollectorDaemon([polled(source)], [sink], state_file=state_file, max_polls=2)
+
+    asyncio.run(daemon.run())
+
+    assert source.calls == [None, None]
+    assert len(sink.entries) == 200
+    with open(state_file) as f:
+        assert "defender" in json.load(f)
+
+
+def test_restart_resumes_from_the_checkpoint(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    events = security_events(100, 1)
+    first = CollectorDaemon([polled(FakeSource(events))], [MemorySink()], state_file=state_file,
+                            max_polls=1)
+    asyncio.run(first.run())
+    checkpoint = first.sources[0].since
+
+    source = FakeSource(events)
+    sink = MemorySink()
+    second = CollectorDaemon([polled(source)], [sink], state_file=state_file, max_polls=1,
+                             overlap_minutes=10)
+    asyncio.run(second.run())
+
+    assert source.calls == [checkpoint - timedelta(minutes=10)]
+    assert sink.entries == []
+
+
+def test_slow_sink_blocks_the_poll():
+    events = security_events(1000, 1)
+    slow, fast = MemorySink(delay=0.01), MemorySink()
+    daemon = CollectorDaemon([polled(FakeSource(events))], [slow, fast], batch_size=50,
+                             queue_size=1, sink_queue_size=1, max_polls=1)
+    before = metrics.get("backpressure_seconds_total", source="defender")
+
+    asyncio.run(daemon.run())
+
+    assert metrics.get("backpressure_seconds_total", source="defender") - before > 0.05
+    assert slow.ids() == fast.ids() == [event["event_id"] for event in events]
+    assert len(slow.threads) == 1
+    assert slow.closed and fast.closed
+
+
+def test_stop_drains_queued_batches_without_a_checkpoint(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    sink = MemorySink(delay=0.01)
+    source = polled(FakeSource(security_events(5000, 1)))
+    daemon = CollectorDaemon([source], [sink], batch_size=50, queue_size=2, sink_queue_size=1,
+                             state_file=state_file)
+
+    async def run_and_stop():
+        task = asyncio.ensure_future(daemon.run())
+        await asyncio.sleep(0.2)
+        daemon.stop()
+        await asyncio.wait_for(task, 10)
+
+    asyncio.run(run_and_stop())
+
+    assert 0 < len(sink.entries) < 5000
+    assert len(sink.entries) == source.queued
+    assert sink.closed
+    assert source.since is None
+    with open(state_file) as f:
+        assert json.load(f) == {}
+
+
+def alert(name: str, generated: datetime):
+    return SimpleNamespace(
+        system_alert_id=name, name=name, time_generated_utc=generated, start_time_utc=None,
+        severity="High", status="Active", resource_identifiers=[], entities=[],
+        compromised_entity="vm-1", intent="Exploitation", alert_type="VM_SuspiciousLogin",
+        alert_display_name="Suspicious login", product_name="Defender for Cloud", is_incident=False,
+    )
+
+
+class FakeAlerts:
+    """Alerts API pager serving page_size alerts per page"""
+
+    def __init__(self, alerts, page_size: int = 3):
+        self.alerts = alerts
+        self.page_size = page_size
+
+    def list(self):
+        return SimpleNamespace(by_page=lambda: (self.alerts[offset:offset + self.page_size]
+                                                for offset in range(0, len(self.alerts), self.page_size)))
+
+
+def test_defender_source_filters_alerts_by_time():
+    now = datetime.now(timezone.utc)
+    alerts = [alert(f"alert-{days}", now - timedelta(days=days)) for days in range(10)]
+    client = SimpleNamespace(alerts=FakeAlerts(alerts))
+    source = DefenderAlertSource(client)
+
+    recent = [event["event_id"] for event in source.collect_since(now - timedelta(days=3, hours=1))]
+
+    assert recent == ["alert-0", "alert-1", "alert-2", "alert-3"]
+    assert len(list(source.collect())) == 10
+
+
+def test_defender_source_takes_a_token_per_page():
+    now = datetime.now(timezone.utc)
+    alerts = [alert(f"alert-{index}", now) for index in range(10)]
+    source = DefenderAlertSource(SimpleNamespace(alerts=FakeAlerts(alerts)))
+    source.limiter = TokenBucket(1.0, 100, clock=lambda: 0.0)
+
+    assert len(list(source.collect())) == 10
+    # Four pages plus the advance that finds no further page
+    assert source.limiter.tokens == 95
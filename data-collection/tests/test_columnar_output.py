@@ -0,0 +1,48 @@
+"""Tests for columnar_output.ColumnarWriter across several record batches"""
+
+import pyarrow.ipc as ipc
+import pytest
+
+from columnar_output import ColumnarWriter, read_table
+from log_sinks import LogSink
+from synthetic_data_generator import generate_authentication_log, generate_network_logs
+
+
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_writer_round_trips_multiple_batches(tmp_path, format):
+    logs = generate_network_logs(250)
+    path = str(tmp_path / f"network_logs.{format}")
+
+    with ColumnarWriter(path, "network", format, batch_size=60) as writer:
+        writer.write_all(logs)
+
+    table = read_table(path)
+    assert writer.count == 250
+    assert table.num_rows == 250
+    assert table.column("source_ip").to_pylist() == [log["source_ip"] for log in logs]
+    assert table.column("action").to_pylist() == [log["action"] for log in logs]
+
+
+def test_arrow_dictionaries_grow_by_deltas(tmp_path):
+    # The first batch sees only some users, later batches add new ones
+    logs = sorted(generate_authentication_log(300), key=lambda log: log["username"])
+    path = str(tmp_path / "authentication_logs.arrow")
+
+    with ColumnarWriter(path, "authentication", "arrow", batch_size=50) as writer:
+        writer.write_all(logs)
+
+    reader = ipc.open_file(str(path))
+    assert reader.num_record_batches == 6
+    usernames = reader.read_all().column("username").to_pylist()
+    assert usernames == [log["username"] for log in logs]
+
+
+def test_log_sink_arrow_output_spans_batches(tmp_path):
+    logs = generate_network_logs(130)
+
+    with LogSink(str(tmp_path / "network_logs"), ("ndjson", "arrow"), dataset="network") as sink:
+        sink._columnar[0].batch_size = 40
+        sink.write_all(logs)
+
+    table = read_table(str(tmp_path / "network_logs.arrow"))
+    assert table.column("log_id").to_pylist() == [log["log_id"] for log in logs]
@@ -0,0 +1,96 @@
+"""Tests for compact_network.CompactNetworkLogs round trips and subnet aggregation"""
+
+import ipaddress
+import random
+from collections import Counter
+from itertools import islice
+
+import pytest
+
+from batch_generator import iter_network_records
+from compact_network import CompactNetworkLogs
+from log_sources import flow_tuple_to_log
+from synthetic_data_generator import iter_network_logs
+
+FLOW_TUPLES = [
+    "1704067200,10.0.0.4,13.107.4.50,44931,443,T,O,A,B,,,,",
+    "1704067260,10.0.0.4,13.107.4.50,44931,443,T,O,A,E,12,3400,10,52000",
+    "1704067261,203.0.113.9,10.0.0.4,50123,22,T,I,D,B,,,,",
+    "1704067262,10.0.0.5,8.8.8.8,53000,53,U,O,A,C,1,80,1,120",
+]
+
+
+@pytest.mark.parametrize("records", [
+    lambda: list(iter_network_logs(3000, rng=random.Random(4))),
+    lambda: list(islice(iter_network_records(3000, seed=4), 3000)),
+    lambda: [flow_tuple_to_log(flow, "/subscriptions/s/nsg-1", "DefaultRule") for flow in FLOW_TUPLES],
+], ids=["iter_network_logs", "batch_generator", "flow_tuple_to_log"])
+def test_records_round_trip(records):
+    recs = records()
+
+    logs = CompactNetworkLogs.from_records(recs)
+
+    assert list(logs) == recs
+    assert logs[-1] == recs[-1]
+
+
+def test_flow_logs_keep_a_missing_session_duration():
+    recs = [flow_tuple_to_log(flow) for flow in FLOW_TUPLES]
+
+    assert [log["session_duration"] for log in CompactNetworkLogs.from_records(recs)] == [None] * 4
+
+
+def record(**changes):
+    recs = list(iter_network_logs(2, rng=random.Random(1)))
+    return [recs[0], dict(recs[1], **changes)]
+
+
+@pytest.mark.parametrize("changes", [
+    {"source_ip": "2001:db8::1"},
+    {"destination_ip": "10.0.0.01"},
+    {"log_id": "not-a-uuid"},
+    {"log_id": "0F8FAD5B-D9CB-469F-A165-70867728950E"},
+    {"log_id": "0f8fad5bd9cb469fa16570867728950e0000"},
+    {"flags": ["PORT_SCAN", "SYN_FLOOD"]},
+    {"timestamp": "2025-01-01T00:00:00+00:00"},
+    {"source_port": 70000},
+])
+def test_values_that_would_not_round_trip_are_rejected(changes):
+    with pytest.raises(ValueError):
+        CompactNetworkLogs.from_records(record(**changes))
+
+
+def test_mixed_whole_second_timestamp_styles_are_rejected():
+    first, second = record()
+    logs = CompactNetworkLogs.from_records([dict(first, timestamp="2025-01-01T00:00:05")])
+
+    with pytest.raises(ValueError):
+        logs.append(dict(second, timestamp="2025-01-01T00:00:06.000000"))
+
+
+def subnet(address: str, prefix: int) -> str:
+    return str(ipaddress.IPv4Network(f"{address}/{prefix}", strict=False))
+
+
+@pytest.mark.parametrize("prefix", [32, 24, 16, 0])
+@pytest.mark.parametrize("by", ["count", "bytes", "packets"])
+def test_aggregate_matches_a_plain_python_reference(prefix, by):
+    recs = list(iter_network_logs(3000, rng=random.Random(6)))
+    logs = CompactNetworkLogs.from_records(recs)
+    expected = Counter()
+    for log in recs:
+        weight = {"count": 1, "bytes": log["bytes_sent"] + log["bytes_received"],
+                  "packets": log["packets"]}[by]
+        expected[subnet(log["source_ip"], prefix)] += weight
+
+    totals = logs.aggregate("source_ip", prefix, by)
+
+    assert dict(totals) == dict(expected)
+    assert [total for _, total in totals] == sorted(expected.values(), reverse=True)
+
+
+def test_deny_counts_match_a_plain_python_reference():
+    recs = list(iter_network_logs(3000, rng=random.Random(7)))
+    expected = Counter(subnet(log["destination_ip"], 16) for log in recs if log["action"] == "deny")
+
+    assert dict(CompactNetworkLogs.from_records(recs).deny_counts(16, "destination_ip")) == dict(expected)
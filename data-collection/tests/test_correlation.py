@@ -0,0 +1,44 @@
+"""Tests for correlation over the generator's consistent identities"""
+
+import random
+from collections import Counter
+from itertools import islice
+
+from batch_generator import iter_network_records
+from correlation import correlate, generated_streams
+from synthetic_data_generator import HOME_IPS, USERNAMES, iter_security_events
+
+
+def test_users_have_distinct_home_ips():
+    assert len(set(HOME_IPS.values())) == len(USERNAMES)
+
+
+def test_related_flows_pick_out_the_users_own_traffic():
+    authentication, security, network = generated_streams(10000, days=1, seed=3)
+
+    logins = list(correlate(authentication, security, network))
+    with_flows = [login for login in logins if login["related_network_count"]]
+
+    assert 0.2 < len(with_flows) / len(logins) < 0.9
+    home_logins = [login for login in with_flows if login["source_ip"] == HOME_IPS[login["username"]]]
+    assert home_logins
+    for login in home_logins:
+        assert {flow["source_ip"] for flow in login["related_network_flows"]} == {login["source_ip"]}
+
+
+def test_batch_flows_come_from_home_and_server_addresses():
+    sources = Counter(log["source_ip"] for log in islice(iter_network_records(5000, seed=1), 5000))
+
+    home = sum(count for ip, count in sources.items() if ip in HOME_IPS.values())
+    assert 0.05 < home / 5000 < 0.15
+    assert all(ip.startswith(("10.1.0.", "10.2.0.")) for ip in sources)
+
+
+def test_security_events_keep_one_generated_id_for_unmapped_users():
+    known = {USERNAMES[0]: "user-known"}
+    events = list(iter_security_events(500, days_ago=1, rng=random.Random(2), user_ids=known))
+
+    ids = {event["user_id"] for event in events}
+    assert "user-known" in ids
+    assert len(ids) == len(USERNAMES)
+    assert known == {USERNAMES[0]: "user-known"}
@@ -0,0 +1,76 @@
+"""Tests for log_sources.parse_flow_log against the recorded NSG flow log"""
+
+import io
+import json
+import os
+
+import pytest
+
+from log_sources import DEFAULT_READ_SIZE, _ChunkReader, flow_tuple_to_log, parse_flow_log
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "fixtures", "nsg_flow_log_v2.json")
+
+
+def expected_logs():
+    """Entries decoded from the fixture loaded whole with json.load"""
+    with open(FIXTURE, encoding="utf-8") as stream:
+        records = json.load(stream)["records"]
+    return [
+        flow_tuple_to_log(flow_tuple, record["resourceId"], rule_flows["rule"])
+        for record in records
+        for rule_flows in record["properties"]["flows"]
+        for mac_flows in rule_flows["flows"]
+        for flow_tuple in mac_flows["flowTuples"]
+    ]
+
+
+def test_fixture_decodes_version_2_tuples():
+    with open(FIXTURE, encoding="utf-8") as stream:
+        logs = list(parse_flow_log(stream))
+
+    assert logs == expected_logs()
+    assert logs[0]["source_ip"] == "94.102.49.190"
+    assert logs[0]["protocol"] == "UDP"
+    assert logs[0]["action"] == "deny"
+    ended = next(log for log in logs if log["bytes_received"])
+    assert ended["bytes_sent"] == 2540
+    assert ended["bytes_received"] == 7868
+    assert ended["packets"] == 22
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64, 500])
+def test_records_spanning_chunks(read_size):
+    with open(FIXTURE, encoding="utf-8") as stream:
+        logs = list(parse_flow_log(stream, read_size=read_size))
+
+    assert logs == expected_logs()
+
+
+@pytest.mark.parametrize("read_size", [1, 64, DEFAULT_READ_SIZE])
+def test_binary_streams(read_size):
+    with open(FIXTURE, "rb") as stream:
+        logs = list(parse_flow_log(stream, read_size=read_size))
+
+    assert logs == expected_logs()
+
+
+def test_multibyte_characters_split_across_chunks():
+    blob = json.dumps({"records": [{"resourceId": "/NSG/ZÜRICH-ÄKS", "properties": {"flows": [
+        {"rule": "UserRule_Ünicode", "flows": [{"flowTuples": ["1705312845,203.0.113.45,10.240.0.4,61023,443,T,I,A,B,,,,"]}]}
+    ]}}]}, ensure_ascii=False).encode("utf-8")
+
+    logs = list(parse_flow_log(io.BytesIO(blob), read_size=1))
+
+    assert logs == [flow_tuple_to_log("1705312845,203.0.113.45,10.240.0.4,61023,443,T,I,A,B,,,,",
+                                      "/NSG/ZÜRICH-ÄKS", "UserRule_Ünicode")]
+
+
+def test_blob_download_chunks():
+    with open(FIXTURE, "rb") as stream:
+        data = stream.read()
+    chunks = [data[offset:offset + 100] for offset in range(0, len(data), 100)]
+
+    stream = io.TextIOWrapper(_ChunkReader(chunks), encoding="utf-8")
+
+    assert list(parse_flow_log(stream, read_size=33)) == expected_logs()
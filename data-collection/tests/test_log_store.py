@@ -0,0 +1,36 @@
+"""Tests for log_store.LogStore ingest"""
+
+import pytest
+
+from log_store import LogStore, normalize_time
+
+
+def activity_entry(event_id: str, timestamp):
+    return {"timestamp": timestamp, "operation": "Microsoft.Compute/virtualMachines/write",
+            "status": "Succeeded", "caller": "alice@example.com", "event_id": event_id}
+
+
+def test_normalize_time_converts_aware_times_to_utc():
+    assert normalize_time("2025-01-01T02:00:00+02:00") == "2025-01-01T00:00:00.000000"
+    assert normalize_time("2025-01-01T00:00:00Z") == "2025-01-01T00:00:00.000000"
+
+
+@pytest.mark.parametrize("value", [None, "yesterday"])
+def test_normalize_time_rejects_missing_and_bad_values(value):
+    with pytest.raises(ValueError):
+        normalize_time(value)
+
+
+def test_ingest_skips_entries_without_a_timestamp(tmp_path):
+    entries = [
+        activity_entry("a", "2025-01-01T00:00:00+00:00"),
+        activity_entry("b", None),
+        activity_entry("c", "2025-01-01T00:05:00+00:00"),
+        activity_entry("d", "not a time"),
+    ]
+
+    with LogStore(str(tmp_path / "logs.db")) as store:
+        inserted = store.ingest(entries, "activity")
+        assert inserted == 2
+        assert store.skipped == 2
+        assert store.count(dataset="activity") == 2
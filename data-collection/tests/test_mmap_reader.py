@@ -0,0 +1,122 @@
+"""Tests for mmap_reader.LogFile indexing, time-range reads and parallel_map"""
+
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import mmap_reader
+from mmap_reader import FieldCounter, LogFile, _array_spans, parallel_map
+
+START = datetime(2025, 1, 1)
+
+# Strings that would confuse a scan counting brackets or quotes naively
+TRICKY = ['"]}[', '\\"]', "\\\\", '\\\\"}{', "[{", "plain"]
+
+
+def records(count: int = 40):
+    return [{"timestamp": (START + timedelta(minutes=index)).isoformat(), "index": index,
+             "note": TRICKY[index % len(TRICKY)], "nested": {"list": [index, {"deep": "]"}]},
+             "action": "deny" if index % 3 == 0 else "allow"}
+            for index in range(count)]
+
+
+def write(path, recs, style: str):
+    if style == "ndjson":
+        text = "".join(json.dumps(record) + "\n" for record in recs) + "\n"
+    elif style == "pretty":
+        text = json.dumps(recs, indent=2)
+    else:
+        text = json.dumps(recs)
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("style", ["ndjson", "pretty", "compact"])
+def test_records_are_indexed_with_a_small_scan_chunk(tmp_path, monkeypatch, style):
+    monkeypatch.setattr(mmap_reader, "SCAN_CHUNK_SIZE", 7)
+    recs = records()
+    path = write(tmp_path / f"logs.{style}", recs, style)
+
+    with LogFile(path) as logs:
+        assert logs.format == ("ndjson" if style == "ndjson" else "json")
+        assert list(logs) == recs
+        assert logs[-1] == recs[-1]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 64, 4096])
+def test_array_spans_skip_brackets_inside_strings(chunk_size):
+    recs = records(12)
+    data = json.dumps(recs, indent=1).encode()
+
+    starts, lengths = _array_spans(np.frombuffer(data, dtype=np.uint8), chunk_size)
+
+    assert [json.loads(data[start:start + length]) for start, length in zip(starts, lengths)] == recs
+
+
+def test_truncated_array_is_rejected(tmp_path):
+    path = write(tmp_path / "logs.json", records(5), "compact")
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    with pytest.raises(ValueError):
+        LogFile(path)
+
+
+def test_index_is_reused_until_the_file_changes(tmp_path):
+    path = write(tmp_path / "logs.ndjson", records(10), "ndjson")
+    with LogFile(path) as logs:
+        assert logs.index_built
+    with LogFile(path) as logs:
+        assert not logs.index_built
+
+    recs = records(20)[10:]
+    write(tmp_path / "logs.ndjson", recs, "ndjson")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with LogFile(path) as logs:
+        assert logs.index_built
+        assert list(logs) == recs
+
+
+def test_same_size_rewrite_is_detected_by_mtime(tmp_path):
+    recs = records(10)
+    path = write(tmp_path / "logs.ndjson", recs, "ndjson")
+    LogFile(path).close()
+    stat = os.stat(path)
+
+    # Lines of different lengths in another order: same size, other offsets
+    write(tmp_path / "logs.ndjson", recs[::-1], "ndjson")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert os.path.getsize(path) == stat.st_size
+    with LogFile(path) as logs:
+        assert logs.index_built
+        assert list(logs) == recs[::-1]
+
+
+@pytest.mark.parametrize("first, last", [(0, 40), (5, 6), (9, 21), (39, 40), (12, 12)])
+def test_iter_range_is_inclusive_at_the_start_and_exclusive_at_the_end(tmp_path, first, last):
+    recs = records()
+    path = write(tmp_path / "logs.json", recs, "compact")
+    start = (START + timedelta(minutes=first)).isoformat()
+    end = (START + timedelta(minutes=last)).isoformat()
+
+    with LogFile(path, block_size=4) as logs:
+        assert [record["index"] for record in logs.iter_range(start, end)] == list(range(first, last))
+        assert len(list(logs.iter_range(end=end))) == last
+        assert len(list(logs.iter_range(start=start))) == 40 - first
+
+
+def test_parallel_map_counts_every_record_once(tmp_path):
+    recs = records(101)
+    path = write(tmp_path / "logs.ndjson", recs, "ndjson")
+
+    partials = parallel_map(path, FieldCounter("action"), workers=2, chunks=7)
+
+    assert len(partials) == 7
+    assert sum(partials, Counter()) == Counter(record["action"] for record in recs)
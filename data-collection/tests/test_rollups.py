@@ -0,0 +1,39 @@
+"""Tests for rollups.Histogram and rollups.Rollup"""
+
+from rollups import Histogram, Rollup
+
+
+def test_percentiles_of_integer_scores_are_exact():
+    histogram = Histogram(1.0)
+    for score in range(1, 20):
+        histogram.add(score)
+
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(100) == 19
+
+
+def test_percentiles_survive_merge():
+    left, right = Histogram(1.0), Histogram(1.0)
+    for score in (10, 10, 30):
+        left.add(score)
+    for score in (20, 40):
+        right.add(score)
+
+    left.merge(right)
+
+    assert left.percentile(50) == 20
+    assert left.percentile(90) == 40
+
+
+def test_records_without_a_timestamp_are_counted_as_invalid():
+    entries = [
+        {"timestamp": "2025-01-01T10:15:00+00:00", "operation": "write", "status": "Succeeded"},
+        {"timestamp": None, "operation": "write", "status": "Failed"},
+    ]
+
+    rollup = Rollup().add_all(entries, "activity")
+
+    assert rollup.records["activity"] == 1
+    assert rollup.invalid["activity"] == 1
+    assert rollup.buckets("activity") == {"2025-01-01T10": 1}
+    assert Rollup.from_dict(rollup.to_dict()).invalid["activity"] == 1
@@ -0,0 +1,65 @@
+"""Tests for traffic_model campaign budgeting"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from traffic_model import TrafficProfile, iter_arrivals, random_campaigns
+
+START = datetime(2025, 3, 3)  # a Monday
+END = START + timedelta(hours=24)
+
+
+def budgeted_profile(eps: float, campaigns: int, attack_fraction: float, seed: int = 1) -> TrafficProfile:
+    rng = random.Random(seed)
+    profile = TrafficProfile.for_target_eps(eps)
+    profile.campaigns = random_campaigns("network", START, END, campaigns, ["203.0.113.45"], rng=rng)
+    profile.budget_campaigns(START, END, attack_fraction)
+    return profile
+
+
+@pytest.mark.parametrize("campaigns", [1, 3, 10])
+def test_campaigns_do_not_change_the_expected_total(campaigns):
+    target = TrafficProfile.for_target_eps(0.5).expected_events(START, END)
+
+    profile = budgeted_profile(0.5, campaigns, 0.05)
+
+    assert profile.expected_events(START, END) == pytest.approx(target)
+    assert profile.campaign_events(START, END) == pytest.approx(0.05 * target)
+
+
+def test_generated_arrivals_hold_the_requested_rate():
+    profile = budgeted_profile(0.5, 3, 0.05)
+    target = profile.expected_events(START, END)
+
+    arrivals = list(iter_arrivals(profile, START, END, random.Random(7)))
+    attacks = sum(arrival.campaign is not None for arrival in arrivals)
+
+    assert len(arrivals) == pytest.approx(target, rel=0.05)
+    assert attacks / len(arrivals) == pytest.approx(0.05, abs=0.02)
+
+
+def test_zero_attack_fraction_drops_the_campaigns():
+    profile = budgeted_profile(0.05, 3, 0.0)
+
+    arrivals = list(iter_arrivals(profile, START, END, random.Random(7)))
+
+    assert profile.campaigns == []
+    assert all(arrival.campaign is None for arrival in arrivals)
+    assert len(arrivals) == pytest.approx(profile.expected_events(START, END), rel=0.1)
+
+
+def test_campaigns_at_zero_rate_produce_no_arrivals():
+    profile = TrafficProfile(base_rate_per_second=0.0)
+    profile.campaigns = random_campaigns("network", START, END, 2, ["203.0.113.45"], rng=random.Random(1))
+    for campaign in profile.campaigns:
+        campaign.rate_per_second = 0.0
+
+    assert list(iter_arrivals(profile, START, END, random.Random(7))) == []
+
+
+@pytest.mark.parametrize("fraction", [-0.1, 1.5])
+def test_attack_fraction_outside_zero_to_one_is_rejected(fraction):
+    with pytest.raises(ValueError):
+        budgeted_profile(0.5, 3, fraction)
@@ -0,0 +1,122 @@
+"""Tests for validation.ValidationStage and Deduplicator"""
+
+import io
+import json
+import random
+
+import pytest
+
+from synthetic_data_generator import generate_network_logs, generate_security_events
+from validation import MIN_BLOOM_CAPACITY, Deduplicator, ValidationStage
+
+HOUR = 3600.0
+
+
+@pytest.mark.parametrize("method", ["set", "bloom"])
+def test_pending_keys_count_only_once_merged(method):
+    deduplicator = Deduplicator(method=method)
+    keys = [f"event-{index}" for index in range(100)]
+    epochs = [1700000000.0 + index * 60 for index in range(100)]
+
+    pending = deduplicator.pending()
+    assert pending.check(keys, epochs) == [False] * 100
+    assert deduplicator.check(keys, epochs, record=False) == [False] * 100
+    assert deduplicator.keys == 0
+
+    deduplicator.merge(pending)
+
+    assert deduplicator.check(keys, epochs, record=False) == [True] * 100
+    assert deduplicator.check(keys[:10] + ["event-new"], epochs[:10] + [epochs[0]]) == [True] * 10 + [False]
+
+
+def rejected(dataset, entries, **kwargs):
+    rejects = io.StringIO()
+    stage = ValidationStage(dataset, rejects=rejects, **kwargs)
+    kept = stage.filter(entries)
+    return kept, [json.loads(line)["reason"] for line in rejects.getvalue().splitlines()], stage
+
+
+def test_rejection_reasons():
+    good = generate_network_logs(5)
+    bad = [dict(good[0], timestamp=None), dict(good[1], timestamp="yesterday"),
+           dict(good[2], timestamp="2025-13-01T00:00:00"), dict(good[3], source_port=True)]
+
+    kept, reasons, stage = rejected("network", bad + [good[4]])
+
+    assert kept == [good[4]]
+    assert reasons == ["timestamp: missing", "timestamp: not ISO 8601", "timestamp: not ISO 8601",
+                       "source_port: expected NoneType/int, got bool"]
+    assert stage.reasons == {"timestamp": 3, "source_port": 1}
+
+
+def test_bool_is_not_accepted_as_a_number_and_int_not_as_bool():
+    entry = generate_security_events(1)[0]
+    auth = {"log_id": "l-1", "timestamp": entry["timestamp"], "success": 1}
+
+    assert rejected("security", [dict(entry, risk_score=False)])[1] == [
+        "risk_score: expected NoneType/float/int, got bool"]
+    assert rejected("authentication", [auth])[1] == ["success: expected bool, got int"]
+
+
+def test_duplicates_are_counted_by_event_id():
+    events = generate_security_events(50)
+    repeats = [dict(event, severity="Low") for event in events[:20]]
+
+    # A horizon covering the generator's 30 days, so no bucket is evicted
+    kept, _, stage = rejected("security", events + repeats, deduplicator=Deduplicator(31 * 24))
+
+    assert kept == events
+    assert stage.duplicates == 20
+    assert stage.summary().endswith("50 kept, 0 rejected, 20 duplicates")
+
+
+def test_activity_entries_without_an_id_fall_back_to_the_correlation_key():
+    entry = {"timestamp": "2025-01-01T00:00:00Z", "operation": "write", "status": "Started",
+             "correlation_id": "c-1", "event_id": None}
+    same = dict(entry, caller="someone@example.com")
+    next_step = dict(entry, status="Succeeded")
+
+    kept, _, stage = rejected("activity", [entry, same, next_step])
+
+    assert kept == [entry, next_step]
+    assert stage.duplicates == 1
+
+
+@pytest.mark.parametrize("method", ["set", "bloom"])
+def test_entries_of_an_evicted_bucket_are_counted_late(method):
+    deduplicator = Deduplicator(horizon_hours=2, bucket_minutes=60, method=method)
+
+    for hour in range(3):
+        deduplicator.check([f"event-{hour}"], [hour * HOUR])
+
+    assert deduplicator.check(["event-0", "event-new"], [0.0, 10.0]) == [False, False]
+    assert deduplicator.late == 2
+    assert deduplicator.check(["event-2"], [2 * HOUR]) == [True]
+
+
+def test_set_and_bloom_find_the_same_duplicates():
+    rng = random.Random(5)
+    keys = [f"event-{rng.randrange(3000)}" for _ in range(20000)]
+    epochs = [rng.uniform(0, 6 * HOUR) for _ in keys]
+    # A re-delivered event keeps its original time
+    first_seen = {}
+    epochs = [first_seen.setdefault(key, epoch) for key, epoch in zip(keys, epochs)]
+    exact, bloom = Deduplicator(method="set"), Deduplicator(method="bloom")
+
+    for start in range(0, len(keys), 1000):
+        batch = slice(start, start + 1000)
+        assert exact.check(keys[batch], epochs[batch]) == bloom.check(keys[batch], epochs[batch])
+
+    assert exact.keys == bloom.keys == len(set(keys))
+
+
+def test_bloom_filters_grow_with_the_bucket():
+    deduplicator = Deduplicator(method="bloom", bloom_capacity=5000)
+
+    deduplicator.check(["event-0"], [0.0])
+    small = deduplicator.nbytes
+    deduplicator.check([f"event-{index}" for index in range(20000)], [HOUR] * 20000)
+
+    assert small < 8 * 1024
+    assert [bloom.capacity for bloom in deduplicator.buckets[1]] == [
+        MIN_BLOOM_CAPACITY, 2 * MIN_BLOOM_CAPACITY, 4 * MIN_BLOOM_CAPACITY, 5000, 5000, 5000]
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Traffic Model for Zero-Trust Cloud Lab
+Time-ordered event arrivals with diurnal/weekly load curves, Poisson arrivals
+and injected attack campaigns, used to drive the synthetic generators
+"""
+
+import heapq
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional
+
+# Campaign kinds each generator knows how to render
+AUTH_ATTACKS = ["brute_force", "credential_stuffing"]
+SECURITY_ATTACKS = ["brute_force", "privilege_escalation", "data_exfiltration", "anomalous_access"]
+NETWORK_ATTACKS = ["PORT_SCAN", "SYN_FLOOD", "DDoS_ATTEMPT"]
+
+# Share of a profile's events that budget_campaigns() gives to attack campaigns
+DEFAULT_ATTACK_FRACTION = 0.05
+
+ATTACK_KINDS = {
+    "authentication": AUTH_ATTACKS,
+    "security": SECURITY_ATTACKS,
+    "network": NETWORK_ATTACKS,
+}
+
+
+@dataclass
+class AttackCampaign:
+    """A burst of attack traffic at a constant Poisson rate"""
+    kind: str
+    start: datetime
+    duration_seconds: float
+    rate_per_second: float
+    source_ip: str
+    target: Optional[str] = None  # e.g. the username a brute force is aimed at
+
+    @property
+    def end(self) -> datetime:
+        return self.start + timedelta(seconds=self.duration_seconds)
+
+
+class Arrival(NamedTuple):
+    """One event arrival: when it happens and which campaign (if any) caused it"""
+    timestamp: datetime
+    campaign: Optional[AttackCampaign]
+
+
+@dataclass
+class TrafficProfile:
+    """
+    Baseline load curve plus attack campaigns
+
+    rate(t) = base_rate * diurnal(t) * weekly(t), where diurnal is a cosine
+    peaking at peak_hour with the given relative amplitude and weekly
+    scales Saturday/Sunday by weekend_factor.
+    """
+    base_rate_per_second: float
+    diurnal_amplitude: float = 0.6
+    peak_hour: float = 14.0
+    weekend_factor: float = 0.4
+    campaigns: List[AttackCampaign] = field(default_factory=list)
+
+    @classmethod
+    def for_target_eps(cls, events_per_second: float, **kwargs) -> "TrafficProfile":
+        """Profile whose baseline averages events_per_second over a week"""
+        weekend_factor = kwargs.get("weekend_factor", cls.weekend_factor)
+        weekly_mean = (5 + 2 * weekend_factor) / 7
+        return cls(base_rate_per_second=events_per_second / weekly_mean, **kwargs)
+
+    def rate_at(self, t: datetime) -> float:
+        """Baseline events/sec at time t (campaigns excluded)"""
+        hour = t.hour + t.minute / 60 + t.second / 3600
+        diurnal = 1 + self.diurnal_amplitude * math.cos(2 * math.pi * (hour - self.peak_hour) / 24)
+        weekly = self.weekend_factor if t.weekday() >= 5 else 1.0
+        return self.base_rate_per_second * diurnal * weekly
+
+    @property
+    def max_rate(self) -> float:
+        return self.base_rate_per_second * (1 + self.diurnal_amplitude)
+
+    def baseline_events(self, start: datetime, end: datetime, step_seconds: float = 60) -> float:
+        """Approximate number of baseline events between start and end"""
+        total = 0.0
+        t = start
+        step = timedelta(seconds=step_seconds)
+        while t < end:
+            total += self.rate_at(t) * min(step_seconds, (end - t).total_seconds())
+            t += step
+        return total
+
+    def campaign_events(self, start: datetime, end: datetime) -> float:
+        """Expected number of campaign events between start and end"""
+        total = 0.0
+        for campaign in self.campaigns:
+            overlap = (min(campaign.end, end) - max(campaign.start, start)).total_seconds()
+            total += campaign.rate_per_second * max(overlap, 0)
+        return total
+
+    def expected_events(self, start: datetime, end: datetime, step_seconds: float = 60) -> float:
+        """Approximate number of events between start and end (baseline + campaigns)"""
+        return self.baseline_events(start, end, step_seconds) + self.campaign_events(start, end)
+
+    def budget_campaigns(self, start: datetime, end: datetime,
+                         attack_fraction: float = DEFAULT_ATTACK_FRACTION):
+        """
+        Fit the campaigns into the profile's own event budget
+
+        Campaign rates are scaled, keeping their relative intensity, so that
+        campaigns make up attack_fraction of the events between start and
+        end, and the baseline gives up the same share. The total rate stays
+        at the profile's target however many campaigns there are. A fraction
+        of 0 drops the campaigns.
+        """
+        if not 0 <= attack_fraction <= 1:
+            raise ValueError(f"attack_fraction must be between 0 and 1, got {attack_fraction}")
+        if not attack_fraction:
+            self.campaigns = []
+            return
+        campaign_events = self.campaign_events(start, end)
+        if not campaign_events:
+            return
+        scale = attack_fraction * self.baseline_events(start, end) / campaign_events
+        for campaign in self.campaigns:
+            campaign.rate_per_second *= scale
+        self.base_rate_per_second *= 1 - attack_fraction
+
+
+def _baseline_arrivals(profile: TrafficProfile, start: datetime, end: datetime,
+                       rng: random.Random) -> Iterator[Arrival]:
+    """Non-homogeneous Poisson arrivals by thinning a max-rate process"""
+    max_rate = profile.max_rate
+    if max_rate <= 0:
+        return
+    offset = 0.0
+    span = (end - start).total_seconds()
+    while True:
+        offset += rng.expovariate(max_rate)
+        if offset >= span:
+            return
+        t = start + timedelta(seconds=offset)
+        if rng.random() * max_rate < profile.rate_at(t):
+            yield Arrival(t, None)
+
+
+def _campaign_arrivals(campaign: AttackCampaign, start: datetime, end: datetime,
+                       rng: random.Random) -> Iterator[Arrival]:
+    """Homogeneous Poisson arrivals for one campaign, clipped to [start, end)"""
+    window_start = max(campaign.start, start)
+    window_end = min(campaign.end, end)
+    span = (window_end - window_start).total_seconds()
+    offset = 0.0
+    while span > 0 and campaign.rate_per_second > 0:
+        offset += rng.expovariate(campaign.rate_per_second)
+        if offset >= span:
+            return
+        yield Arrival(window_start + timedelta(seconds=offset), campaign)
+
+
+def iter_arrivals(profile: TrafficProfile, start: datetime, end: datetime,
+                  rng: Optional[random.Random] = None) -> Iterator[Arrival]:
+    """
+    Yield arrivals between start and end in timestamp order
+
+    Baseline and campaign streams are each generated in order and merged
+    lazily, so there is never a final sort and memory use is constant.
+    """
+    rng = rng or random.Random()
+    streams = [_baseline_arrivals(profile, start, end, rng)]
+    streams.extend(
+        _campaign_arrivals(campaign, start, end, random.Random(rng.getrandbits(64)))
+        for campaign in profile.campaigns
+    )
+    return heapq.merge(*streams, key=lambda arrival: arrival.timestamp)
+
+
+def random_campaigns(dataset: str, start: datetime, end: datetime, count: int,
+                     source_ips: List[str], targets: Optional[List[str]] = None,
+                     rng: Optional[random.Random] = None,
+                     rate_range: tuple = (0.5, 5.0),
+                     duration_range: tuple = (300, 3600)) -> List[AttackCampaign]:
+    """
+    Draw attack campaigns of the kinds a dataset supports
+
+    Args:
+        dataset: "authentication", "security" or "network"
+        start: Earliest campaign start
+        end: Latest campaign end
+        count: Number of campaigns
+        source_ips: Pool of attacker IPs
+        targets: Pool of targeted usernames (authentication brute force)
+        rng: Random stream
+        rate_range: (min, max) events/sec during a campaign (relative
+                    intensities once TrafficProfile.budget_campaigns() rescales them)
+        duration_range: (min, max) campaign length in seconds
+    """
+    rng = rng or random.Random()
+    kinds = ATTACK_KINDS[dataset]
+    span = (end - start).total_seconds()
+    campaigns = []
+    for _ in range(count):
+        duration = min(rng.uniform(*duration_range), span)
+        campaigns.append(AttackCampaign(
+            kind=rng.choice(kinds),
+            start=start + timedelta(seconds=rng.uniform(0, span - duration)),
+            duration_seconds=duration,
+            rate_per_second=rng.uniform(*rate_range),
+            source_ip=rng.choice(source_ips),
+            target=rng.choice(targets) if targets else None
+        ))
+    return campaigns
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""
+Validation and Deduplication for Zero-Trust Cloud Lab
+Pipeline stage between collection and saving that rejects malformed entries
+against a declared schema and drops duplicates with bounded memory
+"""
+
+import argparse
+import json
+import math
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from operator import methodcaller
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from log_store import DATASET_FIELDS, infer_dataset
+from metrics import REGISTRY as metrics
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_HORIZON_HOURS = 24
+DEFAULT_BUCKET_MINUTES = 60
+DEFAULT_BLOOM_CAPACITY = 100000
+MIN_BLOOM_CAPACITY = 1024
+DEFAULT_BLOOM_ERROR_RATE = 1e-6
+DEDUP_METHODS = ("set", "bloom")
+
+_MASK64 = (1 << 64) - 1
+
+
+class Field:
+    """Expected type of one entry field; timestamp fields must also parse as ISO 8601"""
+    __slots__ = ("types", "nullable", "timestamp")
+
+    def __init__(self, *types: type, nullable: bool = False, timestamp: bool = False):
+        self.types = frozenset(types + ((type(None),) if nullable else ()))
+        self.nullable = nullable
+        self.timestamp = timestamp
+
+
+def _required(*types: type) -> Field:
+    return Field(*types)
+
+
+def _optional(*types: type) -> Field:
+    return Field(*types, nullable=True)
+
+
+TIMESTAMP = Field(str, timestamp=True)
+NUMBER = (int, float)
+
+# Dataset -> field -> expectation; fields not listed are passed through unchecked
+SCHEMAS: Dict[str, Dict[str, Field]] = {
+    "activity": {
+        "timestamp": TIMESTAMP,
+        "operation": _required(str),
+        "event_id": _optional(str),
+        "correlation_id": _optional(str),
+        "level": _optional(str),
+        "status": _optional(str),
+        "caller": _optional(str),
+        "category": _optional(str),
+        "resource_group": _optional(str),
+        "resource_id": _optional(str),
+        "claims": _optional(dict),
+    },
+    "authentication": {
+        "log_id": _required(str),
+        "timestamp": TIMESTAMP,
+        "success": _required(bool),
+        "user_id": _optional(str),
+        "username": _optional(str),
+        "source_ip": _optional(str),
+        "authentication_method": _optional(str),
+        "risk_level": _optional(str),
+        "failure_reason": _optional(str),
+    },
+    "security": {
+        "event_id": _required(str),
+        "timestamp": TIMESTAMP,
+        "event_type": _required(str),
+        "severity": _required(str),
+        "source_ip": _optional(str),
+        "destination_ip": _optional(str),
+        "user_id": _optional(str),
+        "metadata": _optional(dict),
+        "risk_score": _optional(*NUMBER),
+    },
+    "network": {
+        "log_id": _required(str),
+        "timestamp": TIMESTAMP,
+        "protocol": _required(str),
+        "source_ip": _required(str),
+        "destination_ip": _required(str),
+        "source_port": _optional(int),
+        "destination_port": _optional(int),
+        "bytes_sent": _optional(int),
+        "bytes_received": _optional(int),
+        "packets": _optional(int),
+        "action": _required(str),
+        "flags": _optional(list),
+        "session_duration": _optional(int),
+    },
+}
+
+
+def parse_epoch(value: str) -> float:
+    """Seconds since the epoch for an ISO timestamp ("Z" allowed; naive values are UTC)"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00") if value.endswith("Z") else value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def dedup_key(entry: Dict, dataset: str) -> str:
+    """
+    Identity of an entry: its record ID, or for activity entries without
+    one, the correlation ID plus what happened when (one operation logs
+    several events under a correlation ID)
+    """
+    record_id = entry.get(DATASET_FIELDS[dataset][0])
+    if record_id:
+        return record_id
+    if dataset == "activity" and entry.get("correlation_id"):
+        return "|".join(str(entry.get(name)) for name in
+                        ("correlation_id", "timestamp", "operation", "status"))
+    return json.dumps(entry, sort_keys=True, default=str)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 64-bit key hashes, queried a batch at a time
+
+    k bit positions come from double hashing (h1 + i * h2) and are tested
+    and set with vectorized NumPy operations on a packed bit array.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BLOOM_CAPACITY, error_rate: float = DEFAULT_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+        self._steps = np.arange(self.hashes, dtype=np.uint64)
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        return (h1[:, None] + self._steps * h2[:, None]) % np.uint64(self.size)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        positions = self._positions(hashes)
+        set_bits = self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8) & 1
+        return set_bits.all(axis=1)
+
+    def add(self, hashes: np.ndarray):
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(hashes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+class Deduplicator:
+    """
+    Bounded-memory duplicate detector bucketed by event time
+
+    A re-delivered event carries its original timestamp, so each key is
+    only looked up in the bucket for its own event time. Only the
+    horizon / bucket most recently used buckets are kept (LRU), which bounds
+    memory by the horizon rather than the run length, whichever direction
+    the stream runs in. An entry whose bucket was already evicted cannot be
+    checked and is passed through (counted as late).
+
+    The "set" method keeps 64-bit key hashes (exact up to hash collisions,
+    ~50 bytes per key). "bloom" keeps a chain of Bloom filters per bucket
+    (~4 bytes per key at the default error rate), at the cost of dropping
+    about error_rate of unique events per filter as false duplicates. A
+    bucket's first filter holds MIN_BLOOM_CAPACITY keys and each one chained
+    on holds twice as many, up to bloom_capacity, so a quiet bucket costs a
+    few KB rather than a full-size filter.
+    """
+
+    def __init__(self, horizon_hours: float = DEFAULT_HORIZON_HOURS,
+                 bucket_minutes: float = DEFAULT_BUCKET_MINUTES, method: str = "set",
+                 bloom_capacity: int = DEFAULT_BLOOM_CAPACITY,
+                 error_rate: float = DEFAULT_BLOOM_ERROR_RATE):
+        """
+        Args:
+            horizon_hours: Hours of event time (most recently used buckets) remembered
+            bucket_minutes: Width of each time bucket
+            method: "set" (exact) or "bloom" (compact, probabilistic)
+            bloom_capacity: Keys the largest Bloom filter of a bucket holds
+            error_rate: Target false-duplicate rate of each Bloom filter
+        """
+        if method not in DEDUP_METHODS:
+            raise ValueError(f"Unknown dedup method {method!r}; choose from {DEDUP_METHODS}")
+        self.method = method
+        self.bucket_seconds = bucket_minutes * 60
+        self.horizon_buckets = max(1, math.ceil(horizon_hours * 3600 / self.bucket_seconds))
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.buckets: OrderedDict = OrderedDict()
+        self.evicted = set()
+        self.late = 0
+
+    def _bucket(self, bucket: int, empty):
+        """The bucket's keys, creating it and evicting the least recently used if needed"""
+        seen = self.buckets.get(bucket)
+        if seen is not None:
+            self.buckets.move_to_end(bucket)
+            return seen
+        if bucket in self.evicted:
+            return None
+        seen = self.buckets[bucket] = empty()
+        if len(self.buckets) > self.horizon_buckets:
+            stale, _ = self.buckets.popitem(last=False)
+            self.evicted.add(stale)
+        return seen
+
+    def check(self, keys: List[str], epochs: List[float], record: bool = True) -> List[bool]:
+        """
+        Record a batch of keys and return which were already seen
+
+        Args:
+            keys: Entry identities (see dedup_key)
+            epochs: Event times of the entries, in seconds
+            record: False only looks the keys up, leaving them to be recorded
+                    later with merge() (e.g. once the entries are written)
+
+        Returns:
+            True for each entry that is a duplicate of an earlier one
+        """
+        bucket_seconds = self.bucket_seconds
+        buckets = [int(epoch // bucket_seconds) for epoch in epochs]
+        # Python's str hash is a keyed 64-bit SipHash: fine within one process
+        hashes = [hash(key) & _MASK64 for key in keys]
+        if not record:
+            return self._seen(buckets, hashes)
+        return self._record(buckets, hashes)
+
+    def _seen(self, buckets: List[int], hashes: List[int]) -> List[bool]:
+        """Which digests are already recorded, without touching the buckets"""
+        duplicates = [False] * len(hashes)
+        if self.method == "set":
+            current, seen = None, None
+            for index, (bucket, digest) in enumerate(zip(buckets, hashes)):
+                if bucket != current:
+                    current, seen = bucket, self.buckets.get(bucket)
+                if seen is not None and digest in seen:
+                    duplicates[index] = True
+            return duplicates
+
+        groups: Dict[int, List[int]] = {}
+        for index, bucket in enumerate(buckets):
+            groups.setdefault(bucket, []).append(index)
+        for bucket, indexes in groups.items():
+            filters = self.buckets.get(bucket)
+            if not filters:
+                continue
+            digests = np.array([hashes[index] for index in indexes], dtype=np.uint64)
+            seen = np.zeros(len(digests), dtype=bool)
+            for bloom in filters:
+                seen |= bloom.contains(digests)
+            for index in np.asarray(indexes)[seen].tolist():
+                duplicates[index] = True
+        return duplicates
+
+    def _record(self, buckets: List[int], hashes: List[int]) -> List[bool]:
+        """Record digests, returning which were already recorded"""
+        duplicates = [False] * len(hashes)
+
+        if self.method == "set":
+            current, seen = None, None
+            for index, (bucket, digest) in enumerate(zip(buckets, hashes)):
+                if bucket != current:
+                    current, seen = bucket, self._bucket(bucket, set)
+                if seen is None:
+                    self.late += 1
+                elif digest in seen:
+                    duplicates[index] = True
+                else:
+                    seen.add(digest)
+            return duplicates
+
+        # Bloom: group the batch by bucket, drop repeats within the batch, then
+        # test and insert each group with one vectorized call per filter
+        groups: Dict[int, Dict[int, int]] = {}
+        for index, (bucket, digest) in enumerate(zip(buckets, hashes)):
+            if bucket in self.evicted and bucket not in self.buckets:
+                self.late += 1
+                continue
+            group = groups.setdefault(bucket, {})
+            if digest in group:
+                duplicates[index] = True
+            else:
+                group[digest] = index
+        for bucket, group in groups.items():
+            filters = self._bucket(bucket, list)
+            digests = np.fromiter(group.keys(), dtype=np.uint64, count=len(group))
+            indexes = np.fromiter(group.values(), dtype=np.int64, count=len(group))
+            seen = np.zeros(len(digests), dtype=bool)
+            for bloom in filters:
+                seen |= bloom.contains(digests)
+            for index in indexes[seen].tolist():
+                duplicates[index] = True
+            new = digests[~seen]
+            while len(new):
+                if not filters or filters[-1].count >= filters[-1].capacity:
+                    capacity = filters[-1].capacity * 2 if filters else MIN_BLOOM_CAPACITY
+                    filters.append(BloomFilter(min(capacity, self.bloom_capacity), self.error_rate))
+                bloom = filters[-1]
+                room = bloom.capacity - bloom.count
+                bloom.add(new[:room])
+                new = new[room:]
+        return duplicates
+
+    def pending(self) -> "Deduplicator":
+        """Empty exact Deduplicator over the same buckets, to collect keys for merge()"""
+        return Deduplicator(self.horizon_buckets * self.bucket_seconds / 3600,
+                            self.bucket_seconds / 60)
+
+    def merge(self, pending: "Deduplicator"):
+        """Record every key a pending() Deduplicator holds"""
+        for bucket, digests in pending.buckets.items():
+            self._record([bucket] * len(digests), list(digests))
+
+    @property
+    def keys(self) -> int:
+        """Keys currently remembered"""
+        if self.method == "set":
+            return sum(len(seen) for seen in self.buckets.values())
+        return sum(bloom.count for filters in self.buckets.values() for bloom in filters)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held (set: ~50 bytes per key)"""
+        if self.method == "set":
+            return self.keys * 50
+        return sum(bloom.nbytes for filters in self.buckets.values() for bloom in filters)
+
+
+class ValidationStage:
+    """
+    Validates and deduplicates entries in batches on their way to save_logs
+
+    Each batch is checked field by field: the set of value types a field
+    takes across the whole batch is built in C and compared with the
+    schema, and only a batch containing a bad value is scanned entry by
+    entry. The surviving entries then go through the Deduplicator. Rejected entries
+    can be written with their reason to an NDJSON file for inspection.
+
+    Usage:
+        stage = ValidationStage("activity")
+        logs = stage.filter(logs)          # or: for entry in stage.process(stream)
+        print(stage.summary())
+    """
+
+    def __init__(self, dataset: str, deduplicator: Optional[Deduplicator] = None,
+                 schema: Optional[Dict[str, Field]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 rejects: Optional[TextIO] = None, dedup: bool = True):
+        """
+        Args:
+            dataset: activity, authentication, security or network
+            deduplicator: Shared Deduplicator (a default one is created if omitted)
+            schema: Field expectations (defaults to SCHEMAS[dataset])
+            batch_size: Entries validated per batch
+            rejects: Text file to append rejected entries to as NDJSON
+            dedup: Set False to only validate
+        """
+        self.dataset = dataset
+        self.schema = schema or SCHEMAS[dataset]
+        self.deduplicator = (deduplicator or Deduplicator()) if dedup else None
+        self.batch_size = batch_size
+        self.rejects = rejects
+        self.timestamp_fields = [name for name, field in self.schema.items() if field.timestamp]
+        self.processed = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.reasons: Counter = Counter()
+
+    @property
+    def rejected(self) -> int:
+        return sum(self.reasons.values())
+
+    def validate(self, batch: List[Dict]) -> Tuple[Dict[int, str], List[float]]:
+        """
+        Check a batch against the schema
+
+        Returns:
+            ({index: reason} for invalid entries, event time of every entry
+            in seconds (nan where it could not be parsed))
+        """
+        errors: Dict[int, str] = {}
+        for index, entry in enumerate(batch):
+            if not isinstance(entry, dict):
+                errors[index] = "not an object"
+        if errors:
+            batch = [entry if isinstance(entry, dict) else {} for entry in batch]
+
+        for name, field in self.schema.items():
+            types = field.types
+            # Fast path: the set of types present in the whole batch, built in C
+            if set(map(type, map(methodcaller("get", name), batch))) <= types:
+                continue
+            values = [entry.get(name) for entry in batch]
+            for index, value in enumerate(values):
+                if type(value) not in types and index not in errors:
+                    errors[index] = f"{name}: " + ("missing" if value is None else
+                                                   f"expected {'/'.join(sorted(t.__name__ for t in types))}, "
+                                                   f"got {type(value).__name__}")
+
+        # Without a timestamp field everything shares one dedup bucket
+        epochs = [math.nan if self.timestamp_fields else 0.0] * len(batch)
+        if self.timestamp_fields:
+            name = self.timestamp_fields[0]
+            for index, entry in enumerate(batch):
+                value = entry.get(name)
+                if type(value) is str:
+                    try:
+                        epochs[index] = parse_epoch(value)
+                    except ValueError:
+                        errors.setdefault(index, f"{name}: not ISO 8601")
+        return errors, epochs
+
+    def process_batch(self, batch: List[Dict], pending: Optional[Deduplicator] = None) -> List[Dict]:
+        """
+        Valid, first-seen entries of one batch, in order
+
+        Args:
+            batch: Entries to check
+            pending: Deduplicator.pending() that collects the new keys instead
+                     of the stage's deduplicator; merge it in once the entries
+                     are safely written, or drop it so a re-read lets them through
+        """
+        self.processed += len(batch)
+        errors, epochs = self.validate(batch)
+        if errors:
+            for index, reason in sorted(errors.items()):
+                self._reject(batch[index], reason)
+            kept = [index for index in range(len(batch)) if index not in errors]
+            batch = [batch[index] for index in kept]
+            epochs = [epochs[index] for index in kept]
+
+        if self.deduplicator is not None and batch:
+            keys = [dedup_key(entry, self.dataset) for entry in batch]
+            if pending is None:
+                duplicates = self.deduplicator.check(keys, epochs)
+            else:
+                duplicates = [seen or again for seen, again in zip(
+                    self.deduplicator.check(keys, epochs, record=False), pending.check(keys, epochs))]
+            duplicate_count = sum(duplicates)
+            if duplicate_count:
+                self.duplicates += duplicate_count
+                metrics.inc("records_duplicate_total", duplicate_count, dataset=self.dataset)
+                batch = [entry for entry, duplicate in zip(batch, duplicates) if not duplicate]
+
+        self.accepted += len(batch)
+        return batch
+
+    def _reject(self, entry, reason: str):
+        field = reason.split(":", 1)[0]
+        self.reasons[field] += 1
+        metrics.inc("records_rejected_total", dataset=self.dataset, field=field)
+        if self.rejects is not None:
+            # One write per line, so stages sharing the file from several threads don't interleave
+            self.rejects.write(json.dumps({"dataset": self.dataset, "reason": reason, "entry": entry},
+                                          default=str) + "\n")
+
+    def process(self, entries: Iterable[Dict]) -> Iterator[Dict]:
+        """Stream entries through the stage, a batch at a time"""
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == self.batch_size:
+                yield from self.process_batch(batch)
+                batch = []
+        if batch:
+            yield from self.process_batch(batch)
+
+    def filter(self, entries: Iterable[Dict]) -> List[Dict]:
+        return list(self.process(entries))
+
+    def summary(self) -> str:
+        text = (f"Validated {self.processed} {self.dataset} entries: {self.accepted} kept, "
+                f"{self.rejected} rejected, {self.duplicates} duplicates")
+        if self.reasons:
+            text += " (rejected by field: " + ", ".join(
+                f"{field}={count}" for field, count in self.reasons.most_common()) + ")"
+        if self.deduplicator is not None and self.deduplicator.late:
+            text += f", {self.deduplicator.late} too old to dedup"
+        return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and deduplicate log files")
+    parser.add_argument("inputs", nargs="+", help="Log files (.json, .ndjson, .ndjson.gz/.zst)")
+    parser.add_argument("--dataset", choices=sorted(SCHEMAS),
+                        help="Dataset of the inputs (default: inferred from the first record)")
+    parser.add_argument("--dedup", choices=DEDUP_METHODS, default="set",
+                        help="Duplicate detector: exact hash set or Bloom filters (default: set)")
+    parser.add_argument("--horizon-hours", type=float, default=DEFAULT_HORIZON_HOURS,
+                        help=f"How far back duplicates are caught (default: {DEFAULT_HORIZON_HOURS})")
+    parser.add_argument("--rejects", help="Write rejected entries and their reasons to this NDJSON file")
+    parser.add_argument("-o", "--output", help="Write kept entries to this NDJSON file")
+    args = parser.parse_args()
+
+    from log_store import iter_records
+
+    def records() -> Iterator[Dict]:
+        for path in args.inputs:
+            yield from iter_records(path)
+
+    stream = records()
+    first = next(stream, None)
+    if first is None:
+        print("No records")
+        return
+    dataset = args.dataset or infer_dataset(first)
+    rejects = open(args.rejects, 'w') if args.rejects else None
+    out = open(args.output, 'w') if args.output else None
+    stage = ValidationStage(dataset, Deduplicator(args.horizon_hours, method=args.dedup), rejects=rejects)
+    start = time.perf_counter()
+    try:
+        for entry in stage.process(_chain(first, stream)):
+            if out:
+                out.write(json.dumps(entry))
+                out.write("\n")
+    finally:
+        for f in (rejects, out):
+            if f:
+                f.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"[OK] {stage.summary()}")
+    print(f"  - {stage.processed / elapsed:,.0f} entries/s, dedup memory "
+          f"{stage.deduplicator.nbytes / 2**20:.1f} MiB for {stage.deduplicator.keys} keys")
+    if out:
+        print(f"[OK] Saved {stage.accepted} entries to {args.output}")
+
+
+def _chain(first: Dict, rest: Iterator[Dict]) -> Iterator[Dict]:
+    yield first
+    yield from rest
+
+
+if __name__ == "__main__":
+    main()